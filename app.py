@@ -1,17 +1,22 @@
 # UI for asking questions on the knowledge base
 import streamlit as st
 import os
+import time
 from langchain_openai import OpenAIEmbeddings
 import google.generativeai as genai
 from simple_vector_store import SimpleVectorStore as MilvusVectorStore
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.prompts import PromptTemplate
-from pages.app_admin import get_vector_store, get_text_chunks
 from langchain.chains.combine_documents import create_stuff_documents_chain
 import boto3
 from langchain_nvidia_ai_endpoints import ChatNVIDIA
 from utils.auth import require_login, show_user_info
 from utils.user_store import get_user_store_path
+from utils.job_queue import get_store, store_lock
+from utils.qa_cache import answer_question, get_qa_cache
+from utils.semantic_cache import get_semantic_cache
+from utils.answer_stream import StreamTiming, get_latency_log, timed_stream
+from utils.context_packer import ContextPacker
 
 
 genai.configure(api_key=os.getenv("GENAI_API_KEY"))
@@ -22,8 +27,8 @@ nvidia_api_key = st.secrets["NVIDIA_API_KEY"]
 def get_prompt_template():
     return PromptTemplate()
 
-def get_chat_chain():
-    prompt_template="""
+CHAT_MODEL = "gemini-2.0-flash"
+PROMPT_TEMPLATE = """
     Answer the questions based on local konwledge base honestly
 
     Context:\n {context} \n
@@ -31,7 +36,12 @@ def get_chat_chain():
 
     Answers:
 """
-    model=ChatGoogleGenerativeAI(model="gemini-2.0-flash",temperature=0.3)
+# Retrieved chunks overlap heavily; merge and trim them before the LLM call
+# (budget: $CONTEXT_MAX_TOKENS)
+CONTEXT_PACKER = ContextPacker()
+
+def get_chat_chain():
+    model=ChatGoogleGenerativeAI(model=CHAT_MODEL,temperature=0.3)
     # This is too slow
     #model = ChatNVIDIA(
     #    model="deepseek-ai/deepseek-r1",
@@ -41,22 +51,95 @@ def get_chat_chain():
     #    max_tokens=4096
     #)
     #
-    prompt=PromptTemplate(template=prompt_template, input_variables=["context", "questions"], output_variables=["answers"])
+    prompt=PromptTemplate(template=PROMPT_TEMPLATE, input_variables=["context", "questions"], output_variables=["answers"])
     chain = create_stuff_documents_chain(llm=model, prompt=prompt, document_variable_name="context")
     return chain
 
-def user_input(user_question):
-    # Use user-specific vector store
-    user_store_path = get_user_store_path("./vector_store")
-    vector_store = MilvusVectorStore(store_path=user_store_path)
-    docs = vector_store.similarity_search(user_question)
-
+def stream_answer(docs, user_question, timing):
+    """Generate the answer token by token into the page; returns the full text."""
     chain = get_chat_chain()
+    st.write("Reply: ")
+    timing.started = time.perf_counter()
+    return st.write_stream(timed_stream(chain.stream({"context": docs, "questions": user_question}), timing))
 
-    response = chain.invoke({"context": docs, "questions": user_question})
+def user_input(user_question):
+    """Answer a question from the user's store.
+
+    Repeated questions reuse the retrieved chunks and the answer until the
+    store changes, so reruns cost neither embeddings nor LLM calls. New
+    answers are streamed as they are generated from the packed context;
+    time to first token and total time are recorded for every request, and
+    the tokens saved by packing are logged.
+    """
+    # Use user-specific vector store, shared across reruns and sessions;
+    # reloaded only when another page or worker has written to it
+    user_store_path = get_user_store_path("./vector_store")
+    vector_store = get_store(user_store_path)
+    with store_lock(user_store_path):
+        vector_store.refresh()
+
+    timing = StreamTiming()
+    result = answer_question(
+        vector_store,
+        user_question,
+        lambda docs: stream_answer(docs, user_question, timing),
+        get_qa_cache(),
+        model=CHAT_MODEL,
+        prompt=PROMPT_TEMPLATE,
+        semantic_cache=get_semantic_cache(),
+        packer=CONTEXT_PACKER
+    )
 
-    print(response)
-    st.write("Reply: ",response)
+    print(result.answer)
+    if result.similar_question:
+        st.write("Reply: ", result.answer)
+        st.caption(
+            f"Answer reused from the similar question \"{result.similar_question}\" "
+            f"(similarity {result.similarity:.2f}, {result.seconds * 1000:.0f} ms)"
+        )
+        get_latency_log().record("similar", result.seconds, result.seconds)
+    elif result.answer_cached:
+        st.write("Reply: ", result.answer)
+        st.caption(f"Cached answer ({result.seconds * 1000:.0f} ms)")
+        get_latency_log().record("cache", result.seconds, result.seconds)
+    else:
+        # Retrieval runs before generation, so the user waits for it too
+        retrieval = result.seconds - timing.total
+        first_token = retrieval + (timing.ttft if timing.ttft is not None else timing.total)
+        packing = result.packing
+        st.caption(
+            f"First token after {first_token:.2f}s, answer complete after {result.seconds:.2f}s · "
+            f"context {packing.packed_tokens} tokens (saved {packing.saved_tokens})"
+        )
+        get_latency_log().record("llm", first_token, result.seconds)
+        print(f"Context packed: {packing.summary()}")
+        print(f"Answer generated: {timing.summary()}")
+
+def show_cache_stats():
+    """Hit rates of the answer caches, the LLM time they saved and answer latencies."""
+    semantic = get_semantic_cache().stats
+    exact = get_qa_cache().stats
+    if not (semantic.lookups or exact.answer_hits):
+        return
+    with st.expander("⚡ Answer cache and latency"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Exact repeats", exact.answer_hits)
+        with col2:
+            st.metric("Similar-question hit rate", f"{semantic.hit_rate:.0%}", help=f"{semantic.hits} of {semantic.lookups}")
+        with col3:
+            st.metric("LLM time saved", f"{exact.saved_seconds + semantic.saved_seconds:.1f}s")
+        latency = get_latency_log().summary()
+        if latency:
+            st.caption("Latency per answer source (p50 / p95 seconds)")
+            st.table({
+                source: {
+                    "requests": stats["requests"],
+                    "first token": f"{stats['ttft_p50']:.2f} / {stats['ttft_p95']:.2f}",
+                    "complete": f"{stats['total_p50']:.2f} / {stats['total_p95']:.2f}",
+                }
+                for source, stats in latency.items()
+            })
 
 
 def download_s3_bucket(bucket_name, download_dir):
@@ -104,9 +187,6 @@ def main():
     Use the sidebar to navigate to different sections.
     """)
 
-    # fix the empty vector store issue - use user-specific store
-    get_vector_store(get_text_chunks("Loading some documents to build your knowledge base"))
-
     st.markdown("---")
     st.subheader("💬 Ask Questions")
     st.markdown("Ask questions about the content in your learning repository:")
@@ -121,6 +201,7 @@ def main():
             user_input(user_question)
         else:
             st.info("Please enter a question to search your knowledge base")
+    show_cache_stats()
     
     
     st.markdown("---")
@@ -142,7 +223,7 @@ def main():
         - **Embeddings**: OpenAI text-embedding-3-large
         - **Framework**: LangChain for RAG, memory, and reasoning
         - **Document Processing**: PyPDF2, python-docx
-        - **Audio/Video**: AssemblyAI, MoviePy
+        - **Audio/Video**: AssemblyAI, ffmpeg
         """)    
 
 if __name__ == "__main__":
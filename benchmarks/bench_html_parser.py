@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Benchmark: HTML parsing throughput, before and after the single-pass parser.
+
+"Before" mirrors the old call sites, which each ran BeautifulSoup with
+html.parser over the same page: the crawler for links, the ingestion step for
+title and text, and extract_title_from_url for the title. "After" is one
+``utils.html_parser.parse_html`` call per page (lxml backend, and the stdlib
+fallback for reference).
+
+Pages are read from a directory of saved .html files, or from the bodies in
+the HTTP cache; synthetic pages are generated if neither is available.
+
+Usage: python benchmarks/bench_html_parser.py [--pages-dir DIR] [--repeat 3]
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.html_parser import parse_html  # noqa: E402
+
+
+def synthetic_pages(count=200):
+    rng = random.Random(7)
+    words = (
+        "attention token sequence embedding gradient layer model training loss "
+        "transformer encoder decoder vector query key value batch optimizer"
+    ).split()
+    pages = []
+    for i in range(count):
+        paragraphs = "".join(
+            f"<p>{' '.join(rng.choices(words, k=80))} <a href='/doc/{rng.randint(0, 999)}'>more</a></p>"
+            for _ in range(40)
+        )
+        pages.append(
+            f"<html><head><title>Page {i}</title><meta name='description' content='doc {i}'>"
+            f"<script>{'var x = 1;' * 200}</script><style>{'p{margin:0}' * 100}</style></head>"
+            f"<body><nav>{''.join(f'<a href=/nav/{n}>Nav {n}</a>' for n in range(50))}</nav>"
+            f"{paragraphs}</body></html>"
+        )
+    return pages
+
+
+def load_pages(pages_dir=None):
+    if pages_dir:
+        paths = glob.glob(os.path.join(pages_dir, "**", "*.htm*"), recursive=True)
+    else:
+        paths = glob.glob(os.path.join(os.getenv("HTTP_CACHE_DIR", "./http_cache"), "*", "*.body"))
+    pages = []
+    for path in paths:
+        with open(path, "rb") as f:
+            body = f.read().decode("utf-8", errors="replace")
+        if "<html" in body[:2048].lower():
+            pages.append(body)
+    return pages or synthetic_pages()
+
+
+def old_pipeline(html, url):
+    soup = BeautifulSoup(html, "html.parser")
+    links = [a.get("href") for a in soup.find_all("a", href=True)]
+    soup = BeautifulSoup(html, "html.parser")
+    title_tag = soup.find("title")
+    title = title_tag.get_text().strip() if title_tag else None
+    text = soup.get_text()
+    soup = BeautifulSoup(html, "html.parser")
+    soup.find("title")
+    return links, title, text
+
+
+def measure(label, pages, parse, repeat):
+    total_bytes = sum(len(page.encode("utf-8")) for page in pages) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parse(page, "https://example.com/page")
+    elapsed = time.perf_counter() - start
+    count = len(pages) * repeat
+    print(f"{label:<28} {count / elapsed:8.1f} pages/s {total_bytes / elapsed / 1e6:8.2f} MB/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages-dir", help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages_dir)
+    size = sum(len(page) for page in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size:.0f} KB average")
+
+    before = measure("before (3x BeautifulSoup)", pages, old_pipeline, args.repeat)
+    stdlib = measure("after (stdlib, 1 pass)", pages, lambda html, url: parse_html(html, url, backend="stdlib"), args.repeat)
+    after = measure("after (lxml, 1 pass)", pages, lambda html, url: parse_html(html, url, backend="lxml"), args.repeat)
+    print(f"speedup: {before / after:.1f}x (lxml), {before / stdlib:.1f}x (stdlib)")
+
+
+if __name__ == "__main__":
+    main()
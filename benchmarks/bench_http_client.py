@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Benchmark: bytes transferred and pages/sec, before and after the shared client.
+
+"Before" mirrors the old fetch paths: a bare ``requests.get`` per page with
+``Accept-Encoding: identity``. "After" uses ``utils.http_client.get`` (pooled
+keep-alive session with compressed transfer). Pages are served by a local
+HTTP/1.1 server that counts the bytes it writes and the connections it accepts.
+
+Usage: python benchmarks/bench_http_client.py [--pages 200] [--page-kb 60] [--handshake-ms 30]
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import http_client  # noqa: E402
+
+
+class Stats:
+    bytes_sent = 0
+    connections = 0
+    lock = threading.Lock()
+
+
+def make_page(size_kb):
+    rng = random.Random(42)
+    vocabulary = (
+        "attention token sequence embedding gradient layer model training loss "
+        "transformer encoder decoder vector query key value batch optimizer dataset "
+        "inference latency benchmark parameter weight activation softmax normalization"
+    ).split()
+    parts = ["<p>Transformers use self-attention.</p>"]
+    size = 0
+    while size < size_kb * 1024:
+        sentence = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(8, 20)))
+        link = f'<a href="/docs/{rng.randint(0, 10 ** 6)}">{rng.choice(vocabulary)}</a>'
+        parts.append(f"<p>{sentence.capitalize()} {link}.</p>")
+        size += len(parts[-1])
+    body = "\n".join(parts)
+    return f"<html><head><title>Bench</title></head><body>{body}</body></html>".encode("utf-8")
+
+
+def make_handler(page, handshake_delay):
+    gzipped = gzip.compress(page)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            super().setup()
+            with Stats.lock:
+                Stats.connections += 1
+            # Model the TCP/TLS handshake round trips a real remote host costs
+            time.sleep(handshake_delay)
+
+        def do_GET(self):
+            use_gzip = "gzip" in self.headers.get("Accept-Encoding", "")
+            data = gzipped if use_gzip else page
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            if use_gzip:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            with Stats.lock:
+                Stats.bytes_sent += len(data)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def run(label, fetch, urls):
+    Stats.bytes_sent = 0
+    Stats.connections = 0
+    start = time.perf_counter()
+    for url in urls:
+        response = fetch(url)
+        assert response.status_code == 200 and "Transformers" in response.text
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<8} pages={len(urls):<5} bytes={Stats.bytes_sent:>12,} "
+        f"connections={Stats.connections:<5} pages/sec={len(urls) / elapsed:8.1f}"
+    )
+    return Stats.bytes_sent, len(urls) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--page-kb", type=int, default=60)
+    parser.add_argument("--handshake-ms", type=float, default=0.0,
+                        help="simulated connection setup cost per new connection")
+    args = parser.parse_args()
+
+    handler = make_handler(make_page(args.page_kb), args.handshake_ms / 1000)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    urls = [f"http://127.0.0.1:{server.server_port}/page/{i}" for i in range(args.pages)]
+
+    before_headers = {"User-Agent": http_client.USER_AGENT, "Accept-Encoding": "identity"}
+    before_bytes, before_rate = run(
+        "before", lambda url: requests.get(url, headers=before_headers, timeout=10), urls
+    )
+    after_bytes, after_rate = run("after", http_client.get, urls)
+    server.shutdown()
+
+    print(f"bytes saved: {1 - after_bytes / before_bytes:.1%}, speedup: {after_rate / before_rate:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
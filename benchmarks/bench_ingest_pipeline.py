@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Benchmark: end-to-end URL ingestion throughput, sequential vs. staged pipeline.
+
+"Before" mirrors the old bulk import: fetch every batch, then chunk
+everything, then write source by source (one embedding request and one store
+save per source). "After" is ``utils.ingest_pipeline.IngestPipeline``, where
+fetch, extract, chunk, embed and write overlap across batches.
+
+Network and embeddings are stubbed with fixed latencies so the numbers only
+reflect how well the stages overlap; extraction, chunking and the vector
+store are the real code.
+
+Usage: python benchmarks/bench_ingest_pipeline.py [--urls 200] [--fetch-ms 150] [--embed-ms 300]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from simple_vector_store import SimpleVectorStore  # noqa: E402
+from utils.content_processor import documents_from_records, chunk_documents, ingest_documents  # noqa: E402
+from utils.http_cache import CachedResponse  # noqa: E402
+from utils.ingest_pipeline import IngestPipeline  # noqa: E402
+from utils.politeness import PolitenessScheduler  # noqa: E402
+
+WORDS = "attention token sequence embedding gradient layer model training transformer vector".split()
+
+
+class StubEmbeddings:
+    """Fixed latency per request plus a little per text, like a remote API."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.requests = 0
+
+    def embed_documents(self, texts):
+        self.requests += 1
+        time.sleep(self.latency + 0.0005 * len(texts))
+        return [[random.random() for _ in range(64)] for _ in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def make_fetch(latency):
+    def fetch(url):
+        time.sleep(latency)
+        rng = random.Random(url)
+        body = "".join(f"<p>{' '.join(rng.choices(WORDS, k=120))}</p>" for _ in range(20))
+        html = f"<html><head><title>{url}</title></head><body>{body}</body></html>"
+        return CachedResponse(url=url, status=200, headers={"Content-Type": "text/html"}, body=html.encode())
+    return fetch
+
+
+def make_store(path, latency):
+    store = SimpleVectorStore(store_path=path)
+    store.embedding = StubEmbeddings(latency)
+    return store
+
+
+def scheduler():
+    return PolitenessScheduler(default_delay=0, max_per_domain=4, respect_robots=False)
+
+
+def run_sequential(urls, store, fetch, batch_size=10):
+    documents = []
+    sched = scheduler()
+    for start in range(0, len(urls), batch_size):
+        batch = urls[start:start + batch_size]
+        responses, _ = sched.run(batch, fetch)
+        documents.extend(documents_from_records([responses[url] for url in batch if url in responses]))
+    return ingest_documents(store, chunk_documents(documents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=200)
+    parser.add_argument("--domains", type=int, default=10)
+    parser.add_argument("--fetch-ms", type=float, default=150)
+    parser.add_argument("--embed-ms", type=float, default=300)
+    args = parser.parse_args()
+
+    urls = [f"https://site{i % args.domains}.example/page/{i}" for i in range(args.urls)]
+    fetch = make_fetch(args.fetch_ms / 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = make_store(os.path.join(tmp, "before"), args.embed_ms / 1000)
+        started = time.perf_counter()
+        run_sequential(urls, store, fetch)
+        before = time.perf_counter() - started
+        print(f"before (sequential)  {before:7.2f}s {args.urls / before:7.1f} URLs/s "
+              f"{store.embedding.requests} embedding requests")
+
+        store = make_store(os.path.join(tmp, "after"), args.embed_ms / 1000)
+        pipeline = IngestPipeline(store, scheduler=scheduler(), fetch=fetch)
+        stats = pipeline.run(urls)
+        print(f"after (pipeline)     {stats.elapsed:7.2f}s {stats.urls_per_second:7.1f} URLs/s "
+              f"{store.embedding.requests} embedding requests")
+        for name, stage in stats.stages.items():
+            print(f"  {name:<8} busy {stage.busy_seconds:6.2f}s")
+        print(f"speedup: {before / stats.elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Benchmark: word cloud cost, full-text WordCloud.generate vs. streaming counts.
+
+"Before" mirrors the old ``generate_word_cloud``: join all extracted text,
+``WordCloud.generate`` it and draw it with pyplot. "After" counts each
+document with ``utils.word_cloud.WordCounter`` (as chunking does) and
+renders the capped frequency table to PNG; a second render of the same
+table is served from the cache.
+
+Usage: python benchmarks/bench_word_cloud.py [--documents 200] [--words 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from wordcloud import WordCloud  # noqa: E402
+from utils.word_cloud import WordCounter, word_cloud_png  # noqa: E402
+
+WORDS = ("attention token sequence embedding gradient layer model training transformer vector "
+         "the of and to in is for with on that retrieval agent benchmark dataset").split()
+
+
+def run_before(texts):
+    wordcloud = WordCloud(width=800, height=400, background_color='white').generate("\n".join(texts))
+    plt.figure(figsize=(10, 5))
+    plt.imshow(wordcloud, interpolation='bilinear')
+    plt.axis('off')
+    plt.tight_layout(pad=0)
+    plt.savefig(os.devnull, format="png")
+    plt.close("all")
+
+
+def run_after(texts):
+    counter = WordCounter()
+    for text in texts:
+        counter.update(text)
+    counted = time.perf_counter()
+    word_cloud_png(counter.top())
+    return counted, counter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--words", type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [" ".join(rng.choices(WORDS, k=args.words)) for _ in range(args.documents)]
+    size = sum(len(t) for t in texts) / 2**20
+
+    started = time.perf_counter()
+    run_before(texts)
+    before = time.perf_counter() - started
+    print(f"before (generate full text)  {before:6.2f}s for {size:.1f} MiB")
+
+    started = time.perf_counter()
+    counted, counter = run_after(texts)
+    after = time.perf_counter() - started
+    print(f"after (counts + render)      {after:6.2f}s (counting {counted - started:.2f}s, "
+          f"render {after - (counted - started):.2f}s)")
+
+    started = time.perf_counter()
+    word_cloud_png(counter.top())
+    print(f"after, cached re-render      {time.perf_counter() - started:6.3f}s")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Headless bulk URL import for large CSV/TXT files.
+
+URLs are streamed from the input files in windows, each window is run through
+the staged ingest pipeline into the given user store, and a checkpoint is
+saved after every window so an interrupted run (or the next cron run)
+continues where it stopped. The checkpoint does not move past a window in
+which URLs failed, so the next run retries them. URLs are also recorded in
+the store's import ledger, so re-running a file with the same options skips
+every URL that was already committed, even after a --restart.
+
+Usage:
+    python ingest_cli.py urls.csv --user charles_guo --category NLP
+    python ingest_cli.py big.txt --store ./vector_store_default --window 1000
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from simple_vector_store import SimpleVectorStore
+from utils.duplicate_detector import URLIndex, normalize_url
+from utils.import_ledger import ImportLedger
+from utils.ingest_pipeline import IngestPipeline
+from utils.politeness import PolitenessScheduler, interleave_by_domain
+from utils.user_store import safe_user_id
+
+CHECKPOINT_FILENAME = "ingest_checkpoints.json"
+URL_COLUMN_NAMES = ("url", "urls", "link", "links", "href", "source_url")
+
+
+def iter_urls_from_file(path: str, url_column: Optional[str] = None) -> Iterator[Tuple[int, str]]:
+    """Yield (row number, URL) from a CSV or text file without loading it whole.
+
+    For CSV files the URL column is ``url_column`` or the first header that
+    looks like a URL column; text files have one URL per line.
+    """
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        if not path.lower().endswith(".csv"):
+            for row_number, line in enumerate(f, 1):
+                url = line.strip()
+                if url.startswith(("http://", "https://")):
+                    yield row_number, url
+            return
+
+        reader = csv.reader(f)
+        header = next(reader, [])
+        names = [name.strip().lower() for name in header]
+        if url_column:
+            if url_column.lower() not in names:
+                raise ValueError(f"Column '{url_column}' not found in {path}: {header}")
+            index = names.index(url_column.lower())
+        else:
+            index = next((names.index(name) for name in URL_COLUMN_NAMES if name in names), 0)
+        for row_number, row in enumerate(reader, 1):
+            if index < len(row):
+                url = row[index].strip()
+                if url.startswith(("http://", "https://")):
+                    yield row_number, url
+
+
+class Checkpoints:
+    """Rows already processed per input file, stored next to the vector store."""
+
+    def __init__(self, store_path: str):
+        self.path = os.path.join(store_path, CHECKPOINT_FILENAME)
+        self.data: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading checkpoints: {e}")
+
+    def rows_done(self, input_path: str) -> int:
+        entry = self.data.get(os.path.abspath(input_path))
+        if not entry:
+            return 0
+        # A file smaller than when we last saw it was replaced, not appended to
+        if os.path.getsize(input_path) < entry.get("size", 0):
+            return 0
+        return entry.get("rows_done", 0)
+
+    def save(self, input_path: str, rows_done: int):
+        self.data[os.path.abspath(input_path)] = {
+            "rows_done": rows_done,
+            "size": os.path.getsize(input_path),
+            "updated": datetime.now().isoformat(),
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def reset(self, input_path: str):
+        self.data.pop(os.path.abspath(input_path), None)
+
+
+def ingest_file(
+    input_path: str,
+    pipeline: IngestPipeline,
+    checkpoints: Checkpoints,
+    url_index: URLIndex,
+    window: int = 500,
+    url_column: Optional[str] = None,
+    reimport: bool = False,
+    failures_file=None
+) -> Dict[str, float]:
+    """Stream one input file through the pipeline, checkpointing every window.
+
+    The checkpoint stops at the start of the first window with failed URLs;
+    the next run reads from there again, skipping the URLs already stored.
+    """
+    start_row = checkpoints.rows_done(input_path)
+    if start_row:
+        print(f"{input_path}: resuming after row {start_row}")
+
+    totals = {"urls": 0, "skipped": 0, "failed": 0, "chunks": 0, "added": 0, "resumed": 0, "seconds": 0.0}
+    seen = set()
+    batch, last_row = [], start_row
+    # Rows before the current window, and before the first window with failures
+    window_start, retry_from = start_row, None
+
+    def flush():
+        nonlocal window_start, retry_from
+        if batch:
+            stats = pipeline.run(interleave_by_domain(batch))
+            summary = stats.summary()
+            for url, error in stats.failures.items():
+                if failures_file is not None:
+                    failures_file.writerow([input_path, url, error])
+            totals["urls"] += len(batch)
+            totals["failed"] += summary["failed"]
+            totals["chunks"] += summary["chunks"]
+            totals["added"] += summary["added"]
+            totals["resumed"] += summary["resumed"]
+            totals["seconds"] += stats.elapsed
+            busy = ", ".join(f"{name} {stage['busy_seconds']:.1f}s" for name, stage in summary["stages"].items())
+            print(
+                f"  rows ..{last_row}: {len(batch)} URLs in {stats.elapsed:.1f}s "
+                f"({summary['urls_per_second']:.1f} URLs/s), {summary['chunks']} chunks, "
+                f"{summary['failed']} failed [{busy}]"
+            )
+            if stats.failures and retry_from is None:
+                retry_from = window_start
+                print(f"  failed URLs are retried next run; checkpoint stays at row {retry_from}")
+        checkpoints.save(input_path, last_row if retry_from is None else retry_from)
+        window_start = last_row
+        batch.clear()
+
+    for row_number, url in iter_urls_from_file(input_path, url_column):
+        if row_number <= start_row:
+            continue
+        last_row = row_number
+        normalized = normalize_url(url)
+        if normalized in seen or (not reimport and url in url_index):
+            totals["skipped"] += 1
+            continue
+        seen.add(normalized)
+        batch.append(url)
+        if len(batch) >= window:
+            flush()
+    flush()
+    return totals
+
+
+def get_args(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import URLs from CSV/TXT files into a user's vector store")
+    parser.add_argument('inputs', nargs='+', help="CSV or text files with URLs")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--store', help="Vector store path, e.g. ./vector_store_default")
+    target.add_argument('--user', help="User identifier; writes to ./vector_store_<user>")
+    parser.add_argument('--url-column', help="CSV column with the URLs (default: auto-detect)")
+    parser.add_argument('--category', help="Category applied to all URLs")
+    parser.add_argument('--tags', help="Comma-separated tags applied to all URLs")
+    parser.add_argument('--learning-path', help="Learning path applied to all URLs")
+    parser.add_argument('--window', type=int, default=500, help="URLs per checkpoint (default: 500)")
+    parser.add_argument('--batch-size', type=int, default=10, help="URLs per pipeline batch (default: 10)")
+    parser.add_argument('--delay', type=float, default=1.0, help="Seconds between requests to one domain")
+    parser.add_argument('--reimport', action='store_true', help="Also re-import URLs already in the store")
+    parser.add_argument('--restart', action='store_true', help="Ignore saved checkpoints for the inputs")
+    parser.add_argument('--failures', help="Append failed URLs to this CSV file")
+    args = parser.parse_args(argv)
+    if args.user is not None:
+        # Sanitized like the app's user ids, so the path stays a sibling store
+        args.user = safe_user_id(args.user)
+        if not args.user:
+            parser.error("--user must contain letters or digits")
+    return args
+
+
+def main(argv=None) -> int:
+    args = get_args(argv)
+    store_path = args.store or f"./vector_store_{args.user}"
+    tags = [tag.strip() for tag in args.tags.split(",")] if args.tags else None
+
+    store = SimpleVectorStore(store_path=store_path)
+    # The store keeps its URL index current as windows are written
+    url_index = store.url_index
+    checkpoints = Checkpoints(store_path)
+    ledger = ImportLedger.for_store(store_path)
+    pipeline = IngestPipeline(
+        store,
+        batch_size=args.batch_size,
+        scheduler=PolitenessScheduler(default_delay=args.delay),
+        default_category=args.category,
+        default_tags=tags,
+        learning_path=args.learning_path,
+        known_urls=url_index,
+        ledger=ledger,
+        skip_committed=not args.reimport
+    )
+
+    failures_handle = open(args.failures, 'a', newline='', encoding='utf-8') if args.failures else None
+    failures_file = csv.writer(failures_handle) if failures_handle else None
+    started = time.monotonic()
+    grand_total = {"urls": 0, "skipped": 0, "failed": 0, "chunks": 0, "added": 0, "resumed": 0}
+    try:
+        for input_path in args.inputs:
+            if args.restart:
+                checkpoints.reset(input_path)
+            print(f"Importing {input_path} into {store_path}")
+            try:
+                totals = ingest_file(
+                    input_path, pipeline, checkpoints, url_index,
+                    window=args.window,
+                    url_column=args.url_column,
+                    reimport=args.reimport,
+                    failures_file=failures_file
+                )
+            except (OSError, ValueError) as e:
+                print(f"Error reading {input_path}: {e}", file=sys.stderr)
+                return 1
+            for key in grand_total:
+                grand_total[key] += totals[key]
+    finally:
+        if failures_handle:
+            failures_handle.close()
+        ledger.close()
+
+    elapsed = time.monotonic() - started
+    print(
+        f"Done: {grand_total['urls']} URLs ({grand_total['skipped']} skipped, "
+        f"{grand_total['resumed']} already committed, {grand_total['failed']} failed), "
+        f"{grand_total['chunks']} chunks ({grand_total['added']} embedded) in {elapsed:.1f}s, "
+        f"{grand_total['urls'] / elapsed if elapsed else 0:.1f} URLs/s"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
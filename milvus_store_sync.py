@@ -4,6 +4,8 @@ from langchain_openai import OpenAIEmbeddings
 from langchain.docstore.document import Document
 from pymilvus import MilvusClient, DataType
 import numpy as np
+from simple_vector_store import INDEXED_FIELDS
+from utils.source_tracker import SourceDiff, diff_chunks
 
 try:
     import streamlit as st
@@ -11,6 +13,28 @@ try:
 except ImportError:
     HAS_STREAMLIT = False
 
+# Lower-cased copies of the indexed fields, stored with every row, so filters
+# match case-insensitively like SimpleVectorStore. Tags are kept as
+# ",ai,ml," so one tag is matched as a whole item.
+KEY_FIELDS = {field: f"{field}_key" for field in INDEXED_FIELDS}
+
+_KEY_NAMES = set(KEY_FIELDS.values())
+
+
+def _filter_keys(metadata: Dict[str, Any]) -> Dict[str, str]:
+    keys = {}
+    for field, key in KEY_FIELDS.items():
+        value = metadata.get(field)
+        if not value:
+            continue
+        if field == "tags":
+            tags = [tag.strip().lower() for tag in str(value).split(",") if tag.strip()]
+            keys[key] = f",{','.join(tags)},"
+        else:
+            keys[key] = str(value).strip().lower()
+    return keys
+
+
 class MilvusVectorStore:
     def __init__(
         self,
@@ -66,13 +90,19 @@ class MilvusVectorStore:
             )
             print(f"Created collection: {self.collection_name}")
 
-    def add_texts(self, texts: List[str], metadatas: Optional[List[dict]] = None) -> List[str]:
+    def add_texts(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ) -> List[str]:
         """Add texts to the vector store."""
         if not texts:
             return []
 
         # Generate embeddings
-        embeddings = self.embedding.embed_documents(texts)
+        if embeddings is None:
+            embeddings = self.embedding.embed_documents(texts)
 
         # Prepare data
         data = []
@@ -87,6 +117,7 @@ class MilvusVectorStore:
                 for key, value in metadatas[i].items():
                     # Convert non-string values to strings for VARCHAR compatibility
                     item[key] = str(value) if not isinstance(value, str) else value
+                item.update(_filter_keys(metadatas[i]))
 
             data.append(item)
 
@@ -98,13 +129,51 @@ class MilvusVectorStore:
 
         return result.get("ids", [])
 
-    def add_documents(self, documents: List[Document]) -> List[str]:
-        """Add documents to the vector store."""
-        texts = [doc.page_content for doc in documents]
-        metadatas = [doc.metadata for doc in documents]
-        return self.add_texts(texts, metadatas)
+    def add_documents(self, documents: List[Document], batch_size: int = 256) -> List[str]:
+        """Add documents with their metadata, embedding and inserting in batches."""
+        ids = []
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start:start + batch_size]
+            ids.extend(self.add_texts(
+                [doc.page_content for doc in batch],
+                [doc.metadata for doc in batch]
+            ))
+        return ids
+
+    @staticmethod
+    def _filter_expression(filter: Optional[Dict[str, Any]]) -> str:
+        """Translate a ``{field: value or [values]}`` filter into a Milvus expression.
+
+        Only INDEXED_FIELDS can be filtered on. Matching is case-insensitive
+        and tags match whole items, as in SimpleVectorStore; rows inserted
+        before the ``*_key`` fields were added do not match filters.
+        """
+        clauses = []
+        for field, value in (filter or {}).items():
+            if field not in KEY_FIELDS:
+                raise ValueError(f"Cannot filter on '{field}'; filterable fields: {', '.join(INDEXED_FIELDS)}")
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            escaped = [
+                str(v).strip().lower().replace("\\", "\\\\").replace('"', '\\"')
+                for v in values if v is not None
+            ]
+            if not escaped:
+                # An empty list matches nothing; key fields are never stored empty
+                escaped = [""]
+            key = KEY_FIELDS[field]
+            if field == "tags":
+                clause = " or ".join(f'{key} like "%,{v},%"' for v in escaped)
+            else:
+                clause = " or ".join(f'{key} == "{v}"' for v in escaped)
+            clauses.append(f"({clause})")
+        return " and ".join(clauses)
 
-    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
         """Perform similarity search."""
         # Generate query embedding
         query_embedding = self.embedding.embed_query(query)
@@ -114,6 +183,7 @@ class MilvusVectorStore:
             collection_name=self.collection_name,
             data=[query_embedding],
             limit=k,
+            filter=self._filter_expression(filter),
             output_fields=["text", "*"]  # Return text and all metadata fields
         )
 
@@ -127,14 +197,19 @@ class MilvusVectorStore:
                 # Extract metadata (exclude system fields)
                 metadata = {}
                 for key, value in entity.items():
-                    if key not in ["id", "vector", "text"]:
+                    if key not in ["id", "vector", "text"] and key not in _KEY_NAMES:
                         metadata[key] = value
 
                 documents.append(Document(page_content=text, metadata=metadata))
 
         return documents
 
-    def similarity_search_with_score(self, query: str, k: int = 4) -> List[tuple]:
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[tuple]:
         """Perform similarity search with scores."""
         # Generate query embedding
         query_embedding = self.embedding.embed_query(query)
@@ -144,6 +219,7 @@ class MilvusVectorStore:
             collection_name=self.collection_name,
             data=[query_embedding],
             limit=k,
+            filter=self._filter_expression(filter),
             output_fields=["text", "*"]
         )
 
@@ -158,7 +234,7 @@ class MilvusVectorStore:
                 # Extract metadata
                 metadata = {}
                 for key, value in entity.items():
-                    if key not in ["id", "vector", "text"]:
+                    if key not in ["id", "vector", "text"] and key not in _KEY_NAMES:
                         metadata[key] = value
 
                 doc = Document(page_content=text, metadata=metadata)
@@ -174,6 +250,58 @@ class MilvusVectorStore:
                 ids=ids
             )
 
+    def _source_chunks(self, source_url: str) -> Dict[str, Any]:
+        """Return chunk_hash -> id for the rows stored for a source."""
+        escaped = source_url.replace("\\", "\\\\").replace('"', '\\"')
+        rows = self.client.query(
+            collection_name=self.collection_name,
+            filter=f'source_url == "{escaped}"',
+            output_fields=["id", "chunk_hash"]
+        )
+        chunks = {}
+        for row in rows:
+            chunk_hash = row.get("chunk_hash")
+            if chunk_hash:
+                chunks[chunk_hash] = row["id"]
+        return chunks
+
+    def diff_source(
+        self,
+        source_url: str,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None
+    ) -> SourceDiff:
+        """Work out which chunks of a source need embedding, keeping or deleting."""
+        return diff_chunks(source_url, texts, self._source_chunks(source_url), metadatas)
+
+    def apply_source_diff(
+        self,
+        diff: SourceDiff,
+        embeddings: Optional[List[List[float]]] = None
+    ) -> List[Any]:
+        """Apply a SourceDiff, embedding only new or changed chunks."""
+        if diff.unchanged:
+            return list(diff.kept.values())
+
+        self.delete(diff.stale_ids)
+        new_ids = self.add_texts(diff.new_texts, diff.new_metadatas, embeddings=embeddings)
+        return list(diff.kept.values()) + list(new_ids)
+
+    def ingest_source(
+        self,
+        source_url: str,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None
+    ) -> SourceDiff:
+        """Incrementally (re-)ingest the chunks of one source.
+
+        Unchanged sources are a no-op; changed sources only embed new chunks
+        and delete the chunks that are no longer present.
+        """
+        diff = self.diff_source(source_url, texts, metadatas)
+        self.apply_source_diff(diff)
+        return diff
+
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get collection statistics."""
         try:
@@ -4,203 +4,355 @@ from PyPDF2 import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 import google.generativeai as genai
-from simple_vector_store import SimpleVectorStore as MilvusVectorStore
 import docx  # Import the python-docx library
-import pandas as pd
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-import assemblyai as aai
-from moviepy import VideoFileClip
 import boto3
 import os
 import tempfile
 import shutil
-from langchain_community.document_loaders import WebBaseLoader
+from contextlib import contextmanager
+from datetime import datetime
 import requests
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse
 from webcrawer import WebCrawler
-import yt_dlp as youtube_dl
 from utils.auth import require_login, show_user_info
 from utils.user_store import get_user_store_path, get_user_collection_name
+from utils.content_processor import chunk_documents, documents_from_records, process_urls_for_ingestion, ingest_documents
+from utils.duplicate_detector import URLIndex
+from utils.http_cache import cached_get
+from utils.html_parser import parse_html
+from utils.metadata_extractor import create_metadata
+from utils.spreadsheet_ingester import SpreadsheetStats, spreadsheet_documents
+from utils.upload_cache import UploadCache, UploadLedger, file_hash
+from utils.word_cloud import WordCounter, prerender, word_cloud_png
+from utils.transcription_jobs import (
+    ACTIVE_STATUSES as ACTIVE_TRANSCRIPTION_STATUSES, get_transcription_jobs, upload_audio,
+    youtube_audio, youtube_video_id
+)
+from langchain.docstore.document import Document
+from utils.crawl_frontier import CrawlFrontier
+from utils.url_discovery import discover_urls
+from utils.job_queue import get_store, store_lock
+from utils.politeness import PolitenessScheduler
 
 #configuring the google api key
 genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
 embedding = OpenAIEmbeddings(model="text-embedding-3-large")
 
-#tokens from https://www.assemblyai.com/ to transcribe the audio
-tokens = st.secrets["ASSEMBLYAI_API_KEY"]
 
-if 'status' not in st.session_state:
-    st.session_state['status'] = 'submitted'
+def get_pdf_documents(pdf_docs, refresh_metadata=False):
+    """Build one Document per new PDF, keeping its properties as metadata.
 
-session = requests.Session()
-session.headers.update({
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-    "Accept-Encoding": "identity"  # Disable compression to avoid garbled text
-})
-
-ydl_opts = {
-   'format': 'bestaudio/best',
-   'postprocessors': [{
-       'key': 'FFmpegExtractAudio',
-       'preferredcodec': 'mp3',
-       'preferredquality': '192',
-   }],
-   'ffmpeg-location': './',
-   'outtmpl': "./%(id)s.%(ext)s",
-}
+    PDFs already in the knowledge base are skipped; text extracted earlier
+    from the same bytes is reused.
+    """
+    documents = []
+    for pdf_doc in pdf_docs:
+        digest = file_hash(pdf_doc)
+        if skip_known_upload(digest, pdf_doc.name, refresh_metadata):
+            continue
+        extracted, _ = _upload_cache().get_or_compute(digest, "pdf", lambda: extract_pdf(pdf_doc))
+        metadata = dict(extracted['metadata'], filename=pdf_doc.name, file_hash=digest)
+        documents.append(file_document(with_filename(extracted['text'], pdf_doc.name), metadata))
+    
+    return documents
+
+
+def with_filename(text, filename):
+    """Extracted text headed by the document metadata block, starting with ``filename``."""
+    return f"\n\nDocument Metadata:\nFilename: {filename}\n" + text
+
+
+def extract_pdf(pdf_doc):
+    """Text (prefixed with the document properties but not the filename) and properties of one PDF."""
+    pdf = PdfReader(pdf_doc)
+    # Get document metadata (handle case where metadata is None)
+    doc_info = pdf.metadata or {}
+    metadata = {
+        'filename': pdf_doc.name,
+        'num_pages': len(pdf.pages),
+        'author': doc_info.get('/Author', 'N/A'),
+        'title': doc_info.get('/Title', 'N/A'),
+        'subject': doc_info.get('/Subject', 'N/A'),
+        'creator': doc_info.get('/Creator', 'N/A'),
+        'producer': doc_info.get('/Producer', 'N/A')
+    }
+    
+    # Add metadata to the text content; the filename is added by the caller,
+    # as the same bytes may be uploaded again under another name
+    text = f"Number of pages: {metadata['num_pages']}\n"
+    text += f"Author: {metadata['author']}\n"
+    text += f"Title: {metadata['title']}\n"
+    text += f"Subject: {metadata['subject']}\n"
+    text += f"Creator: {metadata['creator']}\n"
+    text += f"Producer: {metadata['producer']}\n"
+    text += f"\nDocument Content:\n"
+    
+    # Extract text from each page
+    for page in pdf.pages:
+        text += page.extract_text()
+    
+    return {'text': text, 'metadata': metadata}
+
+
+def extract_docx(doc):
+    """Text (prefixed with the document properties but not the filename) and properties of one .docx file."""
+    docx_file = docx.Document(doc)
+    # Get document metadata
+    core_properties = docx_file.core_properties
+    metadata = {
+        'filename': doc.name,
+        'author': core_properties.author or 'N/A',
+        'title': core_properties.title or 'N/A',
+        'subject': core_properties.subject or 'N/A',
+        'created': str(core_properties.created) if core_properties.created else 'N/A',
+        'modified': str(core_properties.modified) if core_properties.modified else 'N/A',
+        'last_modified_by': core_properties.last_modified_by or 'N/A'
+    }
+    
+    # Add metadata to the text content; the filename is added by the caller,
+    # as the same bytes may be uploaded again under another name
+    text = f"Author: {metadata['author']}\n"
+    text += f"Title: {metadata['title']}\n"
+    text += f"Subject: {metadata['subject']}\n"
+    text += f"Created: {metadata['created']}\n"
+    text += f"Modified: {metadata['modified']}\n"
+    text += f"Last Modified By: {metadata['last_modified_by']}\n"
+    text += f"\nDocument Content:\n"
+    
+    # Add document content
+    paragraphs = [p.text for p in docx_file.paragraphs]
+    text += "\n".join(paragraphs)
+    return {'text': text, 'metadata': metadata}
 
-transcript_endpoint = "https://api.assemblyai.com/v2/transcript"
-upload_endpoint = 'https://api.assemblyai.com/v2/upload'
 
-headers_auth_only = {'authorization': tokens}
-headers = {
-   "authorization": tokens,
-   "content-type": "application/json"
-}
-CHUNK_SIZE = 5242880
+def file_document(text, file_metadata, content_type="document"):
+    """Wrap uploaded content in a Document with standard learning-item metadata.
 
-@st.cache_data
-def transcribe_from_link(link, categories: bool):
-	_id = link.strip()
+    The file's own properties (filename, author, ...) are kept alongside.
+    """
+    title = file_metadata.get('title')
+    if title in (None, '', 'N/A'):
+        title = file_metadata.get('filename')
+    metadata = create_metadata(title=title, content=text, content_type=content_type)
+    for key, value in file_metadata.items():
+        if value not in (None, '', 'N/A') and key not in metadata:
+            metadata[key] = value if isinstance(value, (str, int, float, bool)) else str(value)
+    return Document(page_content=text, metadata=metadata)
 
-	def get_vid(_id):
-		with youtube_dl.YoutubeDL(ydl_opts) as ydl:
-			return ydl.extract_info(_id)
 
-	# download the audio of the YouTube video locally
-	meta = get_vid(_id)
-	save_location = meta['id'] + ".mp3"
+def get_text_chunks(text):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=1000)
+    chunks = splitter.split_text(text)
+    return chunks   
 
-	st.write('Saved mp3 to', save_location)
+def _store_path(collection_name=None):
+    # Use user-specific store path
+    if collection_name is None:
+        return get_user_store_path("./vector_store")
+    return f"./vector_store_{collection_name}"
 
-	def read_file(filename):
-		with open(filename, 'rb') as _file:
-			while True:
-				data = _file.read(CHUNK_SIZE)
-				if not data:
-					break
-				yield data
+def _load_vector_store(collection_name=None):
+    """Load the user-specific vector store, up to date with every writer.
+    
+    The instance is shared with the background workers (see
+    ``utils.job_queue.get_store``); write to it only through ``_writable_store``.
+    
+    Args:
+        collection_name: Optional collection name (if None, uses user-specific name)
+    """
+    store_path = _store_path(collection_name)
+    vector_store = get_store(store_path)
+    with store_lock(store_path):
+        vector_store.refresh()
+    return vector_store
 
+@contextmanager
+def _writable_store(collection_name=None):
+    """The user's shared store, locked and reloaded for a write.
 
-	# upload audio file to AssemblyAI
-	upload_response = requests.post(
-		upload_endpoint,
-		headers=headers_auth_only, data=read_file(save_location)
-	)
+    Workers and transcription jobs write the same files; each save rewrites
+    the whole store, so writing an outdated copy would drop their chunks.
+    """
+    store_path = _store_path(collection_name)
+    vector_store = get_store(store_path)
+    with store_lock(store_path):
+        vector_store.refresh()
+        yield vector_store
 
-	audio_url = upload_response.json()['upload_url']
-	print('Uploaded to', audio_url)
 
-	# start the transcription of the audio file
-	transcript_request = {
-		'audio_url': audio_url,
-		'iab_categories': 'True' if categories else 'False',
-	}
+def _safe_save_vector_store(vector_store, collection_name="personal_assistant"):
+    """Milvus automatically persists data, no manual save needed."""
+    pass
 
-	transcript_response = requests.post(transcript_endpoint, json=transcript_request, headers=headers)
 
-	# this is the id of the file that is being transcribed in the AssemblyAI servers
-	# we will use this id to access the completed transcription
-	transcript_id = transcript_response.json()['id']
-	polling_endpoint = transcript_endpoint + "/" + transcript_id
+def get_vector_store(text_chunks):
+    with _writable_store() as vector_store:
+        vector_store.add_texts(text_chunks)
+    return vector_store
 
-	print("Transcribing at", polling_endpoint)
+def add_documents_to_store(documents, chunk=True, word_counter=None):
+    """Add documents to the user's store, keeping their metadata on every chunk.
 
-	return polling_endpoint
+    Chunks are embedded in large batches and the store is saved once. With a
+    ``word_counter`` the text is counted while chunking and its word cloud
+    renders in the background during embedding.
+    """
+    if chunk:
+        documents = chunk_documents(documents, word_counter=word_counter)
+    elif word_counter is not None:
+        for doc in documents:
+            word_counter.update(doc.page_content)
+    if word_counter is not None:
+        prerender(word_counter.top())
+    with _writable_store() as vector_store:
+        vector_store.add_documents(documents)
+        record_uploads(vector_store.store_path, count_upload_chunks(documents))
+    return vector_store
 
-def get_status(polling_endpoint):
-	polling_response = requests.get(polling_endpoint, headers=headers)
-	st.session_state['status'] = polling_response.json()['status']
+def count_upload_chunks(documents, counts=None):
+    """Chunks per uploaded file (by file_hash), with the file's name and type."""
+    counts = {} if counts is None else counts
+    for doc in documents:
+        digest = doc.metadata.get('file_hash')
+        if digest:
+            entry = counts.setdefault(digest, {
+                'filename': doc.metadata.get('filename', ''),
+                'type': doc.metadata.get('type', 'document'),
+                'chunks': 0
+            })
+            entry['chunks'] += 1
+    return counts
+
+def record_uploads(store_path, counts):
+    """Add processed files to the store's upload ledger so re-uploads are skipped."""
+    if not counts:
+        return
+    ledger = UploadLedger.for_store(store_path)
+    for digest, entry in counts.items():
+        ledger.record(digest, entry['filename'], entry['type'], entry['chunks'])
 
-def refresh_state():
-	st.session_state['status'] = 'submitted'
+def skip_known_upload(digest, filename, refresh_metadata=False):
+    """Return True if this exact file is already in the user's knowledge base.
 
+    With ``refresh_metadata`` the stored chunks get the new filename and an
+    updated date; nothing is extracted or embedded again.
+    """
+    ledger = UploadLedger.for_store(get_user_store_path("./vector_store"))
+    entry = ledger.get(digest)
+    if entry is None:
+        return False
+    if refresh_metadata:
+        with _writable_store() as vector_store:
+            updated = vector_store.update_metadata(
+                {'file_hash': digest},
+                {'filename': filename, 'updated_date': datetime.now().isoformat()}
+            )
+            ledger.touch(digest, filename)
+        st.info(f"{filename} is already in your knowledge base; refreshed the metadata of {updated} chunks")
+    else:
+        st.info(f"{filename} is already in your knowledge base (added {entry['added'][:10]} as {entry['filename']}), skipped")
+    return True
 
+def _upload_cache():
+    return UploadCache(os.getenv("UPLOAD_CACHE_DIR", "./upload_cache"))
 
-def get_pdf_text(pdf_docs):
-    text = ""
-    metadata_list = []
-    for pdf_doc in pdf_docs:
-        pdf = PdfReader(pdf_doc)
-        # Get document metadata (handle case where metadata is None)
-        doc_info = pdf.metadata or {}
-        metadata = {
-            'filename': pdf_doc.name,
-            'num_pages': len(pdf.pages),
-            'author': doc_info.get('/Author', 'N/A'),
-            'title': doc_info.get('/Title', 'N/A'),
-            'subject': doc_info.get('/Subject', 'N/A'),
-            'creator': doc_info.get('/Creator', 'N/A'),
-            'producer': doc_info.get('/Producer', 'N/A')
-        }
-        metadata_list.append(metadata)
-        
-        # Add metadata to the text content
-        text += f"\n\nDocument Metadata:\n"
-        text += f"Filename: {metadata['filename']}\n"
-        text += f"Number of pages: {metadata['num_pages']}\n"
-        text += f"Author: {metadata['author']}\n"
-        text += f"Title: {metadata['title']}\n"
-        text += f"Subject: {metadata['subject']}\n"
-        text += f"Creator: {metadata['creator']}\n"
-        text += f"Producer: {metadata['producer']}\n"
-        text += f"\nDocument Content:\n"
-        
-        # Extract text from each page
-        for page in pdf.pages:
-            text += page.extract_text()
-    
-    return text, metadata_list
+def add_document_stream(documents, batch_size=256):
+    """Add already-chunked documents from an iterator, a batch at a time.
 
+    Only one batch is held in memory; the store is saved once at the end.
+    """
+    batch = []
+    counts = {}
+    with _writable_store() as vector_store:
+        with vector_store.deferred_saves():
+            for doc in documents:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    vector_store.add_documents(batch)
+                    count_upload_chunks(batch, counts)
+                    batch = []
+            if batch:
+                vector_store.add_documents(batch)
+                count_upload_chunks(batch, counts)
+        record_uploads(vector_store.store_path, counts)
+    return vector_store
 
-def get_text_chunks(text):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=5000, chunk_overlap=1000)
-    chunks = splitter.split_text(text)
-    return chunks   
+def ingest_source_documents(documents):
+    """Incrementally ingest chunked documents, grouped by their source URL.
 
-def _load_vector_store(collection_name=None):
-    """Load the user-specific vector store.
-    
-    Args:
-        collection_name: Optional collection name (if None, uses user-specific name)
+    Returns:
+        dict with counts of added, kept and removed chunks and unchanged sources
     """
-    # Use user-specific store path
-    if collection_name is None:
-        store_path = get_user_store_path("./vector_store")
-    else:
-        store_path = f"./vector_store_{collection_name}"
-    
-    try:
-        return MilvusVectorStore(store_path=store_path)
-    except Exception as e:
-        print(f"Error loading vector store: {e}. Creating new store.")
-        return MilvusVectorStore.from_texts(
-            texts=get_text_chunks("Loading some documents first"),
-            store_path=store_path
-        )
+    with _writable_store() as vector_store:
+        return ingest_documents(vector_store, documents)
 
+def get_current_store():
+    return _load_vector_store()
 
-def _safe_save_vector_store(vector_store, collection_name="personal_assistant"):
-    """Milvus automatically persists data, no manual save needed."""
-    pass
+def show_word_cloud(word_counter):
+    """Show the word cloud of everything counted, after ingestion has been reported.
 
+    Rendering starts in the background as soon as chunking is done and is
+    cached by the word counts, so this rarely waits.
+    """
+    png = word_cloud_png(word_counter.top())
+    if png:
+        st.image(png)
 
-def get_vector_store(text_chunks):
-    vector_store = _load_vector_store()
-    vector_store.add_texts(text_chunks)
-    return vector_store
+def _transcription_jobs():
+    return get_transcription_jobs(st.secrets.get("ASSEMBLYAI_API_KEY"))
 
-def get_current_store():
-    return _load_vector_store()
+def submit_transcription(key, kind, source, prepare, metadata):
+    """Queue media for background transcription into the user's store.
 
-def generate_word_cloud(text):
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    plt.tight_layout(pad=0)
-    return plt
+    The transcript is ingested automatically once it is ready; media
+    transcribed before (same bytes or YouTube video) reuses its transcript.
+    """
+    job_id = _transcription_jobs().submit(
+        key, kind, source, get_user_store_path("./vector_store"), prepare, metadata
+    )
+    st.success(f"{source} queued for transcription (job #{job_id}); it is added to your knowledge base when ready")
+    return job_id
+
+def show_transcription_jobs():
+    """List this user's recent transcriptions; active ones refresh until they finish."""
+    jobs = _transcription_jobs().list_jobs(get_user_store_path("./vector_store"), limit=5)
+    if not jobs:
+        return
+    st.subheader("Transcriptions")
+    for job in jobs:
+        polling = job["status"] in ACTIVE_TRANSCRIPTION_STATUSES
+        st.fragment(transcription_progress, run_every=3 if polling else None)(job["id"], polling)
+
+def transcription_progress(job_id, polling):
+    jobs = _transcription_jobs()
+    job = jobs.get_job(job_id)
+    active = job["status"] in ACTIVE_TRANSCRIPTION_STATUSES
+    if polling and not active:
+        # Job just finished: rerun the page so this panel stops polling
+        st.rerun()
+
+    with st.expander(f"#{job_id} {job['source']} · {job['status']}", expanded=active):
+        if active:
+            progress = jobs.segment_progress(job_id)
+            if job["segments"] > 1:
+                st.progress(progress["ingested"] / job["segments"])
+                st.caption(
+                    f"{progress['ingested']} of {job['segments']} segments added to your knowledge base, "
+                    f"{progress['processing']} transcribing; you can keep using the app"
+                )
+            else:
+                st.caption("Transcribing in the background; you can keep using the app")
+        elif job["error"]:
+            st.error(job["error"])
+        else:
+            st.success(f"Text added to knowledge base successfully ({job['chunks']} chunks)")
+            transcript = jobs.cache.get(job["key"], "transcript")
+            if transcript:
+                st.text_area("Transcription", transcript["text"], height=200, key=f"transcript_{job_id}")
+                word_counter = WordCounter()
+                word_counter.update(transcript["text"])
+                show_word_cloud(word_counter)
 
 def upload_vector_store_to_s3():
     # Milvus data is managed by the Milvus server
@@ -230,31 +382,17 @@ def upload_file_to_s3(local_file_path, bucket_name, s3_key):
    
 def get_urls(url): 
     urls=[] 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Accept-Encoding": "identity"  # Disable compression to avoid garbled text
-    }
-    # Getting the request from the URL
-    r = requests.get(url, headers=headers)
-    r.raise_for_status()  # Raise exception for bad status codes
-    
-    # Handle encoding explicitly
-    if r.encoding is None:
-        r.encoding = 'utf-8'
+    # Getting the request from the URL (revalidated against the HTTP cache)
+    r = cached_get(url)
+    if not r.ok:
+        raise requests.HTTPError(f"HTTP {r.status} for url: {url}")
         
     # converting the text 
     print(f"Processing url {url}")
-    s = BeautifulSoup(r.text,"html.parser")    
-    for i in s.find_all("a"):    
-        print(i)     
-        if 'href' in i.attrs:   
-            href = i.attrs['href']            
-            if href.startswith("/"):            
-                site = url+href 
-                print(site)               
-                if site not in  urls: 
-                    urls.append(site)  
-                    print(url) 
+    site = urlparse(url).netloc
+    for link in parse_html(r.text, base_url=url).links:
+        if urlparse(link).netloc == site and link not in urls:
+            urls.append(link)
     return urls
 
 
@@ -269,6 +407,11 @@ def main():
     st.title("Knowledge Assistant")
     st.header("Adding Documents to your knowledge base")
     st.write("Upload some documents to get started")
+    refresh_metadata = st.checkbox(
+        "Refresh metadata of files already in the knowledge base",
+        value=False,
+        help="Files are recognized by their content; re-uploads are never processed or embedded again"
+    )
 
    
     st.header("Adding PDF Documents")
@@ -276,23 +419,26 @@ def main():
     if st.button("Submit & Process"):
         with st.spinner("Processing your PDF documents..."):
             if pdf_docs:
-                text, metadata_list = get_pdf_text(pdf_docs)
+                documents = get_pdf_documents(pdf_docs, refresh_metadata)
+                if not documents:
+                    st.success("All PDFs are already in your knowledge base")
+                else:
                 
-                # Display metadata for each PDF
-                for metadata in metadata_list:
-                    with st.expander(f"Metadata for {metadata['filename']}"):
-                        st.write(f"Number of pages: {metadata['num_pages']}")
-                        st.write(f"Author: {metadata['author']}")
-                        st.write(f"Title: {metadata['title']}")
-                        st.write(f"Subject: {metadata['subject']}")
-                        st.write(f"Creator: {metadata['creator']}")
-                        st.write(f"Producer: {metadata['producer']}")
+                    # Display metadata for each PDF
+                    for doc in documents:
+                        metadata = doc.metadata
+                        with st.expander(f"Metadata for {metadata['filename']}"):
+                            st.write(f"Number of pages: {metadata['num_pages']}")
+                            st.write(f"Author: {metadata.get('author', 'N/A')}")
+                            st.write(f"Title: {metadata.get('title', 'N/A')}")
+                            st.write(f"Subject: {metadata.get('subject', 'N/A')}")
+                            st.write(f"Creator: {metadata.get('creator', 'N/A')}")
+                            st.write(f"Producer: {metadata.get('producer', 'N/A')}")
                 
-                text_chunks = get_text_chunks(text)
-                get_vector_store(text_chunks)
-                wordcloud_plot = generate_word_cloud(text)
-                st.pyplot(wordcloud_plot)
-                st.success("Documents processed successfully")
+                    word_counter = WordCounter()
+                    add_documents_to_store(documents, word_counter=word_counter)
+                    st.success("Documents processed successfully")
+                    show_word_cloud(word_counter)
 
     st.header("Adding Word or Text Documents")
     word_docs = st.file_uploader("Upload your knowledge base document", type=["docx", "txt"], accept_multiple_files=True)
@@ -302,37 +448,15 @@ def main():
                 all_files = []
                 for doc in word_docs:
                     st.write(f"Processing {doc.name} ... ")
+                    digest = file_hash(doc)
+                    if skip_known_upload(digest, doc.name, refresh_metadata):
+                        continue
                     if doc.name.lower().endswith(".docx"):
-                        # Open the file using docx.Document
                         try:
-                            docx_file = docx.Document(doc)
-                            # Get document metadata
-                            core_properties = docx_file.core_properties
-                            metadata = {
-                                'filename': doc.name,
-                                'author': core_properties.author or 'N/A',
-                                'title': core_properties.title or 'N/A',
-                                'subject': core_properties.subject or 'N/A',
-                                'created': str(core_properties.created) if core_properties.created else 'N/A',
-                                'modified': str(core_properties.modified) if core_properties.modified else 'N/A',
-                                'last_modified_by': core_properties.last_modified_by or 'N/A'
-                            }
-                            
-                            # Add metadata to the text content
-                            text = f"\n\nDocument Metadata:\n"
-                            text += f"Filename: {metadata['filename']}\n"
-                            text += f"Author: {metadata['author']}\n"
-                            text += f"Title: {metadata['title']}\n"
-                            text += f"Subject: {metadata['subject']}\n"
-                            text += f"Created: {metadata['created']}\n"
-                            text += f"Modified: {metadata['modified']}\n"
-                            text += f"Last Modified By: {metadata['last_modified_by']}\n"
-                            text += f"\nDocument Content:\n"
-                            
-                            # Add document content
-                            paragraphs = [p.text for p in docx_file.paragraphs]
-                            text += "\n".join(paragraphs)
-                            all_files.append(text)
+                            extracted, _ = _upload_cache().get_or_compute(digest, "docx", lambda: extract_docx(doc))
+                            metadata = dict(extracted['metadata'], filename=doc.name)
+                            text = with_filename(extracted['text'], doc.name)
+                            all_files.append(file_document(text, dict(metadata, file_hash=digest)))
                             
                             # Display metadata in expander
                             with st.expander(f"Metadata for {metadata['filename']}"):
@@ -359,7 +483,7 @@ def main():
                         
                         # Add document content
                         text += doc.read().decode("utf-8", errors="replace")
-                        all_files.append(text)
+                        all_files.append(file_document(text, dict(metadata, file_hash=digest)))
                         
                         # Display metadata in expander
                         with st.expander(f"Metadata for {metadata['filename']}"):
@@ -367,12 +491,13 @@ def main():
                                 st.write(f"{key.replace('_', ' ').title()}: {value}")
                     else:
                         raise NotImplementedError(f"File type {doc.name.split('.')[-1]} not supported")
-                all_texts = "\n".join(all_files)
-                text_chunks = get_text_chunks(all_texts)
-                get_vector_store(text_chunks)
-                wordcloud_plot = generate_word_cloud(all_texts)
-                st.pyplot(wordcloud_plot)
-                st.success("Documents processed successfully")
+                if not all_files:
+                    st.success("All documents are already in your knowledge base")
+                else:
+                    word_counter = WordCounter()
+                    add_documents_to_store(all_files, word_counter=word_counter)
+                    st.success("Documents processed successfully")
+                    show_word_cloud(word_counter)
 
 
     st.header("Adding Excel Documents")
@@ -380,143 +505,155 @@ def main():
     if st.button("Submit & Process Excel"):
         with st.spinner("Processing your excel documents..."):
             if excel_file:
-                # Read Excel file
-                df = pd.read_excel(excel_file)
+                digest = file_hash(excel_file)
+                if not skip_known_upload(digest, excel_file.name, refresh_metadata):
+                    # Stream every sheet row by row into compact row-group chunks
+                    stats = SpreadsheetStats()
+                    base_metadata = create_metadata(title=excel_file.name, content_type="document")
+                    base_metadata.update({'filename': excel_file.name, 'file_hash': digest})
+                    documents = spreadsheet_documents(excel_file, base_metadata, stats=stats)
+                    add_document_stream(documents)
                 
-                # Get Excel metadata
-                metadata = {
-                    'filename': excel_file.name,
-                    'type': 'Excel File',
-                    'size': f"{len(excel_file.getvalue())} bytes",
-                    'sheets': len(df.sheet_names) if hasattr(df, 'sheet_names') else 1,
-                    'rows': len(df),
-                    'columns': len(df.columns),
-                    'column_names': ', '.join(df.columns.tolist())
-                }
-                
-                # Add metadata to the text content
-                text = f"\n\nDocument Metadata:\n"
-                text += f"Filename: {metadata['filename']}\n"
-                text += f"Type: {metadata['type']}\n"
-                text += f"Size: {metadata['size']}\n"
-                text += f"Number of Sheets: {metadata['sheets']}\n"
-                text += f"Number of Rows: {metadata['rows']}\n"
-                text += f"Number of Columns: {metadata['columns']}\n"
-                text += f"Column Names: {metadata['column_names']}\n"
-                text += f"\nDocument Content:\n"
-                
-                # Add Excel content
-                text += df.to_string()
-                
-                # Display metadata in expander
-                with st.expander(f"Metadata for {metadata['filename']}"):
-                    for key, value in metadata.items():
-                        st.write(f"{key.replace('_', ' ').title()}: {value}")
+                    metadata = {
+                        'filename': excel_file.name,
+                        'type': 'Excel File',
+                        'size': f"{excel_file.size} bytes",
+                        'sheets': ', '.join(stats.sheets),
+                        'rows': stats.rows,
+                        'chunks': stats.chunks,
+                    }
+                    with st.expander(f"Metadata for {metadata['filename']}"):
+                        for key, value in metadata.items():
+                            st.write(f"{key.replace('_', ' ').title()}: {value}")
+                        for sheet, columns in stats.columns.items():
+                            st.write(f"Columns in {sheet}: {', '.join(columns)}")
                 
-                text_chunks = get_text_chunks(text)
-                get_vector_store(text_chunks)
-                st.success("Documents processed successfully")
+                    st.success("Documents processed successfully")
 
     st.header("URL fetcher")
     url = st.text_input("Enter the URL")
-    max_depth = st.number_input("Enter the depth you want to crawel, default is 1, max_value is 3", value=1, max_value=3)
+    discovery_mode = st.radio(
+        "How should pages be discovered?",
+        ["Crawl links", "Sitemap / RSS feed"],
+        horizontal=True,
+        help="Sitemaps and feeds list a site's pages in a few requests instead of fetching every page"
+    )
+    if discovery_mode == "Crawl links":
+        max_depth = st.number_input("Enter the depth you want to crawel, default is 1, max_value is 3", value=1, max_value=3)
+    else:
+        modified_since = st.date_input("Only pages modified since (optional)", value=None)
+    max_pages = st.number_input("Maximum number of pages to crawl", value=200, min_value=1, max_value=5000)
+    if discovery_mode == "Crawl links":
+        restart_crawl = st.checkbox("Start over (discard saved progress for this URL)", value=False)
     if st.button("Submit & Process URL"):
         with st.spinner("Processing your URL..."):
-            crawler = WebCrawler(url = url, max_depth=max_depth)     
-            urls = crawler.start_crawling(url=url)
+            store_path = get_user_store_path("./vector_store")
+            # Pages already in the repository that revalidate as unchanged are skipped
+            url_index = URLIndex.for_store(store_path)
+            pending = []
+            word_counter = WordCounter()
+            totals = {"added": 0, "kept": 0, "removed": 0, "unchanged_sources": 0}
+            progress_text = st.empty()
+
+            def ingest(loaded_docs):
+                chunks = chunk_documents(loaded_docs, word_counter=word_counter)
+                for key, value in ingest_source_documents(chunks).items():
+                    totals[key] += value
+                progress_text.text(f"{word_counter.documents} pages ingested...")
+
+            if discovery_mode == "Crawl links":
+                # Frontier is persisted next to the user's store, so an interrupted crawl resumes
+                frontier = CrawlFrontier(os.path.join(store_path, "crawl_frontier.db"))
+
+                def flush():
+                    # Reuse the crawler's response bodies instead of downloading every page again
+                    documents = documents_from_records(pending, known_urls=url_index)
+                    ingest(documents)
+                    # Failed and non-HTML pages stay unfinished, so a resumed crawl retries them
+                    done = {doc.metadata['source'] for doc in documents}
+                    done.update(
+                        record.url for record in pending
+                        if record.ok and getattr(record, 'unchanged', False) and record.url in url_index
+                    )
+                    frontier.mark_ingested(crawler.crawl_id, done)
+                    pending.clear()
+
+                def on_record(record):
+                    pending.append(record)
+                    if len(pending) >= 20:
+                        flush()
+
+                crawler = WebCrawler(
+                    url = url, max_depth=max_depth, max_pages=max_pages,
+                    frontier=frontier, on_record=on_record, restart=restart_crawl
+                )
+                urls = crawler.start_crawling(url=url)
+                flush()
+                crawl_status = frontier.status_counts(crawler.crawl_id)
+            else:
+                since = datetime.combine(modified_since, datetime.min.time()) if modified_since else None
+                discovered = discover_urls(url, since=since, max_urls=max_pages)
+                urls = [page.url for page in discovered]
+                if not urls:
+                    st.warning("No sitemap or feed entries found for this site. Try crawling links instead.")
+                # One scheduler for the whole run, so per-domain pacing carries across batches
+                scheduler = PolitenessScheduler()
+                for start in range(0, len(urls), 20):
+                    ingest(process_urls_for_ingestion(
+                        urls[start:start + 20], known_urls=url_index, scheduler=scheduler
+                    ))
+                crawl_status = {"discovered": len(urls)}
+
             with st.expander("URL processed and added"):
                 st.text_area("URLs", "\n".join(list(urls)))
-
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-                "Accept-Language": "en-US,en;q=0.9",
-                "Accept-Encoding": "identity",  # Disable compression to avoid garbled text
-                "Connection": "keep-alive"
-            }         
-
-            loader = WebBaseLoader(
-                    web_path = list(urls),
-                    header_template=headers,
-                    continue_on_failure = True,
-                    show_progress = True)
-            all_texts = [doc.page_content for doc in loader.load()]
-            text = "\n".join(all_texts)
-            # print(text)
-            wordcloud_plot = generate_word_cloud(text)
-            st.pyplot(wordcloud_plot)
-            text_chunks = get_text_chunks(text)
-            get_vector_store(text_chunks)
-            st.success("URL processed successfully")         
+                st.write(crawl_status)
+
+            st.success("URL processed successfully")
+            st.write(
+                f"{totals['added']} chunks embedded, {totals['kept']} unchanged, "
+                f"{totals['removed']} stale chunks removed"
+            )
+            show_word_cloud(word_counter)         
     
     
     st.header("Audio support")
     audio = st.file_uploader("Update your knowledge base using Audio", type=["mp3"], accept_multiple_files=False)
     if st.button("Submit & Transcribe Audio"):
-        with st.spinner("Processing your audio..."):
-            if audio:
-                st.success("Audio processed successfully")  
-                #data = englishTranscription.start_transcription(uploaded_file, tokens)
-                transcriber = aai.Transcriber()
-                data = transcriber.transcribe(audio)
-                with st.expander("View Transcription", expanded=False):
-                    st.text_area("Transcription", data.text, height=300)
-                wordcloud_plot = generate_word_cloud(data.text)
-                st.pyplot(wordcloud_plot)
-                st.write("Adding the audio text to the knowledge base")
-                text_chunks = get_text_chunks(data.text)
-                get_vector_store(text_chunks)
-                st.success("Text added to knowledge base successfully")
-                
- 
+        if audio:
+            digest = file_hash(audio)
+            if not skip_known_upload(digest, audio.name, refresh_metadata):
+                # Identical audio is only ever transcribed once
+                submit_transcription(
+                    digest, "audio", audio.name, upload_audio(audio, audio.name),
+                    {'filename': audio.name, 'file_hash': digest}
+                )
+
+
     st.header("Video support")
     video = st.file_uploader("Update your knowledge base using Video", type=["mp4"], accept_multiple_files=False)
     if st.button("Submit & Process Video"):
-        with st.spinner("Processing your video..."):
-            if video:
-                # https://www.bannerbear.com/blog/how-to-use-whisper-api-to-transcribe-videos-python-tutorial/
-                bytes_data = video.getvalue()
-                with open(video.name, 'wb') as f:
-                    f.write(bytes_data)
-                st.write("Video file saved successfully!")
-                videoClip = VideoFileClip(video.name) 
-                audio = videoClip.audio 
-                audioFile =video.name.split(".")[0] + ".mp3"
-                audio.write_audiofile(audioFile) 
-                transcriber = aai.Transcriber()
-                data = transcriber.transcribe(audioFile)
-                st.write("Adding the audio text to the knowledge base")
-                with st.expander("View Transcription", expanded=False):
-                    st.text_area("Transcription", data.text, height=300)
-                wordcloud_plot = generate_word_cloud(data.text)
-                st.pyplot(wordcloud_plot)
-                text_chunks = get_text_chunks(data.text)
-                get_vector_store(text_chunks)
-                st.success("Text added to knowledge base successfully")
-                st.write("")
+        if video:
+            digest = file_hash(video)
+            if not skip_known_upload(digest, video.name, refresh_metadata):
+                # Only the extracted audio track is uploaded for transcription
+                submit_transcription(
+                    digest, "video", video.name, upload_audio(video, video.name, extract=True),
+                    {'filename': video.name, 'file_hash': digest}
+                )
 
 
     st.header("Youtube Video Transcribe")
     st.write("[Note: only work locally because ffmpeg is not avaialbe in the server]")
-    link = st.text_input('Enter your YouTube video link', on_change=refresh_state)
-    if link:
-        #st.video(link)
-        st.text("The transcription is " + st.session_state['status'])
-        polling_endpoint = transcribe_from_link(link, False)
-        st.button('check_status', on_click=get_status, args=(polling_endpoint,))
-        transcript=''
-        if st.session_state['status']=='completed':
-            polling_response = requests.get(polling_endpoint, headers=headers)
-            transcript = polling_response.json()['text']
-
-            with st.expander("click to read the content:"):
-                st.text_area(transcript)
-            wordcloud_plot = generate_word_cloud(transcript)
-            st.pyplot(wordcloud_plot)
-            st.write("Adding the audio text to the knowledge base")
-            text_chunks = get_text_chunks(transcript)
-            get_vector_store(text_chunks)
-            st.success("Text from Youtube video added to knowledge base successfully")
-           
+    link = st.text_input('Enter your YouTube video link')
+    if st.button("Submit & Transcribe Video") and link:
+        link = link.strip()
+        key = f"youtube_{youtube_video_id(link)}"
+        # A transcribed video is in the upload ledger; its cached transcript
+        # would otherwise be ingested again
+        if not skip_known_upload(key, link):
+            submit_transcription(key, "video", link, youtube_audio(link), {'url': link})
+
+    show_transcription_jobs()
 
 
     st.write("This is how to setup secrets in streamlit at local environment https://docs.streamlit.io/develop/concepts/connections/secrets-management")
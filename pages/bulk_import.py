@@ -2,10 +2,14 @@
 import streamlit as st
 import pandas as pd
 from typing import List
-from pages.app_admin import get_vector_store, get_text_chunks
-from utils.content_processor import process_urls_for_ingestion, chunk_documents
-from utils.duplicate_detector import detect_duplicate_urls
+from datetime import datetime
+from utils.job_queue import get_job_queue, start_workers, ACTIVE_JOB_STATUSES
+from utils.ingest_pipeline import STAGES
+from utils.duplicate_detector import detect_duplicate_urls, split_existing_urls, URLIndex
 from utils.auth import require_login, show_user_info
+from utils.user_store import get_user_store_path
+from utils.politeness import interleave_by_domain
+from utils.url_discovery import discover_urls
 from langchain.docstore.document import Document
 
 # Pre-defined categories
@@ -24,6 +28,11 @@ CATEGORIES = [
     "General"
 ]
 
+@st.cache_data(ttl=600, show_spinner="Reading sitemaps and feeds...")
+def discover_site(site_url: str, since, max_urls: int):
+    """Discover a site's pages once per input instead of on every rerun."""
+    return discover_urls(site_url, since=since, max_urls=max_urls)
+
 def main():
     # Check authentication
     if not require_login("Bulk URL Import"):
@@ -59,7 +68,7 @@ def main():
     # Input method selection
     input_method = st.radio(
         "How would you like to add URLs?",
-        ["Paste URLs", "Upload CSV File", "Upload Text File"],
+        ["Paste URLs", "Upload CSV File", "Upload Text File", "Discover from Sitemap/Feed"],
         horizontal=True
     )
     
@@ -100,6 +109,24 @@ def main():
             content = text_file.read().decode("utf-8")
             urls = [url.strip() for url in content.split("\n") if url.strip()]
     
+    elif input_method == "Discover from Sitemap/Feed":
+        site_url = st.text_input(
+            "Site URL",
+            placeholder="https://docs.example.com"
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            modified_since = st.date_input("Only pages modified since (optional)", value=None)
+        with col2:
+            max_discovered = st.number_input("Maximum URLs", value=500, min_value=1, max_value=10000)
+        if site_url:
+            since = datetime.combine(modified_since, datetime.min.time()) if modified_since else None
+            discovered = discover_site(site_url.strip(), since, int(max_discovered))
+            if discovered:
+                urls = [page.url for page in discovered]
+            else:
+                st.warning("No sitemap or RSS/Atom feed found for this site")
+    
     # Display URLs to be imported
     if urls:
         st.subheader(f"📋 Found {len(urls)} URLs")
@@ -113,6 +140,23 @@ def main():
                 for dup in duplicates:
                     st.text(dup)
         
+        # Check against URLs already in the user's repository
+        url_index = URLIndex.for_store(get_user_store_path("./vector_store"))
+        new_urls, existing_urls = split_existing_urls(unique_urls, url_index)
+        reimport_existing = False
+        
+        if existing_urls:
+            st.warning(f"📚 {len(existing_urls)} URLs are already in repository")
+            with st.expander("View URLs already in repository"):
+                for existing_url in existing_urls:
+                    st.text(existing_url)
+            reimport_existing = st.checkbox(
+                "Re-import URLs already in repository (only changed content is re-embedded)",
+                value=False
+            )
+            if not reimport_existing:
+                unique_urls = new_urls
+        
         st.info(f"✅ {len(unique_urls)} unique URLs will be imported")
         
         # Preview URLs
@@ -128,65 +172,89 @@ def main():
                 st.error("No URLs to import")
                 return
             
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            try:
-                # Process URLs in batches
-                batch_size = 10
-                total_batches = (len(unique_urls) + batch_size - 1) // batch_size
-                
-                all_documents = []
-                
-                for batch_idx in range(total_batches):
-                    batch_urls = unique_urls[batch_idx * batch_size:(batch_idx + 1) * batch_size]
-                    
-                    status_text.text(f"Processing batch {batch_idx + 1}/{total_batches} ({len(batch_urls)} URLs)...")
-                    
-                    # Process batch
-                    documents = process_urls_for_ingestion(
-                        batch_urls,
-                        default_category=default_category if default_category != "General" else None,
-                        default_tags=default_tags,
-                        learning_path=learning_path if learning_path else None
-                    )
-                    
-                    all_documents.extend(documents)
-                    
-                    progress_bar.progress((batch_idx + 1) / total_batches)
-                
-                # Chunk documents
-                status_text.text("Chunking documents...")
-                chunked_docs = chunk_documents(all_documents)
-                
-                # Add to vector store
-                status_text.text("Adding to vector store...")
-                vector_store = get_vector_store([doc.page_content for doc in chunked_docs])
-                
-                # Store metadata separately if needed
-                # For now, metadata is included in the document chunks
-                
-                progress_bar.progress(1.0)
-                status_text.text("✅ Import complete!")
-                
-                st.success(f"✅ Successfully imported {len(unique_urls)} URLs ({len(chunked_docs)} chunks)")
-                
-                # Show summary
-                st.subheader("📊 Import Summary")
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("URLs Imported", len(unique_urls))
-                with col2:
-                    st.metric("Documents Created", len(all_documents))
-                with col3:
-                    st.metric("Chunks Created", len(chunked_docs))
-                
-            except Exception as e:
-                st.error(f"Error during import: {e}")
-                st.exception(e)
+            # The import runs on background workers, so it keeps going if this
+            # page is closed or refreshed; spread each domain's URLs across batches
+            queue = get_job_queue()
+            start_workers()
+            job_id = queue.enqueue(
+                get_user_store_path("./vector_store"),
+                interleave_by_domain(unique_urls),
+                {
+                    "category": default_category if default_category != "General" else None,
+                    "tags": default_tags,
+                    "learning_path": learning_path if learning_path else None,
+                    "reimport": reimport_existing,
+                }
+            )
+            st.success(f"✅ Import job #{job_id} queued with {len(unique_urls)} URLs")
     
     else:
         st.info("👆 Please add URLs using one of the methods above")
+    
+    show_import_jobs()
+
+
+def show_import_jobs():
+    """List this user's import jobs; active ones refresh until they finish."""
+    queue = get_job_queue()
+    jobs = queue.list_jobs(get_user_store_path("./vector_store"), limit=10)
+    if not jobs:
+        return
+    
+    st.subheader("📦 Import Jobs")
+    if any(job["status"] in ACTIVE_JOB_STATUSES for job in jobs):
+        # Resume processing of jobs queued before a restart
+        start_workers()
+    for job in jobs:
+        polling = job["status"] in ACTIVE_JOB_STATUSES
+        st.fragment(job_progress, run_every=2 if polling else None)(job["id"], polling)
+
+
+def job_progress(job_id: int, polling: bool):
+    queue = get_job_queue()
+    job = queue.get_job(job_id)
+    counts = queue.progress(job_id)
+    finished = counts["done"] + counts["failed"] + counts["cancelled"]
+    active = job["status"] in ACTIVE_JOB_STATUSES
+    if polling and not active:
+        # Job just finished: rerun the page so this panel stops polling
+        st.rerun()
+    
+    with st.expander(f"Job #{job_id} · {job['status']} · {finished}/{job['total']} URLs", expanded=active):
+        st.progress(finished / job["total"] if job["total"] else 1.0)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("URLs Imported", counts["done"])
+        with col2:
+            st.metric("In Progress", counts["running"] + counts["pending"])
+        with col3:
+            st.metric("Failed", counts["failed"])
+        with col4:
+            st.metric("Chunks Created", counts["chunks"])
+        
+        stages = queue.stage_progress(job_id)
+        if stages:
+            # URLs through each pipeline stage, e.g. fetch 40 → ... → write 20
+            st.caption(" → ".join(
+                f"{stage} {stages.get(stage, {}).get('urls', 0)}" for stage in STAGES
+            ))
+        
+        if active:
+            if st.button("Cancel import", key=f"cancel_job_{job_id}"):
+                queue.cancel(job_id)
+                st.rerun()
+        
+        failures = queue.failures(job_id)
+        if failures:
+            st.warning(f"⚠️ {len(failures)} URLs could not be imported")
+            for failed_url, error in failures.items():
+                st.text(f"{failed_url}: {error}")
+            if not active and st.button("Retry failed URLs", key=f"retry_job_{job_id}"):
+                # Same options, so anything committed in the meantime is skipped
+                retry_id = queue.enqueue(job["store_path"], list(failures), job["options"])
+                start_workers()
+                st.success(f"✅ Retry job #{retry_id} queued with {len(failures)} URLs")
+                st.rerun()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 """Content browser and search page for AI Learning Repository."""
 import streamlit as st
 from simple_vector_store import SimpleVectorStore as MilvusVectorStore
-from typing import List
+from typing import Dict, List
 from langchain.docstore.document import Document
 from utils.auth import require_login, show_user_info
 from utils.user_store import get_user_store_path
@@ -24,10 +24,28 @@ CATEGORIES = [
 ]
 
 def get_unique_values_from_store(store: MilvusVectorStore, field: str) -> List[str]:
-    """Get unique values for a metadata field from the store."""
-    # This is a simplified version - in production, you'd query Milvus directly
-    # For now, we'll return empty list and let user filter manually
-    return []
+    """Get unique values for a metadata field from the store, most common first."""
+    return list(store.facet_counts(field))
+
+def search_filter(category: str, content_type: str) -> Dict[str, str]:
+    """Metadata filter for the selected category and type, applied inside the store."""
+    filter = {}
+    if category != "All Categories":
+        filter["category"] = category
+    if content_type != "All Types":
+        filter["type"] = content_type
+    return filter
+
+def _clock(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def format_time_range(metadata: Dict) -> str:
+    """"12:05–17:40" for a chunk of a transcribed recording, or "" if it is not timed."""
+    if metadata.get('start_time') is None:
+        return ""
+    return f"{_clock(metadata['start_time'])}–{_clock(metadata.get('end_time', metadata['start_time']))}"
 
 def main():
     # Check authentication
@@ -46,19 +64,30 @@ def main():
         placeholder="Search for topics, concepts, or keywords..."
     )
     
-    # Filters
+    # Use user-specific vector store
+    user_store_path = get_user_store_path("./vector_store")
+    vector_store = MilvusVectorStore(store_path=user_store_path)
+    
+    # Filters; categories and types present in the store are offered too
+    stored_categories = get_unique_values_from_store(vector_store, "category")
+    category_options = CATEGORIES + sorted(
+        c for c in stored_categories if c.lower() not in {known.lower() for known in CATEGORIES}
+    )
+    stored_types = get_unique_values_from_store(vector_store, "type")
+    type_options = ["All Types"] + list(dict.fromkeys(["url", "note", "document", "video", "audio"] + stored_types))
+    
     col1, col2, col3 = st.columns(3)
     
     with col1:
         filter_category = st.selectbox(
             "Filter by Category",
-            options=CATEGORIES
+            options=category_options
         )
     
     with col2:
         filter_type = st.selectbox(
             "Filter by Type",
-            options=["All Types", "url", "note", "document", "video", "audio"]
+            options=type_options
         )
     
     with col3:
@@ -76,76 +105,65 @@ def main():
         else:
             with st.spinner("Searching..."):
                 try:
-                    # Use user-specific vector store
-                    user_store_path = get_user_store_path("./vector_store")
-                    vector_store = MilvusVectorStore(store_path=user_store_path)
+                    # Filters are applied in the store, so all k results match them
+                    filter = search_filter(filter_category, filter_type)
+                    filtered_results = vector_store.similarity_search(search_query, k=num_results, filter=filter)
                     
-                    # Perform search
-                    results = vector_store.similarity_search(search_query, k=num_results)
-                    
-                    if not results:
-                        st.info("No results found. Try a different search query.")
-                    else:
-                        st.subheader(f"📚 Found {len(results)} results")
-                        
-                        # Filter results if filters are set
-                        filtered_results = results
-                        if filter_category != "All Categories":
-                            filtered_results = [
-                                r for r in results 
-                                if r.metadata.get('category', '').lower() == filter_category.lower()
-                            ]
-                        
-                        if filter_type != "All Types":
-                            filtered_results = [
-                                r for r in filtered_results
-                                if r.metadata.get('type', '').lower() == filter_type.lower()
-                            ]
-                        
-                        if not filtered_results:
+                    if not filtered_results:
+                        if filter:
                             st.info("No results match your filters. Try adjusting them.")
                         else:
-                            # Display results
-                            for i, doc in enumerate(filtered_results, 1):
-                                with st.container():
-                                    # Header with metadata
-                                    metadata = doc.metadata
-                                    
-                                    col_title, col_meta = st.columns([3, 1])
-                                    
-                                    with col_title:
-                                        title = metadata.get('title', f'Result {i}')
-                                        st.markdown(f"### {i}. {title}")
-                                    
-                                    with col_meta:
-                                        content_type = metadata.get('type', 'unknown')
-                                        category = metadata.get('category', 'N/A')
-                                        st.caption(f"Type: {content_type} | Category: {category}")
-                                    
-                                    # Source URL if available
-                                    source_url = metadata.get('source_url')
-                                    if source_url:
-                                        st.markdown(f"🔗 [Source]({source_url})")
-                                    
-                                    # Tags
-                                    tags = metadata.get('tags', '')
-                                    if tags:
-                                        tag_list = [tag.strip() for tag in tags.split(',')]
-                                        tag_display = ' '.join([f"`{tag}`" for tag in tag_list[:5]])
-                                        st.markdown(f"Tags: {tag_display}")
-                                    
-                                    # Content preview
-                                    with st.expander(f"View content ({len(doc.page_content)} chars)"):
-                                        st.markdown(doc.page_content[:2000] + ("..." if len(doc.page_content) > 2000 else ""))
-                                    
-                                    # Additional metadata
-                                    if metadata.get('added_date'):
-                                        st.caption(f"Added: {metadata.get('added_date', '')[:10]}")
-                                    
-                                    if metadata.get('learning_path'):
-                                        st.caption(f"Learning Path: {metadata.get('learning_path')}")
-                                    
-                                    st.markdown("---")
+                            st.info("No results found. Try a different search query.")
+                    else:
+                        st.subheader(f"📚 Found {len(filtered_results)} results")
+                        
+                        # Display results
+                        for i, doc in enumerate(filtered_results, 1):
+                            with st.container():
+                                # Header with metadata
+                                metadata = doc.metadata
+                                
+                                col_title, col_meta = st.columns([3, 1])
+                                
+                                with col_title:
+                                    title = metadata.get('title', f'Result {i}')
+                                    st.markdown(f"### {i}. {title}")
+                                
+                                with col_meta:
+                                    content_type = metadata.get('type', 'unknown')
+                                    category = metadata.get('category', 'N/A')
+                                    st.caption(f"Type: {content_type} | Category: {category}")
+                                
+                                # Source URL if available
+                                source_url = metadata.get('source_url')
+                                if source_url:
+                                    st.markdown(f"🔗 [Source]({source_url})")
+                                
+                                # Position within a transcribed recording
+                                time_range = format_time_range(metadata)
+                                if time_range:
+                                    timestamp_url = metadata.get('timestamp_url')
+                                    st.markdown(f"▶️ [{time_range}]({timestamp_url})" if timestamp_url else f"▶️ {time_range}")
+                                
+                                # Tags
+                                tags = metadata.get('tags', '')
+                                if tags:
+                                    tag_list = [tag.strip() for tag in tags.split(',')]
+                                    tag_display = ' '.join([f"`{tag}`" for tag in tag_list[:5]])
+                                    st.markdown(f"Tags: {tag_display}")
+                                
+                                # Content preview
+                                with st.expander(f"View content ({len(doc.page_content)} chars)"):
+                                    st.markdown(doc.page_content[:2000] + ("..." if len(doc.page_content) > 2000 else ""))
+                                
+                                # Additional metadata
+                                if metadata.get('added_date'):
+                                    st.caption(f"Added: {metadata.get('added_date', '')[:10]}")
+                                
+                                if metadata.get('learning_path'):
+                                    st.caption(f"Learning Path: {metadata.get('learning_path')}")
+                                
+                                st.markdown("---")
                 
                 except Exception as e:
                     st.error(f"Error searching: {e}")
@@ -157,24 +175,16 @@ def main():
     
     browse_category = st.selectbox(
         "Select a category to browse",
-        options=[c for c in CATEGORIES if c != "All Categories"]
+        options=[c for c in category_options if c != "All Categories"]
     )
     
     if st.button("Browse Category"):
         with st.spinner(f"Loading content from {browse_category}..."):
             try:
-                # Use user-specific vector store
-                user_store_path = get_user_store_path("./vector_store")
-                vector_store = MilvusVectorStore(store_path=user_store_path)
-                
-                # Get some results with a generic query
-                results = vector_store.similarity_search(browse_category.lower(), k=20)
-                
-                # Filter by category
-                category_results = [
-                    r for r in results
-                    if r.metadata.get('category', '').lower() == browse_category.lower()
-                ]
+                # Rank only this category's content against a generic query
+                category_results = vector_store.similarity_search(
+                    browse_category.lower(), k=20, filter={"category": browse_category}
+                )
                 
                 if category_results:
                     st.success(f"Found {len(category_results)} items in {browse_category}")
@@ -43,9 +43,16 @@ def main():
         
         st.markdown("---")
         
-        # Category distribution (placeholder - would need to query metadata)
+        # Category and type distribution, counted from the store's metadata index
         st.subheader("📂 Content by Category")
-        st.info("Category distribution feature coming soon! This requires querying metadata from the vector store.")
+        category_counts = vector_store.facet_counts("category")
+        if category_counts:
+            df = pd.DataFrame(list(category_counts.items()), columns=["Category", "Items"])
+            st.bar_chart(df.set_index("Category"))
+            type_counts = vector_store.facet_counts("type")
+            st.caption(" | ".join(f"{name}: {count}" for name, count in type_counts.items()))
+        else:
+            st.info("No categorized content yet. Categories are added when you import URLs, documents or notes.")
         
         # Recent activity (placeholder)
         st.subheader("🕒 Recent Activity")
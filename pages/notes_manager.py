@@ -1,6 +1,6 @@
 """Notes management page for AI Learning Repository."""
 import streamlit as st
-from pages.app_admin import get_vector_store, get_text_chunks
+from pages.app_admin import add_documents_to_store, get_text_chunks
 from utils.content_processor import process_note_for_ingestion, chunk_documents
 from utils.metadata_extractor import create_metadata
 from utils.auth import require_login, show_user_info
@@ -154,7 +154,8 @@ def main():
                         )
                         
                         # Add to vector store
-                        vector_store = get_vector_store([doc.page_content for doc in documents])
+                        # Notes are already chunked; keep their metadata on every chunk
+                        vector_store = add_documents_to_store(documents, chunk=False)
                         
                         st.success(f"✅ Note '{note_title}' saved successfully!")
                         st.balloons()
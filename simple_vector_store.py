@@ -1,11 +1,15 @@
 import os
 import json
 import pickle
+import threading
+from contextlib import contextmanager
 from typing import List, Optional, Dict, Any
 from langchain_openai import OpenAIEmbeddings
 from langchain.docstore.document import Document
 import numpy as np
 from datetime import datetime
+from utils.source_tracker import SourceDiff, diff_chunks
+from utils.duplicate_detector import URLIndex
 
 try:
     import streamlit as st
@@ -13,6 +17,44 @@ try:
 except ImportError:
     HAS_STREAMLIT = False
 
+# Metadata fields indexed for filter pushdown and facet counts
+INDEXED_FIELDS = ("category", "type", "learning_path", "tags", "source_url")
+
+
+@contextmanager
+def _replace_file(path: str, mode: str = 'w'):
+    """Open a temporary file that replaces ``path`` once the block completes.
+
+    Readers in other instances or processes see either the old or the new
+    file, never a half-written one; a failed write leaves ``path`` untouched.
+    """
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, mode, encoding=None if 'b' in mode else 'utf-8') as f:
+            yield f
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _page_url(meta: Dict[str, Any]) -> Optional[str]:
+    """URL of the page a chunk was ingested from, for the URL index.
+
+    Notes linking a URL and transcripts of a video also carry ``source_url``
+    but did not ingest the page, so only rows of type "url" (the default
+    type) count.
+    """
+    if meta.get("type", "url") != "url":
+        return None
+    return meta.get("source_url")
+
+
+def _filter_values(value) -> List[str]:
+    values = value if isinstance(value, (list, tuple, set)) else [value]
+    return [str(v).strip().lower() for v in values if v is not None]
+
+
 class SimpleVectorStore:
     """A simple file-based vector store that avoids gRPC/async issues."""
 
@@ -25,13 +67,60 @@ class SimpleVectorStore:
         self.embedding = OpenAIEmbeddings(model=embedding_model)
         self.vectors_file = os.path.join(store_path, "vectors.pkl")
         self.metadata_file = os.path.join(store_path, "metadata.json")
+        self.sources_file = os.path.join(store_path, "sources.json")
+        self.version_file = os.path.join(store_path, "version.json")
+
+        # Names of files with unsaved changes while inside deferred_saves()
+        self._deferred = None
+        # field -> lower-cased value -> row positions; rebuilt lazily after changes
+        self._field_index = None
+        # chunk id -> row position; rebuilt lazily after changes
+        self._id_positions = None
 
         # Create directory if it doesn't exist
         os.makedirs(store_path, exist_ok=True)
 
         # Load existing data
+        self._load()
+
+    def _load(self):
+        self.version = self._load_version()
         self.vectors = self._load_vectors()
         self.metadata = self._load_metadata()
+        self.sources = self._load_sources()
+        self.url_index = self._load_url_index()
+        self._field_index = None
+        self._id_positions = None
+
+    def _load_version(self) -> int:
+        """Load the store version, which increases with every write of the chunks."""
+        if os.path.exists(self.version_file):
+            try:
+                with open(self.version_file, 'r', encoding='utf-8') as f:
+                    return int(json.load(f).get("version", 0))
+            except Exception as e:
+                print(f"Error loading store version: {e}")
+        return 0
+
+    def _bump_version(self):
+        # Continue from the newest version on disk, so versions never repeat
+        # even when another instance of this store has written since loading
+        self.version = max(self.version, self._load_version()) + 1
+        try:
+            with _replace_file(self.version_file) as f:
+                json.dump({"version": self.version, "updated": datetime.now().isoformat()}, f)
+        except Exception as e:
+            print(f"Error saving store version: {e}")
+
+    def refresh(self) -> bool:
+        """Reload the store if another instance has written to it since it was loaded.
+
+        Returns True if it was reloaded.
+        """
+        if self._load_version() == self.version:
+            return False
+        self._load()
+        return True
 
     def _load_vectors(self) -> List[List[float]]:
         """Load vectors from file."""
@@ -53,21 +142,74 @@ class SimpleVectorStore:
                 print(f"Error loading metadata: {e}")
         return []
 
+    def _load_sources(self) -> Dict[str, Dict[str, Any]]:
+        """Load the source_url -> content hash -> chunk ids index."""
+        if os.path.exists(self.sources_file):
+            try:
+                with open(self.sources_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error loading sources: {e}")
+        return {}
+
+    def _load_url_index(self) -> URLIndex:
+        """Load the normalized URL index, building it from metadata if missing."""
+        url_index = URLIndex.for_store(self.store_path)
+        if not url_index.exists and self.metadata:
+            url_index.add(_page_url(meta) for meta in self.metadata)
+            url_index.save()
+        return url_index
+
     def _save_vectors(self):
         """Save vectors to file."""
+        if self._deferred is not None:
+            self._deferred.add("vectors")
+            return
         try:
-            with open(self.vectors_file, 'wb') as f:
+            with _replace_file(self.vectors_file, 'wb') as f:
                 pickle.dump(self.vectors, f)
         except Exception as e:
             print(f"Error saving vectors: {e}")
 
     def _save_metadata(self):
         """Save metadata to file."""
+        if self._deferred is not None:
+            self._deferred.add("metadata")
+            return
         try:
-            with open(self.metadata_file, 'w', encoding='utf-8') as f:
+            with _replace_file(self.metadata_file) as f:
                 json.dump(self.metadata, f, ensure_ascii=False, indent=2)
         except Exception as e:
             print(f"Error saving metadata: {e}")
+        # Metadata is written on every change to the chunks; caches of search
+        # results and answers compare versions to detect that
+        self._bump_version()
+
+    def _save_sources(self):
+        """Save the source index to file."""
+        if self._deferred is not None:
+            self._deferred.add("sources")
+            return
+        try:
+            with _replace_file(self.sources_file) as f:
+                json.dump(self.sources, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Error saving sources: {e}")
+
+    @contextmanager
+    def deferred_saves(self):
+        """Write the store files once at the end of the block instead of after every change."""
+        if self._deferred is not None:
+            yield
+            return
+        self._deferred = set()
+        try:
+            yield
+        finally:
+            pending, self._deferred = self._deferred, None
+            for name in ("vectors", "metadata", "sources"):
+                if name in pending:
+                    getattr(self, f"_save_{name}")()
 
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """Calculate cosine similarity between two vectors."""
@@ -83,13 +225,19 @@ class SimpleVectorStore:
 
         return dot_product / (norm1 * norm2)
 
-    def add_texts(self, texts: List[str], metadatas: Optional[List[dict]] = None) -> List[str]:
+    def add_texts(
+        self,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None,
+        embeddings: Optional[List[List[float]]] = None
+    ) -> List[str]:
         """Add texts to the vector store."""
         if not texts:
             return []
 
         # Generate embeddings
-        embeddings = self.embedding.embed_documents(texts)
+        if embeddings is None:
+            embeddings = self.embedding.embed_documents(texts)
 
         # Add to storage
         ids = []
@@ -114,109 +262,306 @@ class SimpleVectorStore:
 
             self.metadata.append(metadata)
 
+        self._field_index = None
+        self._id_positions = None
+
         # Save to files
         self._save_vectors()
         self._save_metadata()
+        if self.url_index.add(_page_url(meta) for meta in self.metadata[-len(ids):]):
+            self.url_index.save()
 
         print(f"Added {len(texts)} documents to vector store")
         return ids
 
-    def add_documents(self, documents: List[Document]) -> List[str]:
-        """Add documents to the vector store."""
-        texts = [doc.page_content for doc in documents]
-        metadatas = [doc.metadata for doc in documents]
-        return self.add_texts(texts, metadatas)
+    def add_documents(self, documents: List[Document], batch_size: int = 256) -> List[str]:
+        """Add documents with their metadata, embedding them in batches.
 
-    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
-        """Perform similarity search."""
-        if not self.vectors:
-            return []
-
-        # Generate query embedding
-        query_embedding = self.embedding.embed_query(query)
-
-        # Calculate similarities
-        similarities = []
-        for i, vector in enumerate(self.vectors):
-            similarity = self._cosine_similarity(query_embedding, vector)
-            similarities.append((i, similarity))
-
-        # Sort by similarity (descending)
-        similarities.sort(key=lambda x: x[1], reverse=True)
-
-        # Get top k results
-        results = []
-        for i, (idx, score) in enumerate(similarities[:k]):
-            if idx < len(self.metadata):
-                meta = self.metadata[idx].copy()
-                text = meta.pop("text", "")
-                meta.pop("id", None)  # Remove internal id
-                meta.pop("timestamp", None)  # Remove timestamp unless needed
-
-                results.append(Document(page_content=text, metadata=meta))
-
-        return results
+        The store files are written once for the whole call.
+        """
+        ids = []
+        with self.deferred_saves():
+            for start in range(0, len(documents), batch_size):
+                batch = documents[start:start + batch_size]
+                ids.extend(self.add_texts(
+                    [doc.page_content for doc in batch],
+                    [doc.metadata for doc in batch]
+                ))
+        return ids
 
-    def similarity_search_with_score(self, query: str, k: int = 4) -> List[tuple]:
-        """Perform similarity search with scores."""
+    def _index(self) -> Dict[str, Dict[str, set]]:
+        """Inverted index over INDEXED_FIELDS (tags are split on commas)."""
+        if self._field_index is None:
+            index = {field: {} for field in INDEXED_FIELDS}
+            for position, meta in enumerate(self.metadata):
+                for field in INDEXED_FIELDS:
+                    value = meta.get(field)
+                    if not value:
+                        continue
+                    values = str(value).split(",") if field == "tags" else [str(value)]
+                    for v in values:
+                        key = v.strip().lower()
+                        if key:
+                            index[field].setdefault(key, set()).add(position)
+            self._field_index = index
+        return self._field_index
+
+    def _matching_positions(self, filter: Optional[Dict[str, Any]]) -> Optional[List[int]]:
+        """Row positions matching every ``field: value`` (or list of values) pair.
+
+        Matching is case-insensitive; tags match any one tag. Returns None when
+        there is no filter.
+        """
+        if not filter:
+            return None
+        matches = None
+        for field, value in filter.items():
+            wanted = _filter_values(value)
+            if field in INDEXED_FIELDS:
+                index = self._index()[field]
+                positions = set().union(*(index.get(v, set()) for v in wanted))
+            else:
+                positions = {
+                    i for i, meta in enumerate(self.metadata)
+                    if str(meta.get(field, "")).strip().lower() in wanted
+                }
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                return []
+        return sorted(matches)
+
+    def facet_counts(self, field: str, filter: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Count items (sources, or chunks without a source) per value of a metadata field."""
+        positions = self._matching_positions(filter)
+        rows = range(len(self.metadata)) if positions is None else positions
+        items: Dict[str, set] = {}
+        labels: Dict[str, str] = {}
+        for position in rows:
+            meta = self.metadata[position]
+            value = meta.get(field)
+            if not value:
+                continue
+            item = meta.get("source_url") or meta.get("title") or meta.get("id")
+            for v in (str(value).split(",") if field == "tags" else [str(value)]):
+                v = v.strip()
+                if v:
+                    labels.setdefault(v.lower(), v)
+                    items.setdefault(v.lower(), set()).add(item)
+        counts = {labels[key]: len(members) for key, members in items.items()}
+        return dict(sorted(counts.items(), key=lambda kv: kv[1], reverse=True))
+
+    def update_metadata(self, filter: Dict[str, Any], updates: Dict[str, Any]) -> int:
+        """Set ``updates`` on the metadata of every chunk matching ``filter``.
+
+        Nothing is re-embedded. Returns the number of chunks updated.
+        """
+        positions = self._matching_positions(filter) or []
+        for position in positions:
+            self.metadata[position].update(updates)
+        if positions:
+            self._field_index = None
+            self._id_positions = None
+            self._save_metadata()
+        return len(positions)
+
+    def _search(
+        self,
+        query: str,
+        k: int,
+        filter: Optional[Dict[str, Any]],
+        query_embedding: Optional[List[float]] = None
+    ) -> List[tuple]:
+        """Score only the rows matching ``filter`` and return the top k (position, score)."""
         if not self.vectors:
             return []
+        positions = self._matching_positions(filter)
+        if positions is None:
+            positions = range(len(self.vectors))
+        elif not positions:
+            return []
 
         # Generate query embedding
-        query_embedding = self.embedding.embed_query(query)
+        if query_embedding is None:
+            query_embedding = self.embedding.embed_query(query)
 
         # Calculate similarities
         similarities = []
-        for i, vector in enumerate(self.vectors):
-            similarity = self._cosine_similarity(query_embedding, vector)
-            similarities.append((i, similarity))
+        for i in positions:
+            if i < len(self.vectors):
+                similarities.append((i, self._cosine_similarity(query_embedding, self.vectors[i])))
 
         # Sort by similarity (descending)
         similarities.sort(key=lambda x: x[1], reverse=True)
+        return similarities[:k]
 
-        # Get top k results with scores
-        results = []
-        for i, (idx, score) in enumerate(similarities[:k]):
-            if idx < len(self.metadata):
-                meta = self.metadata[idx].copy()
-                text = meta.pop("text", "")
-                meta.pop("id", None)
-                meta.pop("timestamp", None)
+    def _document_at(self, idx: int) -> Document:
+        meta = self.metadata[idx].copy()
+        text = meta.pop("text", "")
+        meta.pop("id", None)  # Remove internal id
+        meta.pop("timestamp", None)  # Remove timestamp unless needed
+        return Document(page_content=text, metadata=meta)
 
-                doc = Document(page_content=text, metadata=meta)
-                results.append((doc, score))
-
-        return results
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[Document]:
+        """Perform similarity search.
+
+        Args:
+            filter: Optional metadata filter, e.g. ``{"category": "NLP",
+                "type": ["url", "note"]}``; applied before scoring
+        """
+        return [
+            self._document_at(idx)
+            for idx, score in self._search(query, k, filter)
+            if idx < len(self.metadata)
+        ]
+
+    def similarity_search_ids(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> List[str]:
+        """Ids of the chunks ``similarity_search`` would return, best first.
+
+        Pass ``query_embedding`` to reuse an embedding of ``query`` computed earlier.
+        """
+        return [
+            self.metadata[idx]["id"]
+            for idx, score in self._search(query, k, filter, query_embedding)
+            if idx < len(self.metadata)
+        ]
+
+    def get_documents(self, ids: List[str]) -> List[Document]:
+        """Documents for chunk ids, in the given order; ids no longer stored are skipped."""
+        if self._id_positions is None:
+            self._id_positions = {meta.get("id"): i for i, meta in enumerate(self.metadata)}
+        return [
+            self._document_at(self._id_positions[doc_id])
+            for doc_id in ids
+            if doc_id in self._id_positions
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> List[tuple]:
+        """Perform similarity search with scores."""
+        return [
+            (self._document_at(idx), score)
+            for idx, score in self._search(query, k, filter)
+            if idx < len(self.metadata)
+        ]
 
     def delete(self, ids: Optional[List[str]] = None):
         """Delete documents by IDs."""
         if not ids:
             return
 
-        # Find indices to remove
-        indices_to_remove = []
-        for doc_id in ids:
-            for i, meta in enumerate(self.metadata):
-                if meta.get("id") == doc_id:
-                    indices_to_remove.append(i)
-                    break
-
-        # Remove in reverse order to maintain indices
-        for idx in sorted(indices_to_remove, reverse=True):
-            if idx < len(self.vectors):
-                del self.vectors[idx]
-            if idx < len(self.metadata):
-                del self.metadata[idx]
+        ids_to_remove = set(ids)
+        keep = [
+            i for i, meta in enumerate(self.metadata)
+            if meta.get("id") not in ids_to_remove
+        ]
+        if len(keep) == len(self.metadata):
+            return
+
+        removed_urls = {
+            _page_url(meta) for meta in self.metadata
+            if meta.get("id") in ids_to_remove
+        }
+        self.vectors = [self.vectors[i] for i in keep if i < len(self.vectors)]
+        self.metadata = [self.metadata[i] for i in keep]
+        self._field_index = None
+        self._id_positions = None
+        removed_urls -= {_page_url(meta) for meta in self.metadata}
+
+        # Drop deleted chunks from the source index
+        for source_url in list(self.sources):
+            chunks = self.sources[source_url]["chunks"]
+            for chunk_hash in [h for h, doc_id in chunks.items() if doc_id in ids_to_remove]:
+                del chunks[chunk_hash]
+            if not chunks:
+                del self.sources[source_url]
 
         # Save changes
         self._save_vectors()
         self._save_metadata()
+        self._save_sources()
+        if self.url_index.discard(removed_urls):
+            self.url_index.save()
+
+    def diff_source(
+        self,
+        source_url: str,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None
+    ) -> SourceDiff:
+        """Work out which chunks of a source need embedding, keeping or deleting."""
+        existing = self.sources.get(source_url, {}).get("chunks", {})
+        return diff_chunks(source_url, texts, existing, metadatas)
+
+    def apply_source_diff(
+        self,
+        diff: SourceDiff,
+        embeddings: Optional[List[List[float]]] = None
+    ) -> List[str]:
+        """Apply a SourceDiff, embedding only new or changed chunks.
+
+        Args:
+            diff: Result of ``diff_source``
+            embeddings: Optional precomputed embeddings for ``diff.new_texts``
+
+        Returns:
+            Doc ids of the chunks now stored for the source
+        """
+        if diff.unchanged and self.sources.get(diff.source_url, {}).get("content_hash") == diff.content_hash:
+            return list(diff.kept.values())
+
+        self.delete(diff.stale_ids)
+
+        new_ids = []
+        if diff.new_texts:
+            new_ids = self.add_texts(diff.new_texts, diff.new_metadatas, embeddings=embeddings)
+
+        chunks = dict(diff.kept)
+        chunks.update(zip(diff.new_chunk_hashes, new_ids))
+        self.sources[diff.source_url] = {
+            "content_hash": diff.content_hash,
+            "chunks": chunks,
+            "updated": datetime.now().isoformat()
+        }
+        self._save_sources()
+        return list(chunks.values())
+
+    def ingest_source(
+        self,
+        source_url: str,
+        texts: List[str],
+        metadatas: Optional[List[dict]] = None
+    ) -> SourceDiff:
+        """Incrementally (re-)ingest the chunks of one source.
+
+        Unchanged sources are a no-op; changed sources only embed new chunks
+        and delete the chunks that are no longer present.
+        """
+        diff = self.diff_source(source_url, texts, metadatas)
+        self.apply_source_diff(diff)
+        return diff
 
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get collection statistics."""
         return {
             "document_count": len(self.metadata),
             "vector_count": len(self.vectors),
+            "source_count": len(self.sources),
+            "version": self.version,
             "store_path": self.store_path,
             "status": "ready"
         }
@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+import pytest
+
+from simple_vector_store import SimpleVectorStore
+
+
+class FakeEmbeddings:
+    """Embeds a text as its length, recording every request; no API calls."""
+
+    def __init__(self, *args, **kwargs):
+        self.requests = []
+        self.embedded = []
+        self.queries = 0
+
+    def embed_documents(self, texts):
+        self.requests.append(list(texts))
+        self.embedded.extend(texts)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        self.queries += 1
+        return [float(len(text)), 1.0]
+
+
+@pytest.fixture
+def fake_embeddings():
+    """Stores created during the test embed with FakeEmbeddings."""
+    with patch('simple_vector_store.OpenAIEmbeddings', FakeEmbeddings):
+        yield FakeEmbeddings
+
+
+@pytest.fixture
+def make_store(tmp_path, fake_embeddings):
+    """Open a SimpleVectorStore with fake embeddings (default path: tmp_path/store)."""
+    def make(store_path=None):
+        return SimpleVectorStore(store_path=str(store_path or tmp_path / "store"))
+    return make
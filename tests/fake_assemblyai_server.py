@@ -0,0 +1,143 @@
+"""Local stand-in for AssemblyAI's upload and transcript endpoints.
+
+Serves ``POST /v2/upload``, ``POST /v2/transcript`` and
+``GET /v2/transcript/<id>`` like the real API, without network access or an
+API key. A transcript stays "processing" for ``polls_until_done`` status
+checks and then completes with text derived from the uploaded bytes
+(uploads starting with ``ERROR`` fail instead).
+
+Run it for manual testing of the admin page:
+
+    python tests/fake_assemblyai_server.py --port 8765
+    ASSEMBLYAI_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+import argparse
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+class FakeAssemblyAI:
+    """Threaded fake AssemblyAI server; ``start()`` returns its base URL."""
+
+    def __init__(self, polls_until_done: int = 2, port: int = 0):
+        self.polls_until_done = polls_until_done
+        self.port = port
+        self.uploads: Dict[str, bytes] = {}
+        self.transcripts: Dict[str, Dict] = {}
+        self.requests = {"upload": 0, "submit": 0, "poll": 0}
+        # Most transcripts ever in progress at once
+        self.max_in_progress = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def transcript_text(self, data: bytes) -> str:
+        try:
+            return f"Transcript: {data.decode('utf-8')}"
+        except UnicodeDecodeError:
+            return f"Transcript of {len(data)} bytes of audio"
+
+    def start(self) -> str:
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), _handler(self))
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def upload(self, data: bytes) -> Dict:
+        with self._lock:
+            self.requests["upload"] += 1
+            upload_id = f"upload-{next(self._ids)}"
+            self.uploads[upload_id] = data
+        return {"upload_url": f"fake://{upload_id}"}
+
+    def submit(self, body: Dict) -> Dict:
+        with self._lock:
+            self.requests["submit"] += 1
+            upload_id = str(body.get("audio_url", "")).replace("fake://", "")
+            if upload_id not in self.uploads:
+                return {"error": "unknown audio_url"}
+            transcript_id = f"transcript-{next(self._ids)}"
+            self.transcripts[transcript_id] = {"upload": upload_id, "polls": 0}
+            in_progress = sum(1 for t in self.transcripts.values() if t["polls"] < self.polls_until_done)
+            self.max_in_progress = max(self.max_in_progress, in_progress)
+        return {"id": transcript_id, "status": "queued"}
+
+    def poll(self, transcript_id: str) -> Optional[Dict]:
+        with self._lock:
+            self.requests["poll"] += 1
+            transcript = self.transcripts.get(transcript_id)
+            if transcript is None:
+                return None
+            transcript["polls"] += 1
+            if transcript["polls"] < self.polls_until_done:
+                return {"id": transcript_id, "status": "processing", "text": None}
+            data = self.uploads[transcript["upload"]]
+        if data.startswith(b"ERROR"):
+            return {"id": transcript_id, "status": "error", "error": data.decode("utf-8", "replace")}
+        return {"id": transcript_id, "status": "completed", "text": self.transcript_text(data)}
+
+
+def _handler(fake: FakeAssemblyAI):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, status: int, body: Dict):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _body(self) -> bytes:
+            if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+                data = b""
+                while True:
+                    size = int(self.rfile.readline().strip() or b"0", 16)
+                    if size == 0:
+                        self.rfile.readline()
+                        return data
+                    data += self.rfile.read(size)
+                    self.rfile.readline()
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def do_POST(self):
+            if not self.headers.get("authorization"):
+                return self._reply(401, {"error": "missing authorization"})
+            body = self._body()
+            if self.path == "/v2/upload":
+                return self._reply(200, fake.upload(body))
+            if self.path == "/v2/transcript":
+                result = fake.submit(json.loads(body or b"{}"))
+                return self._reply(400 if "error" in result else 200, result)
+            self._reply(404, {"error": "not found"})
+
+        def do_GET(self):
+            if not self.headers.get("authorization"):
+                return self._reply(401, {"error": "missing authorization"})
+            if self.path.startswith("/v2/transcript/"):
+                result = fake.poll(self.path.rsplit("/", 1)[1])
+                if result is not None:
+                    return self._reply(200, result)
+            self._reply(404, {"error": "not found"})
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--polls", type=int, default=3, help="status checks before a transcript completes")
+    args = parser.parse_args()
+    server = FakeAssemblyAI(polls_until_done=args.polls, port=args.port)
+    print(f"Fake AssemblyAI listening on {server.start()}")
+    threading.Event().wait()
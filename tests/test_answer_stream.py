@@ -0,0 +1,51 @@
+import time
+
+import pytest
+
+from utils.answer_stream import LatencyLog, StreamTiming, timed_stream
+
+
+def slow_tokens(delay, tokens):
+    for token in tokens:
+        time.sleep(delay)
+        yield token
+
+
+def test_timed_stream_records_first_token_and_total_without_buffering():
+    timing = StreamTiming()
+    stream = timed_stream(slow_tokens(0.02, ["", "Hello", " world", "!"]), timing)
+
+    assert next(stream) == "" and timing.first_token is None  # empty chunks are not tokens
+    assert next(stream) == "Hello"
+    assert timing.ttft >= 0.04 and timing.total is None
+    assert "".join(stream) == " world!"
+    assert timing.total >= timing.ttft + 0.04
+    assert (timing.chunks, timing.chars) == (4, 12)
+    assert "first token" in timing.summary()
+
+
+def test_failed_stream_still_records_end():
+    def broken():
+        yield "partial"
+        raise RuntimeError("connection reset")
+
+    timing = StreamTiming()
+    with pytest.raises(RuntimeError):
+        list(timed_stream(broken(), timing))
+    assert timing.ttft is not None and timing.total is not None
+
+
+def test_latency_log_percentiles_per_source():
+    log = LatencyLog(max_records=100)
+    for i in range(1, 101):
+        log.record("llm", ttft=i / 100, total=i / 10)
+    log.record("cache", ttft=0.002, total=0.002)
+
+    summary = log.summary()
+    assert len(log) == 100  # oldest llm record dropped
+    assert summary["llm"]["requests"] == 99
+    assert summary["llm"]["ttft_p50"] == pytest.approx(0.51, abs=0.01)
+    assert summary["llm"]["total_p95"] == pytest.approx(9.6, abs=0.1)
+    assert summary["cache"] == {
+        "requests": 1, "ttft_p50": 0.002, "ttft_p95": 0.002, "total_p50": 0.002, "total_p95": 0.002
+    }
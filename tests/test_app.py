@@ -45,3 +45,128 @@ def test_get_text_chunks_split():
     chunks = get_text_chunks(text)
     assert len(chunks) >= 2
 
+
+def _admin_page():
+    with patch.dict(sys.modules, {
+        'langchain_nvidia_ai_endpoints': _dummy_nvidia,
+        'google.generativeai': _dummy_genai,
+        'langchain_google_genai': _dummy_lgg,
+        'assemblyai': _dummy_assembly,
+    }), \
+         patch('streamlit.secrets', {"GOOGLE_API_KEY": "dummy", "ASSEMBLYAI_API_KEY": "dummy"}), \
+         patch('langchain_community.vectorstores.FAISS', MagicMock()):
+        return importlib.import_module('pages.app_admin')
+
+
+def test_cached_pdf_text_uses_the_current_filename(tmp_path):
+    import io
+    from utils.upload_cache import UploadCache
+
+    pages = _admin_page()
+
+    reader = MagicMock(metadata={}, pages=[MagicMock(extract_text=MagicMock(return_value="Body text"))])
+    uploads = []
+    for name in ("first.pdf", "second.pdf"):
+        upload = io.BytesIO(b"%PDF same bytes")
+        upload.name = name
+        uploads.append(upload)
+    with patch.object(pages, 'PdfReader', return_value=reader) as pdf_reader, \
+         patch.object(pages, 'skip_known_upload', return_value=False), \
+         patch.object(pages, '_upload_cache', return_value=UploadCache(str(tmp_path))):
+        first, second = pages.get_pdf_documents(uploads)
+
+    assert pdf_reader.call_count == 1
+    assert "Filename: first.pdf" in first.page_content
+    assert "Filename: second.pdf" in second.page_content
+    assert "first.pdf" not in second.page_content
+
+
+def test_page_writes_wait_for_workers_and_keep_their_chunks(tmp_path, fake_embeddings, make_store):
+    import threading
+    import time
+    from langchain.docstore.document import Document
+    from utils.job_queue import get_store, store_lock
+
+    pages = _admin_page()
+    store_path = str(tmp_path / "store")
+    embedding = threading.Event()
+
+    class SlowEmbeddings(fake_embeddings):
+        def embed_documents(self, texts):
+            embedding.set()
+            time.sleep(0.3)
+            return super().embed_documents(texts)
+
+    def worker():
+        # A background job commits while the page is still embedding
+        embedding.wait()
+        store = get_store(store_path)
+        with store_lock(store_path):
+            store.refresh()
+            store.add_documents([Document(page_content="worker chunk", metadata={})])
+
+    with patch('simple_vector_store.OpenAIEmbeddings', SlowEmbeddings), \
+         patch.object(pages, 'get_user_store_path', return_value=store_path):
+        thread = threading.Thread(target=worker)
+        thread.start()
+        pages.add_documents_to_store([Document(page_content="page chunk", metadata={})], chunk=False)
+        thread.join()
+
+    on_disk = make_store(store_path)
+    assert sorted(meta["text"] for meta in on_disk.metadata) == ["page chunk", "worker chunk"]
+    assert len(on_disk.vectors) == 2
+
+
+def test_transcribed_youtube_video_is_not_ingested_again(tmp_path, fake_embeddings):
+    from utils.transcription_jobs import ingest_transcript
+
+    pages = _admin_page()
+    store_path = str(tmp_path / "store")
+    link = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    key = "youtube_dQw4w9WgXcQ"
+    job = {"id": 1, "key": key, "source": link, "kind": "video", "store_path": store_path, "chunks": 0,
+           "metadata": {"url": link}}
+
+    with patch.object(pages, 'get_user_store_path', return_value=store_path):
+        assert not pages.skip_known_upload(key, link)
+        ingest_transcript(job, {"index": 0, "start": 0.0, "end": 60.0, "text": "a lecture", "last": True})
+        assert pages.skip_known_upload(key, link)
+
+
+def _app():
+    with patch.dict(sys.modules, {
+        'langchain_nvidia_ai_endpoints': _dummy_nvidia,
+        'google.generativeai': _dummy_genai,
+        'langchain_google_genai': _dummy_lgg,
+        'assemblyai': _dummy_assembly,
+    }), \
+         patch('streamlit.secrets', {"NVIDIA_API_KEY": "dummy", "GOOGLE_API_KEY": "dummy", "ASSEMBLYAI_API_KEY": "dummy"}), \
+         patch('langchain_community.vectorstores.FAISS', MagicMock()):
+        return importlib.import_module('app')
+
+
+def test_reruns_without_writes_retrieve_once(tmp_path, fake_embeddings):
+    from utils.qa_cache import QACache
+    from utils.semantic_cache import SemanticCache
+
+    app = _app()
+    qa_cache = QACache()
+    chain = MagicMock()
+    chain.stream.return_value = iter(["Nothing stored yet"])
+    with patch.object(app, 'get_user_store_path', return_value=str(tmp_path / "store")), \
+         patch.object(app, 'require_login', return_value=True), \
+         patch.object(app, 'show_user_info'), \
+         patch.object(app.st, 'text_input', return_value="What are transformers?"), \
+         patch.object(app.st, 'button', return_value=False), \
+         patch.object(app, 'get_chat_chain', return_value=chain), \
+         patch.object(app.st, 'write_stream', side_effect=lambda chunks: "".join(chunks)), \
+         patch.object(app, 'get_qa_cache', return_value=qa_cache), \
+         patch.object(app, 'get_semantic_cache', return_value=SemanticCache()):
+        # Each rerun of the page runs main() again
+        app.main()
+        app.main()
+
+    assert qa_cache.stats.retrieval_misses == 1
+    # An empty store retrieves nothing; the answer is generated once
+    chain.stream.assert_called_once()
+    assert chain.stream.call_args[0][0]["context"] == []
@@ -0,0 +1,66 @@
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from utils.context_packer import ContextPacker, _truncate, estimate_tokens, merge_overlap
+
+
+def article(sentences=60, topic="attention"):
+    return " ".join(f"Sentence {i} explains how {topic} weighs token {i} against the others." for i in range(sentences))
+
+
+def chunks(text, source, size=400, overlap=100):
+    splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap)
+    return [Document(page_content=c, metadata={"source_url": source}) for c in splitter.split_text(text)]
+
+
+def test_merge_overlap_keeps_shared_text_once():
+    first, second = "alpha beta gamma delta epsilon", "gamma delta epsilon zeta eta"
+    assert merge_overlap(first, second, min_overlap=10) == "alpha beta gamma delta epsilon zeta eta"
+    assert merge_overlap(first, "unrelated text entirely here", min_overlap=10) is None
+    assert merge_overlap(first, "beta gamma", min_overlap=10) == first
+
+
+def test_adjacent_chunks_of_a_source_merge_back_in_any_order():
+    text = article(20)
+    parts = chunks(text, "https://example.com/a")[:4]
+    packer = ContextPacker(max_tokens=10_000)
+    packed, stats = packer.pack([parts[2], parts[0], parts[3], parts[1]])
+    assert len(packed) == 1 and stats.merged == 3
+    assert packed[0].page_content in text
+    assert stats.packed_tokens < stats.input_tokens
+
+    # The same text from another source is never merged into it
+    other = Document(page_content=parts[1].page_content, metadata={"source_url": "https://example.com/b"})
+    packed, stats = packer.pack([parts[0], other])
+    assert stats.merged == 0
+
+
+def test_near_duplicates_are_dropped_in_favour_of_the_more_relevant():
+    best = Document(page_content=article(10), metadata={"source_url": "a"})
+    copy = Document(page_content=article(10).replace("Sentence 3", "Line 3"), metadata={"source_url": "b"})
+    different = Document(page_content=article(10, topic="retrieval"), metadata={"source_url": "c"})
+    packed, stats = ContextPacker(max_tokens=10_000).pack([best, copy, different])
+    assert packed == [best, different]
+    assert stats.duplicates == 1
+
+
+def test_budget_trims_least_relevant_passages_at_a_sentence_end():
+    passages = [
+        Document(page_content=article(30, topic=topic), metadata={"source_url": topic})
+        for topic in ("attention", "retrieval", "agents")
+    ]
+    budget = estimate_tokens(passages[0].page_content) + 300
+    packed, stats = ContextPacker(max_tokens=budget).pack(passages)
+    assert packed[0] == passages[0]
+    assert len(packed) == 2 and stats.trimmed == 1 and stats.dropped == 1
+    assert packed[1].page_content.endswith("others.")
+    assert stats.packed_tokens <= budget
+    assert stats.saved_tokens == stats.input_tokens - stats.packed_tokens
+
+
+def test_truncate_marker_stays_within_the_budget():
+    text = "word " * 100
+    for max_chars in (20, 41, 100):
+        cut = _truncate(text, max_chars)
+        assert cut.endswith(" …") and len(cut) <= max_chars
+    assert _truncate("x" * 50, 30) == "x" * 28 + " …"
@@ -1,19 +1,182 @@
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
 from webcrawer import WebCrawler
-from unittest.mock import patch
+from utils.http_cache import CachedResponse, HTTPCache
+
+PAGES = {
+    "/": '<html><body><a href="/a">A</a><a href="/b#top">B</a>'
+         '<a href="https://elsewhere.example/x">X</a></body></html>',
+    "/a": '<html><body><a href="/c">C</a><a href="/">Home</a></body></html>',
+    "/b": '<html><body><a href="/missing">Missing</a></body></html>',
+    "/c": '<html><body><a href="/d">D</a></body></html>',
+    "/big": '<html><body>' + '<p>long page</p>' * 10000 + '</body></html>',
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    requested = []
+    conditional = []
 
+    def do_GET(self):
+        StubHandler.requested.append(self.path)
+        body = PAGES.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        etag = '"%x"' % hash(body)
+        if self.headers.get("If-None-Match") == etag:
+            StubHandler.conditional.append(self.path)
+            self.send_response(304)
+            self.end_headers()
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
 
-def mock_get(*args, **kwargs):
-    class Response:
-        def __init__(self, text):
-            self.text = text
-    html = '<html><body><a href="https://example.com/page">Page</a></body></html>'
-    return Response(html)
+    def log_message(self, *args):
+        pass
 
 
-def test_crawl_returns_root():
-    crawler = WebCrawler('https://example.com', max_depth=1)
-    with patch('requests.get', side_effect=mock_get):
-        urls = crawler.start_crawling('https://example.com')
-    assert 'https://example.com' in urls
+@pytest.fixture
+def site():
+    StubHandler.requested = []
+    StubHandler.conditional = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HTTPCache(str(tmp_path / "http_cache"))
+
+
+def test_crawl_returns_root(site, cache):
+    crawler = WebCrawler(site + "/", max_depth=0, cache=cache)
+    urls = crawler.start_crawling(site + "/")
+    assert urls == {site + "/"}
     assert isinstance(urls, set)
 
+
+def test_crawl_is_breadth_first_and_same_host(site, cache):
+    crawler = WebCrawler(site + "/", max_depth=2, cache=cache)
+    urls = crawler.start_crawling(site + "/")
+    assert urls == {site + p for p in ["/", "/a", "/b", "/c", "/missing"]}
+    # Each page is fetched once, and /d (depth 3) is never requested
+    pages = [path for path in StubHandler.requested if path != "/robots.txt"]
+    assert sorted(pages) == sorted(["/", "/a", "/b", "/c", "/missing"])
+
+
+def test_crawl_respects_page_budget(site, cache):
+    crawler = WebCrawler(site + "/", max_depth=3, max_pages=2, cache=cache)
+    urls = crawler.start_crawling(site + "/")
+    assert len(urls) == 2
+
+
+def test_page_cut_off_by_byte_budget_is_not_ingested_or_cached(site, cache):
+    from utils.content_processor import documents_from_records
+    from utils.crawl_frontier import FAILED, CrawlFrontier
+
+    frontier = CrawlFrontier(":memory:")
+    emitted = []
+    crawler = WebCrawler(site + "/big", max_depth=0, max_bytes=1000, cache=cache,
+                         frontier=frontier, on_record=emitted.append)
+    crawler.start_crawling(site + "/big")
+
+    assert emitted == []
+    assert cache.get(site + "/big") is None
+    assert list(frontier.urls(crawler.crawl_id, FAILED)) == [site + "/big"]
+
+    partial = CachedResponse(url=site + "/big", status=200, headers={"Content-Type": "text/html"},
+                             body=b"<p>long page</p>", truncated=True)
+    assert documents_from_records([partial]) == []
+
+
+def test_crawl_records_feed_ingestion_without_refetch(site, cache):
+    from utils.content_processor import documents_from_records
+
+    crawler = WebCrawler(site + "/", max_depth=1, cache=cache)
+    crawler.start_crawling(site + "/")
+    StubHandler.requested = []
+
+    docs = documents_from_records(crawler.records)
+
+    assert StubHandler.requested == []
+    assert {doc.metadata["source_url"] for doc in docs} == {site + "/", site + "/a", site + "/b"}
+    assert all(record.status == 200 for record in crawler.records)
+
+
+def test_recrawl_revalidates_with_conditional_get(site, cache):
+    from utils.content_processor import documents_from_records
+
+    WebCrawler(site + "/", max_depth=1, cache=cache).start_crawling(site + "/")
+    crawler = WebCrawler(site + "/", max_depth=1, cache=cache)
+    urls = crawler.start_crawling(site + "/")
+
+    assert sorted(StubHandler.conditional) == ["/", "/a", "/b"]
+    assert urls == {site + p for p in ["/", "/a", "/b"]}
+    assert all(record.not_modified for record in crawler.records)
+    # Unchanged pages that are already ingested are not re-extracted
+    assert documents_from_records(crawler.records, known_urls={site + "/a"}) != []
+    assert len(documents_from_records(crawler.records, known_urls=urls)) == 0
+
+
+def test_crawl_resumes_from_persisted_frontier(site, cache, tmp_path):
+    from utils.crawl_frontier import CrawlFrontier
+
+    def interrupt_at_b(record):
+        if record.url.endswith("/b"):
+            raise KeyboardInterrupt
+
+    db_path = str(tmp_path / "frontier.db")
+    first = WebCrawler(site + "/", max_depth=1, cache=cache, frontier=CrawlFrontier(db_path), on_record=interrupt_at_b)
+    with pytest.raises(KeyboardInterrupt):
+        first.start_crawling(site + "/")
+    first.frontier.mark_ingested(first.crawl_id, [site + "/", site + "/a"])
+    StubHandler.requested = []
+
+    emitted = []
+    resumed = WebCrawler(
+        site + "/", max_depth=1, cache=cache,
+        frontier=CrawlFrontier(db_path), on_record=emitted.append
+    )
+    urls = resumed.start_crawling(site + "/")
+
+    assert urls == {site + p for p in ["/", "/a", "/b"]}
+    assert [record.url for record in emitted] == [site + "/b"]
+    assert "/" not in StubHandler.requested and "/a" not in StubHandler.requested
+    assert resumed.records == []
+
+    # Once finished, running the same crawl again revisits every page
+    StubHandler.requested = []
+    again = WebCrawler(site + "/", max_depth=1, cache=cache, frontier=CrawlFrontier(db_path))
+    again.start_crawling(site + "/")
+    assert sorted(set(StubHandler.requested) - {"/robots.txt"}) == ["/", "/a", "/b"]
+    assert all(record.not_modified for record in again.records)
+
+
+def test_resumed_crawl_retries_failed_pages(tmp_path):
+    from utils.crawl_frontier import DONE, FAILED, INGESTED, PENDING, CrawlFrontier
+
+    frontier = CrawlFrontier(str(tmp_path / "frontier.db"))
+    crawl_id = frontier.start("https://example.com/", 1)
+    frontier.add(crawl_id, [("https://example.com/", 0), ("https://example.com/a", 1), ("https://example.com/b", 1)])
+    frontier.mark_ingested(crawl_id, ["https://example.com/"])
+    frontier.mark(crawl_id, "https://example.com/a", FAILED, http_status=503)
+    frontier.mark(crawl_id, "https://example.com/b", DONE, http_status=200)
+
+    assert frontier.start("https://example.com/", 1) == crawl_id
+    assert frontier.status_counts(crawl_id) == {INGESTED: 1, PENDING: 2}
+    frontier.finish(crawl_id)
+    frontier.start("https://example.com/", 1)
+    assert frontier.count(crawl_id) == 0
@@ -0,0 +1,19 @@
+from utils.duplicate_detector import URLIndex, check_url_exists, split_existing_urls
+
+
+def test_url_index_persists_normalized_urls(tmp_path):
+    index = URLIndex.for_store(str(tmp_path))
+    index.add(["https://www.Example.com/post/"])
+    index.save()
+
+    reloaded = URLIndex.for_store(str(tmp_path))
+    assert "https://example.com/post" in reloaded
+    assert check_url_exists("https://example.com/post#intro", reloaded)
+
+    new_urls, existing = split_existing_urls(
+        ["https://example.com/post", "https://example.com/other"], reloaded
+    )
+    assert new_urls == ["https://example.com/other"]
+    assert existing == ["https://example.com/post"]
+    assert check_url_exists("https://example.com/post#intro", {"https://www.Example.com/post/"})
+    assert not check_url_exists("https://example.com/other", {"https://www.Example.com/post/"})
@@ -0,0 +1,54 @@
+import pytest
+
+from utils.html_parser import parse_html, parse_record
+from utils.http_cache import CachedResponse
+
+PAGE = """<!doctype html>
+<html><head>
+  <title> Attention
+    Is All You Need </title>
+  <meta name="description" content="The transformer paper">
+  <link rel="canonical" href="/papers/attention#abstract">
+  <script>var tracking = "not text";</script>
+</head>
+<body>
+  <nav><a href="/papers/">Papers</a> <a href="mailto:me@example.com">Mail</a></nav>
+  <h1>Abstract</h1>
+  <p>Sequence models &amp; attention.<br>No recurrence.</p>
+  <style>p { color: red }</style>
+  <a href="related.html#top">Related</a> <a href="/papers/">Papers again</a>
+</body></html>"""
+
+
+@pytest.mark.parametrize("backend", ["lxml", "stdlib"])
+def test_single_pass_extraction(backend):
+    page = parse_html(PAGE, base_url="https://example.com/papers/attention", backend=backend)
+
+    assert page.title == "Attention Is All You Need"
+    assert page.description == "The transformer paper"
+    assert page.canonical == "https://example.com/papers/attention"
+    assert page.links == ["https://example.com/papers/", "https://example.com/papers/related.html"]
+    assert page.text.splitlines() == [
+        "Papers Mail",
+        "Abstract",
+        "Sequence models & attention.",
+        "No recurrence.",
+        "Related Papers again",
+    ]
+
+
+def test_record_is_parsed_once():
+    record = CachedResponse(url="https://example.com/", status=200, body=PAGE.encode())
+    first = parse_record(record)
+    assert parse_record(record) is first
+    assert first.title == "Attention Is All You Need"
+
+
+@pytest.mark.parametrize("backend", ["lxml", "stdlib"])
+def test_unclosed_head_keeps_body_text(backend):
+    page = parse_html(
+        "<html><head><title>T</title><style>p {}</style><body><p>hello world body</p></body></html>",
+        backend=backend
+    )
+    assert page.title == "T"
+    assert page.text == "hello world body"
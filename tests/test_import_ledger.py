@@ -0,0 +1,126 @@
+from utils.http_cache import CachedResponse
+from utils.import_ledger import COMMITTED, FAILED, ImportLedger, import_key
+from utils.ingest_pipeline import IngestPipeline
+from utils.politeness import PolitenessScheduler
+
+
+class FlakyFetch:
+    """Fails the given URLs until ``heal`` is called."""
+
+    def __init__(self, failing):
+        self.failing = set(failing)
+        self.fetched = []
+
+    def heal(self):
+        self.failing.clear()
+
+    def __call__(self, url):
+        self.fetched.append(url)
+        if url in self.failing:
+            return CachedResponse(url=url, status=503)
+        html = f"<html><title>{url}</title><body><p>Content of {url}</p></body></html>"
+        return CachedResponse(url=url, status=200, headers={"Content-Type": "text/html"}, body=html.encode())
+
+
+def test_import_key_ignores_url_formatting_but_not_options():
+    assert import_key("https://Example.com/a/") == import_key("https://example.com/a")
+    assert import_key("https://example.com/a", {"category": "NLP"}) != import_key("https://example.com/a")
+    assert import_key("https://example.com/a", {"reimport": True}) == import_key("https://example.com/a")
+
+
+def test_retry_resumes_after_last_committed_url(make_store):
+    store = make_store()
+    ledger = ImportLedger.for_store(store.store_path)
+    urls = [f"https://example.com/{i}" for i in range(8)]
+    fetch = FlakyFetch(failing=[urls[6]])
+
+    def pipeline(**kwargs):
+        scheduler = PolitenessScheduler(default_delay=0, respect_robots=False)
+        return IngestPipeline(store, batch_size=3, scheduler=scheduler, fetch=fetch,
+                              ledger=ledger, default_category="NLP", **kwargs)
+
+    stats = pipeline().run(urls)
+    assert set(stats.failures) == {urls[6]}
+    assert ledger.counts()[COMMITTED] == 7 and ledger.counts()[FAILED] == 1
+    assert ledger.get(import_key(urls[6], {"category": "NLP"}))["error"] == "HTTP 503"
+
+    # The retry only fetches and embeds what was not committed
+    fetch.heal()
+    fetch.fetched.clear()
+    store.embedding.embedded.clear()
+    stats = pipeline().run(urls)
+    assert fetch.fetched == [urls[6]]
+    assert stats.resumed == 7 and stats.failures == {}
+    assert len(store.embedding.embedded) == 1
+    assert stats.chunks_by_url[urls[0]] == 1
+    assert ledger.counts()[COMMITTED] == 8
+
+    # Re-importing goes through every URL again
+    fetch.fetched.clear()
+    stats = pipeline(skip_committed=False).run(urls)
+    assert len(fetch.fetched) == 8 and stats.resumed == 0
+
+
+def test_write_failure_only_fails_its_source(make_store):
+    store = make_store()
+    ledger = ImportLedger.for_store(store.store_path)
+    urls = [f"https://example.com/{i}" for i in range(3)]
+    apply = store.apply_source_diff
+
+    def flaky_apply(diff, embeddings=None):
+        if diff.source_url == urls[1]:
+            raise OSError("disk full")
+        return apply(diff, embeddings=embeddings)
+
+    store.apply_source_diff = flaky_apply
+    scheduler = PolitenessScheduler(default_delay=0, respect_robots=False)
+    stats = IngestPipeline(store, scheduler=scheduler, fetch=FlakyFetch([]), ledger=ledger).run(urls)
+
+    assert stats.failures == {urls[1]: "write failed: disk full"}
+    assert sorted(stats.chunks_by_url) == [urls[0], urls[2]]
+    assert set(ledger.committed(import_key(url) for url in urls).values()) == {1}
+    assert len(ledger.committed(import_key(url) for url in urls)) == 2
+    assert len(make_store().sources) == 2
+
+
+def test_page_without_chunks_is_only_committed_when_empty_or_unchanged(make_store):
+    from unittest.mock import patch
+    from utils.content_processor import documents_from_records
+
+    store = make_store()
+    ledger = ImportLedger.for_store(store.store_path)
+    urls = ["https://example.com/a", "https://example.com/blank", "https://example.com/lost"]
+    fetch = FlakyFetch([])
+
+    def blank_fetch(url):
+        if url == urls[1]:
+            html = b"<html><body><script>render()</script></body></html>"
+            return CachedResponse(url=url, status=200, headers={"Content-Type": "text/html"}, body=html)
+        return fetch(url)
+
+    def pipeline(fetch, **kwargs):
+        scheduler = PolitenessScheduler(default_delay=0, respect_robots=False)
+        return IngestPipeline(store, scheduler=scheduler, fetch=fetch, ledger=ledger, **kwargs)
+
+    def drop_lost(records, **kwargs):
+        # Stands in for any extraction path that loses a page without failing it
+        return documents_from_records([r for r in records if r.url != urls[2]], **kwargs)
+
+    with patch('utils.ingest_pipeline.documents_from_records', drop_lost):
+        stats = pipeline(blank_fetch).run(urls)
+    assert stats.failures == {urls[2]: "no content extracted"}
+    assert ledger.committed(import_key(url) for url in urls) == {import_key(urls[0]): 1, import_key(urls[1]): 0}
+
+    # The lost page is not blocked by its key and is imported on retry
+    stats = pipeline(blank_fetch).run(urls)
+    assert stats.resumed == 2 and stats.chunks_by_url[urls[2]] == 1
+
+    # An unchanged page is committed with the chunks it already has
+    def cached_fetch(url):
+        response = fetch(url)
+        response.from_cache = True
+        return response
+
+    stats = pipeline(cached_fetch, known_urls=store.url_index, skip_committed=False).run(urls[:1])
+    assert stats.failures == {} and stats.chunks_by_url == {urls[0]: 1}
+    assert ledger.committed([import_key(urls[0])]) == {import_key(urls[0]): 1}
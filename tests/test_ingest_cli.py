@@ -0,0 +1,90 @@
+import pytest
+
+from ingest_cli import Checkpoints, get_args, ingest_file, iter_urls_from_file
+from utils.duplicate_detector import URLIndex
+from utils.ingest_pipeline import PipelineStats
+
+
+class RecordingPipeline:
+    """Stands in for IngestPipeline; ingested URLs land in the store's URL index."""
+
+    def __init__(self, url_index, fail_after=None, failing=()):
+        self.url_index = url_index
+        self.runs = []
+        self.fail_after = fail_after
+        self.failing = set(failing)
+
+    def run(self, urls):
+        if self.fail_after is not None and len(self.runs) >= self.fail_after:
+            raise KeyboardInterrupt
+        urls = list(urls)
+        self.runs.append(urls)
+        stats = PipelineStats(total_urls=len(urls))
+        stats.failures = {url: "HTTP 503" for url in urls if url in self.failing}
+        self.url_index.add(url for url in urls if url not in self.failing)
+        stats.chunks = len(urls) - len(stats.failures)
+        return stats
+
+
+def test_iter_urls_from_csv_and_text(tmp_path):
+    csv_path = tmp_path / "urls.csv"
+    csv_path.write_text('title,Link\n"A, with comma",https://a.example/1\nB,not a url\nC,https://b.example/2\n')
+    txt_path = tmp_path / "urls.txt"
+    txt_path.write_text("https://a.example/1\n\n# comment\nhttps://a.example/2\n")
+
+    assert list(iter_urls_from_file(str(csv_path))) == [(1, "https://a.example/1"), (3, "https://b.example/2")]
+    assert list(iter_urls_from_file(str(txt_path))) == [(1, "https://a.example/1"), (4, "https://a.example/2")]
+
+
+def test_ingest_file_checkpoints_and_resumes(tmp_path):
+    input_path = tmp_path / "urls.txt"
+    input_path.write_text("".join(f"https://example.com/{i}\n" for i in range(10)) + "https://example.com/0/\n")
+    store_path = tmp_path / "store"
+    store_path.mkdir()
+    url_index = URLIndex.for_store(str(store_path))
+    url_index.add(["https://example.com/9"])
+
+    # Interrupted after the first window of 4 URLs
+    pipeline = RecordingPipeline(url_index, fail_after=1)
+    try:
+        ingest_file(str(input_path), pipeline, Checkpoints(str(store_path)), url_index, window=4)
+    except KeyboardInterrupt:
+        pass
+    assert Checkpoints(str(store_path)).rows_done(str(input_path)) == 4
+
+    pipeline = RecordingPipeline(url_index)
+    totals = ingest_file(str(input_path), pipeline, Checkpoints(str(store_path)), url_index, window=4)
+
+    resumed = sorted(url for run in pipeline.runs for url in run)
+    assert resumed == [f"https://example.com/{i}" for i in range(4, 9)]
+    # Already stored: /9 from before, /0/ (same as /0) from the interrupted run
+    assert totals["skipped"] == 2
+    assert Checkpoints(str(store_path)).rows_done(str(input_path)) == 11
+
+
+def test_failed_urls_hold_the_checkpoint_until_retried(tmp_path):
+    input_path = tmp_path / "urls.txt"
+    input_path.write_text("".join(f"https://example.com/{i}\n" for i in range(8)))
+    store_path = tmp_path / "store"
+    store_path.mkdir()
+    url_index = URLIndex.for_store(str(store_path))
+
+    pipeline = RecordingPipeline(url_index, failing={"https://example.com/5"})
+    totals = ingest_file(str(input_path), pipeline, Checkpoints(str(store_path)), url_index, window=2)
+    assert totals["failed"] == 1
+    # Later windows still ran, but the checkpoint stays before the failed window
+    assert pipeline.runs[-1] == ["https://example.com/6", "https://example.com/7"]
+    assert Checkpoints(str(store_path)).rows_done(str(input_path)) == 4
+
+    pipeline = RecordingPipeline(url_index)
+    totals = ingest_file(str(input_path), pipeline, Checkpoints(str(store_path)), url_index, window=2)
+    assert pipeline.runs == [["https://example.com/5"]]
+    assert totals["skipped"] == 3
+    assert Checkpoints(str(store_path)).rows_done(str(input_path)) == 8
+
+
+def test_user_is_sanitized_like_app_user_ids():
+    assert get_args(["urls.txt", "--user", "../Charles Guo"]).user == "charles_guo"
+    assert get_args(["urls.txt", "--user", "a/../../b"]).user == "a_b"
+    with pytest.raises(SystemExit):
+        get_args(["urls.txt", "--user", "../.."])
@@ -0,0 +1,121 @@
+import threading
+import time
+from unittest.mock import patch
+
+from simple_vector_store import SimpleVectorStore
+from utils.http_cache import CachedResponse
+from utils.ingest_pipeline import IngestPipeline, STAGES
+from utils.politeness import PolitenessScheduler
+
+
+class SlowEmbeddings:
+    def __init__(self, *args, **kwargs):
+        self.requests = []
+
+    def embed_documents(self, texts):
+        self.requests.append(list(texts))
+        time.sleep(0.05)
+        return [[float(len(t)), 1.0] for t in texts]
+
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+def fetch(url):
+    if url.endswith("/broken"):
+        return CachedResponse(url=url, status=500)
+    if url.endswith(".pdf"):
+        return CachedResponse(url=url, status=200, headers={"Content-Type": "application/pdf"}, body=b"%PDF-1.4")
+    if url.endswith("/empty"):
+        return CachedResponse(url=url, status=200, headers={"Content-Type": "text/html"})
+    html = f"<html><title>{url}</title><body><p>Content of {url}</p></body></html>"
+    return CachedResponse(url=url, status=200, headers={"Content-Type": "text/html"}, body=html.encode())
+
+
+def _pipeline(tmp_path, **kwargs):
+    with patch('simple_vector_store.OpenAIEmbeddings', SlowEmbeddings):
+        store = SimpleVectorStore(store_path=str(tmp_path / "store"))
+    scheduler = PolitenessScheduler(default_delay=0, respect_robots=False)
+    return store, IngestPipeline(store, batch_size=3, scheduler=scheduler, fetch=fetch, **kwargs)
+
+
+def test_pipeline_overlaps_stages_and_writes_incrementally(tmp_path):
+    events = []
+    lock = threading.Lock()
+
+    def on_progress(stage, urls, seconds):
+        with lock:
+            events.append((stage, tuple(urls)))
+
+    urls = [f"https://example.com/{i}" for i in range(9)] + ["https://example.com/broken"]
+    store, pipeline = _pipeline(tmp_path, on_progress=on_progress)
+    stats = pipeline.run(urls)
+
+    assert stats.stages["write"].urls == 10
+    assert stats.chunks == 9 and stats.added == 9
+    assert stats.failures == {"https://example.com/broken": "HTTP 500"}
+    assert len(store.sources) == 9
+    # One embedding request per batch with new chunks, not one per page
+    assert len(store.embedding.requests) == 3
+    # The second batch was fetched while the first was still being embedded
+    first, second = tuple(urls[:3]), tuple(urls[3:6])
+    assert events.index(("fetch", second)) < events.index(("write", first))
+    assert {stage for stage, _ in events} == set(STAGES)
+
+    # A second run over unchanged pages embeds nothing
+    store.embedding.requests.clear()
+    stats = pipeline.run(urls)
+    assert stats.unchanged_sources == 9 and stats.added == 0
+    assert store.embedding.requests == []
+
+
+def test_pages_without_a_document_fail_instead_of_committing(tmp_path):
+    from utils.import_ledger import COMMITTED, FAILED, ImportLedger, import_key
+
+    ledger = ImportLedger(":memory:")
+    urls = ["https://example.com/paper.pdf", "https://example.com/empty", "https://example.com/page"]
+    store, pipeline = _pipeline(tmp_path, ledger=ledger)
+    stats = pipeline.run(urls)
+
+    assert stats.failures == {urls[0]: "not HTML", urls[1]: "empty body"}
+    assert stats.chunks_by_url == {urls[2]: 1}
+    assert [ledger.get(import_key(url))["state"] for url in urls] == [FAILED, FAILED, COMMITTED]
+
+
+def test_cancelled_pipeline_writes_nothing(tmp_path):
+    store, pipeline = _pipeline(tmp_path, cancelled=lambda: True)
+    stats = pipeline.run([f"https://example.com/{i}" for i in range(6)])
+    assert stats.stages["fetch"].urls == 0
+    assert store.metadata == []
+
+
+def test_shared_store_keeps_writes_made_through_other_instances(tmp_path):
+    from langchain.docstore.document import Document
+    from utils.job_queue import get_store, store_lock
+
+    path = str(tmp_path / "store")
+    with patch('simple_vector_store.OpenAIEmbeddings', SlowEmbeddings):
+        shared = get_store(path)
+        page = SimpleVectorStore(store_path=path)
+    notes = iter(["first user note", "second user note"])
+
+    def on_progress(stage, urls, seconds):
+        # A page saves a note while the worker's batches are in flight
+        if stage == "embed":
+            page.refresh()
+            page.add_documents([Document(page_content=next(notes), metadata={"source": "notes"})])
+
+    scheduler = PolitenessScheduler(default_delay=0, respect_robots=False)
+    pipeline = IngestPipeline(
+        shared, batch_size=3, scheduler=scheduler, fetch=fetch,
+        write_lock=store_lock(path), on_progress=on_progress
+    )
+    stats = pipeline.run([f"https://example.com/{i}" for i in range(6)])
+    assert stats.added == 6
+
+    with patch('simple_vector_store.OpenAIEmbeddings', SlowEmbeddings):
+        on_disk = SimpleVectorStore(store_path=path)
+    texts = [meta["text"] for meta in on_disk.metadata]
+    assert len(on_disk.metadata) == 8
+    assert len(on_disk.sources) == 6
+    assert {"first user note", "second user note"} <= set(texts)
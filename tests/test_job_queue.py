@@ -0,0 +1,65 @@
+import threading
+
+from utils.job_queue import (
+    JobQueue, WorkerPool, wait_for_job,
+    COMPLETED, CANCELLED, DONE, FAILED, PENDING,
+)
+
+
+def test_worker_pool_processes_job_with_retries(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    urls = [f"https://example.com/{i}" for i in range(25)]
+    job_id = queue.enqueue("./vector_store_test", urls, {"category": "NLP"})
+    seen = []
+    lock = threading.Lock()
+
+    def handler(job, batch):
+        assert job["options"] == {"category": "NLP"}
+        with lock:
+            seen.extend(batch)
+        # /3 always fails, /4 only on its first attempt
+        failures = {url: "HTTP 500" for url in batch if url.endswith("/3")}
+        if "https://example.com/4" in batch and seen.count("https://example.com/4") == 1:
+            failures["https://example.com/4"] = "timeout"
+        return {url: 2 for url in batch if url not in failures}, failures
+
+    pool = WorkerPool(queue, handler, workers=3, batch_size=4, poll_interval=0.01)
+    pool.start()
+    try:
+        job = wait_for_job(queue, job_id, timeout=10)
+    finally:
+        pool.stop(timeout=5)
+
+    counts = queue.progress(job_id)
+    assert job["status"] == COMPLETED
+    assert counts[DONE] == 24 and counts[FAILED] == 1
+    assert counts["chunks"] == 48
+    assert queue.failures(job_id) == {"https://example.com/3": "HTTP 500"}
+    assert seen.count("https://example.com/3") == 2
+
+
+def test_cancel_and_resume_after_restart(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    queue = JobQueue(db_path)
+    job_id = queue.enqueue("./store", [f"https://example.com/{i}" for i in range(10)])
+    other_id = queue.enqueue("./store", ["https://example.com/other"])
+
+    # A batch claimed by a process that died mid-way
+    job, claimed = queue.claim(3)
+    assert job["id"] == job_id and len(claimed) == 3
+    queue.close()
+
+    queue = JobQueue(db_path)
+    assert queue.requeue_interrupted() == 3
+    assert queue.progress(job_id)[PENDING] == 10
+
+    job, claimed = queue.claim(5)
+    queue.cancel(job_id)
+    for url in claimed:
+        queue.complete(job_id, url, 1)
+    assert queue.get_job(job_id)["status"] == CANCELLED
+    assert queue.progress(job_id)[CANCELLED] == 10
+
+    # Cancelled jobs are skipped; the next job is picked up
+    job, claimed = queue.claim(5)
+    assert job["id"] == other_id and claimed == ["https://example.com/other"]
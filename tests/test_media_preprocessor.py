@@ -0,0 +1,82 @@
+import io
+import os
+import subprocess
+
+import pytest
+
+from utils.media_preprocessor import MediaWorkspace, ffmpeg_executable, plan_segments, probe_duration
+
+
+@pytest.fixture
+def video_bytes(tmp_path):
+    path = tmp_path / "clip.mp4"
+    try:
+        ffmpeg = ffmpeg_executable()
+    except RuntimeError:
+        pytest.skip("ffmpeg not available")
+    subprocess.run([
+        ffmpeg, "-nostdin", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", "testsrc=duration=2:size=160x120:rate=10",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=2:sample_rate=44100",
+        "-ac", "2", "-shortest", str(path)
+    ], check=True)
+    return path.read_bytes()
+
+
+class Upload(io.BytesIO):
+    name = "../lecture.mp4"
+
+
+def test_extracts_mono_audio_and_cleans_up(tmp_path, video_bytes):
+    with MediaWorkspace(base_dir=str(tmp_path / "media")) as workspace:
+        video_path = workspace.save_upload(Upload(video_bytes))
+        assert os.path.dirname(video_path) == workspace.path
+        assert os.path.getsize(video_path) == len(video_bytes)
+
+        audio_path = workspace.extract_audio(video_path)
+        probe = subprocess.run([ffmpeg_executable(), "-hide_banner", "-i", audio_path],
+                               stderr=subprocess.PIPE).stderr.decode()
+        assert "mono" in probe and "16000 Hz" in probe
+        workspace_path = workspace.path
+
+    assert not os.path.exists(workspace_path)
+    assert set(workspace.timings.stages) == {"save", "extract_audio"}
+
+
+def test_failed_extraction_raises_and_still_cleans_up(tmp_path):
+    with pytest.raises(RuntimeError, match="Audio extraction failed"):
+        with MediaWorkspace(base_dir=str(tmp_path)) as workspace:
+            workspace.extract_audio(workspace.save_upload(Upload(b"not a video")))
+    assert os.listdir(tmp_path) == []
+
+
+def test_plan_segments_cuts_inside_silences_near_the_target():
+    silences = [(95.0, 97.0), (290.0, 292.0), (310.0, 311.0), (590.0, 594.0)]
+    assert plan_segments(500.0, silences) == [(0.0, 500.0)]
+    assert plan_segments(1000.0, silences) == [(0.0, 291.0), (291.0, 592.0), (592.0, 1000.0)]
+    # No silence to cut at: hard cuts at the target length
+    assert plan_segments(1300.0, []) == [(0.0, 300.0), (300.0, 600.0), (600.0, 900.0), (900.0, 1300.0)]
+
+
+def test_split_on_silence_writes_segments_covering_the_audio(tmp_path):
+    try:
+        ffmpeg = ffmpeg_executable()
+    except RuntimeError:
+        pytest.skip("ffmpeg not available")
+    audio = tmp_path / "talk.mp3"
+    subprocess.run([
+        ffmpeg, "-nostdin", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", "aevalsrc='if(lt(mod(t,10),8),sin(2*PI*440*t),0)':d=40:s=16000",
+        "-ac", "1", "-b:a", "32k", str(audio)
+    ], check=True)
+
+    with MediaWorkspace(base_dir=str(tmp_path / "media")) as workspace:
+        short = workspace.split_on_silence(str(audio), target=15, max_length=60)
+        segments = workspace.split_on_silence(str(audio), target=15, max_length=20)
+        durations = [probe_duration(segment.path) for segment in segments]
+
+    assert [(s.start, s.path) for s in short] == [(0.0, str(audio))]
+    assert len(segments) == 3 and segments[0].start == 0.0
+    assert all(8 <= s.start % 10 <= 10 for s in segments[1:])
+    assert sum(durations) == pytest.approx(40, abs=0.5)
+    assert "detect_silence" in workspace.timings.stages and "split" in workspace.timings.stages
@@ -0,0 +1,108 @@
+from langchain.docstore.document import Document
+
+from utils.context_packer import ContextPacker
+from utils.qa_cache import QACache, answer_question, normalize_question
+
+
+def docs(*texts):
+    return [Document(page_content=t, metadata={"category": "NLP"}) for t in texts]
+
+
+def test_normalize_question():
+    assert normalize_question("  What are   Transformers?? ") == "what are transformers"
+    assert normalize_question("what are transformers") == normalize_question("What are transformers?")
+
+
+def test_store_version_increases_with_every_write_and_persists(make_store):
+    store = make_store()
+    assert store.version == 0
+    ids = store.add_documents(docs("attention", "retrieval", "agents"))
+    assert store.version == 1  # one batch, one save
+    store.update_metadata({"category": "NLP"}, {"category": "ML"})
+    store.delete(ids[:1])
+    assert store.version == 3
+
+    other = make_store()
+    assert other.version == 3 and not other.refresh()
+    store.add_documents(docs("planning"))
+    assert other.refresh()
+    assert other.version == 4 and len(other.metadata) == 3
+    # A stale instance writing continues from the newest version
+    stale_version = store.version
+    other.add_documents(docs("memory"))
+    store.add_documents(docs("tools"))
+    assert store.version == stale_version + 2
+
+
+def test_search_ids_round_trip_to_documents(make_store):
+    store = make_store()
+    store.add_documents(docs("a", "bbbb", "cccccccc"))
+    ids = store.similarity_search_ids("bbbb", k=2)
+    assert [d.page_content for d in store.get_documents(ids)] == \
+        [d.page_content for d in store.similarity_search("bbbb", k=2)]
+    store.delete(ids[:1])
+    assert len(store.get_documents(ids)) == 1
+
+
+def test_repeated_question_skips_embedding_and_llm_until_store_changes(make_store):
+    cache = QACache()
+    calls = []
+
+    def generate(documents):
+        calls.append([d.page_content for d in documents])
+        return f"answer {len(calls)}"
+
+    store = make_store()
+    store.add_documents(docs("attention is all you need", "retrieval augmented generation"))
+    ask = lambda q: answer_question(store, q, generate, cache, model="m", prompt="p", k=1)
+
+    first = ask("What is attention?")
+    embeds = store.embedding.queries
+    again = ask("what is attention")
+    assert again.answer == first.answer == "answer 1"
+    assert again.retrieval_cached and again.answer_cached
+    assert store.embedding.queries == embeds and len(calls) == 1
+
+    # A different model or prompt needs a new answer for the same chunks
+    other = answer_question(store, "What is attention?", generate, cache, model="m2", prompt="p", k=1)
+    assert other.retrieval_cached and not other.answer_cached
+
+    # A write invalidates retrieval; the answer is reused if the same chunks come back
+    store.add_documents(docs("x"))
+    after = ask("What is attention?")
+    assert not after.retrieval_cached
+    assert after.answer_cached == (after.chunk_ids == first.chunk_ids)
+
+    assert cache.stats.retrieval_hits == 2 and cache.stats.answer_hits >= 1
+
+
+def test_packer_shapes_generated_context_and_answer_key(make_store):
+    cache = QACache()
+    seen = []
+
+    def generate(documents):
+        seen.append([d.page_content for d in documents])
+        return "answer"
+
+    text = "a" * 600
+    store = make_store()
+    store.add_documents([Document(page_content=text, metadata={"source_url": "u"})])
+    ask = lambda packer: answer_question(store, "q", generate, cache, model="m", prompt="p", k=1, packer=packer)
+
+    result = ask(ContextPacker(max_tokens=100, min_partial_tokens=10))
+    assert result.documents[0].page_content == text  # the retrieved chunk is still shown in full
+    assert len(seen[0][0]) < len(text)
+    assert result.packing.saved_tokens > 0
+    assert ask(ContextPacker(max_tokens=100, min_partial_tokens=10)).answer_cached
+    # A different budget produces different context, so a new answer
+    assert not ask(ContextPacker(max_tokens=1000)).answer_cached
+    assert seen[-1] == [text]
+
+
+def test_lru_evicts_oldest_entries():
+    cache = QACache(max_retrievals=2)
+    keys = [cache.retrieval_key("s", 1, f"q{i}", 4) for i in range(3)]
+    for key in keys:
+        cache.put_retrieval(key, ["id"])
+    assert cache.get_retrieval(keys[0]) is None
+    assert cache.get_retrieval(keys[2]) == ["id"]
@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+import numpy as np
+from langchain.docstore.document import Document
+
+from simple_vector_store import SimpleVectorStore
+from utils.qa_cache import QACache, answer_question
+from utils.semantic_cache import SemanticCache
+
+TOPICS = ("transformers", "attention", "retrieval")
+
+
+class TopicEmbeddings:
+    """Embeds text by the topics it mentions, so rephrasings embed alike."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def _embed(self, text):
+        words = text.lower()
+        return [float(topic in words) for topic in TOPICS] + [0.1]
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def test_lookup_needs_threshold_and_same_context():
+    cache = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0, 0.0], "ctx", "what are transformers", "answer", seconds=2.0)
+
+    hit = cache.lookup([0.99, 0.05, 0.0], "ctx")
+    assert hit.answer == "answer" and hit.question == "what are transformers" and hit.similarity > 0.9
+    assert cache.lookup([0.6, 0.8, 0.0], "ctx") is None
+    assert cache.lookup([1.0, 0.0, 0.0], "other ctx") is None
+    assert cache.stats.lookups == 3 and cache.stats.hits == 1
+    assert cache.stats.saved_seconds == 2.0 and abs(cache.stats.hit_rate - 1 / 3) < 1e-9
+
+
+def test_picks_nearest_question_and_overwrites_oldest_when_full():
+    cache = SemanticCache(threshold=0.5, max_entries=2)
+    cache.add([1.0, 0.0], "ctx", "q1", "a1", 1.0)
+    cache.add([0.8, 0.6], "ctx", "q2", "a2", 1.0)
+    assert cache.lookup([0.75, 0.66], "ctx").answer == "a2"
+    cache.add([0.0, 1.0], "ctx", "q3", "a3", 1.0)
+    assert len(cache) == 2
+    assert cache.lookup([1.0, 0.0], "ctx").answer == "a2"  # q1 was overwritten
+
+
+def test_rephrased_question_reuses_answer_while_context_is_unchanged(tmp_path):
+    calls = []
+
+    def generate(documents):
+        calls.append(documents)
+        return f"answer {len(calls)}"
+
+    semantic = SemanticCache(threshold=0.95)
+    cache = QACache()
+    with patch('simple_vector_store.OpenAIEmbeddings', TopicEmbeddings):
+        store = SimpleVectorStore(store_path=str(tmp_path))
+        store.add_documents([
+            Document(page_content="Transformers stack self-attention layers", metadata={}),
+            Document(page_content="Retrieval augments generation with documents", metadata={}),
+        ])
+        ask = lambda q: answer_question(store, q, generate, cache, "m", "p", k=1, semantic_cache=semantic)
+
+        first = ask("What are transformers?")
+        second = ask("Explain transformers")
+        assert second.answer == first.answer == "answer 1"
+        assert second.similar_question == "What are transformers?" and second.similarity > 0.95
+        assert ask("How does retrieval work?").answer == "answer 2"
+
+        # Different retrieved context: no reuse even for the same topic
+        store.add_documents([Document(page_content="transformers", metadata={})])
+        assert ask("Tell me about transformers").answer == "answer 3"
+
+    assert len(calls) == 3
+    assert semantic.stats.hits == 1 and semantic.stats.saved_seconds >= 0
+
+
+def test_lookup_is_one_vectorized_scan():
+    cache = SemanticCache(threshold=0.99, max_entries=5000)
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(5000, 64))
+    for i, vector in enumerate(vectors):
+        cache.add(vector, "ctx", f"q{i}", f"a{i}", 0.5)
+    assert cache.lookup(vectors[1234] * 3, "ctx").answer == "a1234"
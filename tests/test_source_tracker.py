@@ -0,0 +1,71 @@
+from langchain.docstore.document import Document
+
+from utils.source_tracker import diff_chunks, content_hash
+
+
+def test_diff_chunks_splits_new_kept_and_stale():
+    existing = {content_hash("a"): "id-a", content_hash("b"): "id-b"}
+    diff = diff_chunks("https://example.com", ["a", "c"], existing)
+    assert diff.new_texts == ["c"]
+    assert diff.kept == {content_hash("a"): "id-a"}
+    assert diff.stale_ids == ["id-b"]
+
+
+def test_reingesting_unchanged_source_is_noop(make_store):
+    store = make_store()
+    store.ingest_source("https://example.com", ["one", "two"])
+    store.embedding.embedded.clear()
+
+    diff = store.ingest_source("https://example.com", ["one", "two"])
+
+    assert diff.unchanged
+    assert store.embedding.embedded == []
+    assert len(store.metadata) == 2
+
+
+def test_changed_source_embeds_only_new_chunks(make_store):
+    store = make_store()
+    store.ingest_source("https://example.com", ["one", "two"])
+    store.embedding.embedded.clear()
+
+    diff = store.ingest_source("https://example.com", ["one", "three"])
+
+    assert store.embedding.embedded == ["three"]
+    assert diff.summary() == {"added": 1, "kept": 1, "removed": 1}
+    assert sorted(m["text"] for m in store.metadata) == ["one", "three"]
+    assert len(store.vectors) == 2
+
+    reloaded = make_store()
+    assert set(reloaded.sources["https://example.com"]["chunks"].values()) == {
+        m["id"] for m in reloaded.metadata
+    }
+
+
+def test_url_index_updated_on_write(make_store):
+    store = make_store()
+    store.ingest_source("https://example.com/a", ["one"])
+    assert "https://www.example.com/a/" in make_store().url_index
+
+    store.delete([m["id"] for m in store.metadata])
+    assert "https://example.com/a" not in make_store().url_index
+
+
+def test_diff_chunks_embeds_repeated_chunks_once():
+    existing = {content_hash("a"): "id-a"}
+    diff = diff_chunks("https://example.com", ["a", "b", "a", "b", "c"], existing)
+    assert diff.new_texts == ["b", "c"]
+    assert diff.new_chunk_hashes == [content_hash("b"), content_hash("c")]
+    assert diff.kept == {content_hash("a"): "id-a"}
+
+
+def test_url_index_skips_notes_and_transcripts_that_link_a_url(make_store):
+    store = make_store()
+    store.add_documents([
+        Document(page_content="my note", metadata={"type": "note", "source_url": "https://example.com/linked"}),
+        Document(page_content="a lecture", metadata={"type": "video", "source_url": "https://youtu.be/abc"}),
+        Document(page_content="a page", metadata={"type": "url", "source_url": "https://example.com/page"}),
+    ])
+    for url_index in (store.url_index, make_store().url_index):
+        assert "https://example.com/page" in url_index
+        assert "https://example.com/linked" not in url_index
+        assert "https://youtu.be/abc" not in url_index
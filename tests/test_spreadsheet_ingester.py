@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from utils.spreadsheet_ingester import SpreadsheetStats, iter_row_groups, spreadsheet_documents
+
+
+def _workbook(path):
+    workbook = Workbook()
+    papers = workbook.active
+    papers.title = "Papers"
+    papers.append(["Title", "Year", "Added", None])
+    papers.append([None, None, None])
+    for i in range(1, 6):
+        papers.append([f"Paper {i}", 2020.0 + i, datetime(2024, 1, i), None])
+    models = workbook.create_sheet("Models")
+    models.append(["Name", "Notes"])
+    models.append(["BERT", "x" * 50])
+    models.append(["GPT", "y" * 50])
+    workbook.save(path)
+    return path
+
+
+def test_row_groups_cover_every_sheet_without_splitting_rows(tmp_path):
+    path = _workbook(tmp_path / "book.xlsx")
+    stats = SpreadsheetStats()
+    groups = list(iter_row_groups(str(path), rows_per_chunk=2, max_chars=80, stats=stats))
+
+    assert [(g.sheet, g.first_row, g.last_row) for g in groups] == [
+        ("Papers", 3, 4), ("Papers", 5, 6), ("Papers", 7, 7), ("Models", 2, 2), ("Models", 3, 3)
+    ]
+    assert groups[0].header == ["Title", "Year", "Added"]
+    assert groups[0].rows[0] == ["Paper 1", "2021", "2024-01-01T00:00:00"]
+    assert stats.sheets == ["Papers", "Models"] and stats.rows == 7
+
+
+def test_documents_repeat_header_and_carry_row_range(tmp_path):
+    path = _workbook(tmp_path / "book.xlsx")
+    stats = SpreadsheetStats()
+    documents = list(spreadsheet_documents(str(path), {"filename": "book.xlsx"}, stats=stats))
+
+    assert len(documents) == stats.chunks == 2
+    assert documents[1].page_content.splitlines()[:2] == ["Sheet: Models (rows 2-3)", "Name | Notes"]
+    assert documents[0].metadata == {"filename": "book.xlsx", "sheet": "Papers", "row_start": 3, "row_end": 7}
@@ -0,0 +1,255 @@
+import io
+import os
+import subprocess
+
+import pytest
+
+from tests.fake_assemblyai_server import FakeAssemblyAI
+from utils.media_preprocessor import ffmpeg_executable
+from utils.transcription_jobs import (
+    ERROR, INGESTED, PROCESSING, AssemblyAIClient, TranscriptionJobs, ingest_transcript,
+    upload_audio, youtube_timestamp_url, youtube_video_id
+)
+from utils.upload_cache import UploadCache, UploadLedger
+
+
+@pytest.fixture
+def fake_api():
+    server = FakeAssemblyAI(polls_until_done=3)
+    base_url = server.start()
+    yield server, base_url
+    server.stop()
+
+
+def make_jobs(tmp_path, base_url, ingested, **options):
+    def ingest(job, segment):
+        ingested.append((job["source"], segment["text"]))
+        return 1
+
+    return TranscriptionJobs(
+        db_path=str(tmp_path / "jobs.db"),
+        client=AssemblyAIClient(api_key="test", base_url=base_url),
+        cache=UploadCache(str(tmp_path / "cache")),
+        ingest=ingest,
+        poll_interval=0.01,
+        max_poll_interval=0.05,
+        **options
+    )
+
+
+@pytest.fixture
+def lecture_bytes(tmp_path):
+    """60s of mono speech stand-in: 8s tone, 2s silence, repeated."""
+    path = tmp_path / "lecture.mp3"
+    try:
+        ffmpeg = ffmpeg_executable()
+    except RuntimeError:
+        pytest.skip("ffmpeg not available")
+    subprocess.run([
+        ffmpeg, "-nostdin", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", "aevalsrc='if(lt(mod(t,10),8),sin(2*PI*440*t),0)':d=60:s=16000",
+        "-ac", "1", "-b:a", "32k", str(path)
+    ], check=True)
+    return path.read_bytes()
+
+
+def test_youtube_video_id_variants():
+    assert youtube_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10") == "dQw4w9WgXcQ"
+    assert youtube_video_id("https://youtu.be/dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    assert youtube_video_id(" https://youtube.com/shorts/dQw4w9WgXcQ ") == "dQw4w9WgXcQ"
+    assert youtube_video_id("https://example.com/video") == youtube_video_id("https://example.com/video")
+    assert youtube_timestamp_url("https://youtu.be/dQw4w9WgXcQ?t=5", 90.7) == "https://youtu.be/dQw4w9WgXcQ?t=90s"
+
+
+def test_job_polls_with_backoff_then_ingests_and_caches(tmp_path, fake_api):
+    server, base_url = fake_api
+    ingested = []
+    jobs = make_jobs(tmp_path, base_url, ingested)
+    jobs.start()
+    try:
+        staged = upload_audio(io.BytesIO(b"hello world"), "talk.mp3")
+        assert open(staged.path, 'rb').read() == b"hello world"
+        job_id = jobs.submit("hash-1", "audio", "talk.mp3", "store", staged)
+        job = jobs.wait(job_id, timeout=10)
+        [segment] = jobs.segments(job_id)
+    finally:
+        jobs.close()
+
+    assert job["status"] == INGESTED
+    assert job["chunks"] == 1
+    assert segment["poll_interval"] > 0.01  # backed off while processing
+    assert ingested == [("talk.mp3", "Transcript: hello world")]
+    assert server.requests["poll"] == 3
+    assert jobs.cache.get("hash-1", "transcript")["text"] == "Transcript: hello world"
+    assert not os.path.exists(staged.path)
+
+
+def test_cached_transcript_skips_the_service(tmp_path, fake_api):
+    server, base_url = fake_api
+    UploadCache(str(tmp_path / "cache")).put("hash-2", "transcript", {"text": "already known"})
+    ingested = []
+    jobs = make_jobs(tmp_path, base_url, ingested)
+    jobs.start()
+    try:
+        staged = upload_audio(io.BytesIO(b"x"), "clip.mp4")
+        job = jobs.wait(jobs.submit("hash-2", "video", "clip.mp4", "store", staged))
+    finally:
+        jobs.close()
+    # The staged upload is removed without being transcribed
+    assert not os.path.exists(staged.path)
+
+    assert job["status"] == INGESTED
+    assert ingested == [("clip.mp4", "already known")]
+    assert server.requests == {"upload": 0, "submit": 0, "poll": 0}
+
+
+def test_failed_transcript_is_reported_and_not_cached(tmp_path, fake_api):
+    _, base_url = fake_api
+    jobs = make_jobs(tmp_path, base_url, [])
+    jobs.start()
+    try:
+        job = jobs.wait(jobs.submit("hash-3", "audio", "bad.mp3", "store", upload_audio(io.BytesIO(b"ERROR: no speech"), "bad.mp3")))
+    finally:
+        jobs.close()
+
+    assert job["status"] == ERROR
+    assert "no speech" in job["error"]
+    assert jobs.cache.get("hash-3", "transcript") is None
+
+
+def test_submitted_jobs_resume_after_restart(tmp_path, fake_api):
+    _, base_url = fake_api
+    first = make_jobs(tmp_path, base_url, [])
+    job_id = first.submit("hash-4", "audio", "long.mp3", "store", upload_audio(io.BytesIO(b"resumed"), "long.mp3"))
+    # No poller yet: wait for the upload to be submitted, then "restart"
+    first.stop()
+    assert first.get_job(job_id)["status"] == PROCESSING
+    first.close()
+
+    ingested = []
+    second = make_jobs(tmp_path, base_url, ingested)
+    second.start()
+    try:
+        job = second.wait(job_id, timeout=10)
+    finally:
+        second.close()
+    assert job["status"] == INGESTED
+    assert ingested == [("long.mp3", "Transcript: resumed")]
+
+
+def test_long_audio_is_split_and_segments_ingested_as_they_finish(tmp_path, fake_api, lecture_bytes):
+    server, base_url = fake_api
+    segments = []
+    jobs = make_jobs(tmp_path, base_url, [], max_parallel_segments=2, segment_target=15, segment_max=20)
+    jobs.ingest = lambda job, segment: segments.append(segment) or 1
+    jobs.start()
+    try:
+        job = jobs.wait(jobs.submit("hash-6", "audio", "lecture.mp3", "store", upload_audio(io.BytesIO(lecture_bytes), "lecture.mp3")))
+        stored = jobs.segments(job["id"])
+    finally:
+        jobs.close()
+
+    assert job["status"] == INGESTED
+    assert job["segments"] == len(segments) == 4 and job["chunks"] == 4
+    assert server.max_in_progress == 2
+    # Cuts fall inside the silences and the segments cover the whole recording
+    spans = sorted((s["start"], s["end"]) for s in segments)
+    assert spans[0][0] == 0.0 and spans[-1][1] == pytest.approx(60, abs=0.5)
+    assert all(prev[1] == nxt[0] and 8 <= nxt[0] % 10 <= 10 for prev, nxt in zip(spans, spans[1:]))
+    assert [s["last"] for s in segments].count(True) == 1 and segments[-1]["last"]
+    assert [s["status"] for s in stored] == [INGESTED] * 4
+
+    cached = jobs.cache.get("hash-6", "transcript")
+    assert [(s["start"], s["end"]) for s in cached["segments"]] == spans
+    assert cached["text"] == "\n\n".join(s["text"] for s in stored)
+
+
+def test_failed_job_discards_the_segments_it_ingested(tmp_path, fake_api):
+    _, base_url = fake_api
+    UploadCache(str(tmp_path / "cache")).put("hash-7", "transcript", {"text": "a b c", "segments": [
+        {"start": 0.0, "end": 300.0, "text": "a"},
+        {"start": 300.0, "end": 600.0, "text": "b"},
+        {"start": 600.0, "end": 900.0, "text": "c"},
+    ]})
+    ingested, discarded = [], []
+
+    def ingest(job, segment):
+        if segment["text"] == "b":
+            raise RuntimeError("store is read-only")
+        ingested.append(segment["text"])
+        return 2
+
+    jobs = make_jobs(tmp_path, base_url, [], discard=lambda job: discarded.append(job["id"]) or job["chunks"])
+    jobs.ingest = ingest
+    jobs.start()
+    try:
+        job = jobs.wait(jobs.submit("hash-7", "audio", "talk.mp3", "store", upload_audio(io.BytesIO(b"x"), "talk.mp3")))
+    finally:
+        jobs.close()
+
+    assert job["status"] == ERROR and "read-only" in job["error"]
+    assert ingested == ["a"] and discarded == [job["id"]]
+    assert job["chunks"] == 0
+
+
+def test_default_discard_removes_only_the_jobs_chunks(tmp_path, make_store):
+    from langchain.docstore.document import Document
+    from utils.transcription_jobs import discard_transcript
+
+    store_path = str(tmp_path / "store")
+    job = {"id": 3, "key": "hash-8", "source": "talk.mp3", "kind": "audio", "store_path": store_path,
+           "chunks": 0, "metadata": {"file_hash": "hash-8"}}
+    make_store(store_path).add_documents([Document(page_content="user note", metadata={})])
+    ingest_transcript(job, {"index": 0, "start": 0.0, "end": 300.0, "text": "first part", "last": False})
+    assert discard_transcript(job) == 1
+    on_disk = make_store(store_path)
+
+    assert [meta["text"] for meta in on_disk.metadata] == ["user note"]
+    assert UploadLedger.for_store(store_path).get("hash-8") is None
+
+
+def test_default_ingest_adds_timed_chunks_and_records_upload(tmp_path, fake_embeddings):
+    store_path = str(tmp_path / "store")
+    job = {
+        "id": 5, "key": "hash-5", "source": "talk.mp3", "kind": "audio", "store_path": store_path, "chunks": 3,
+        "metadata": {"filename": "talk.mp3", "file_hash": "hash-5"},
+    }
+    segment = {"index": 1, "start": 300.0, "end": 612.5, "text": "word " * 3000, "count": 2, "last": True}
+    chunks = ingest_transcript(job, segment)
+    from utils.job_queue import get_store
+    store = get_store(store_path)
+    docs = store.similarity_search("word", k=10, filter={"file_hash": "hash-5"})
+
+    assert chunks == len(docs) > 1
+    assert all(doc.metadata["type"] == "audio" for doc in docs)
+    assert all((doc.metadata["start_time"], doc.metadata["end_time"]) == (300.0, 612.5) for doc in docs)
+    assert UploadLedger.for_store(store_path).get("hash-5")["chunks"] == chunks + 3
+    assert os.path.isdir(store_path)
+
+
+def test_default_ingest_links_youtube_segments_to_their_timestamp(tmp_path, fake_embeddings):
+    link = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+    job = {"id": 1, "key": "youtube_dQw4w9WgXcQ", "source": link, "kind": "video", "store_path": str(tmp_path / "store"), "chunks": 0,
+           "metadata": {"url": link}}
+    ingest_transcript(job, {"index": 2, "start": 615.2, "end": 900.0, "text": "a lecture", "last": False})
+    from utils.job_queue import get_store
+    doc = get_store(job["store_path"]).similarity_search("lecture", k=1)[0]
+
+    assert doc.metadata["source"] == link
+    assert doc.metadata["timestamp_url"] == link + "&t=615s"
+
+
+def test_default_ingest_keeps_chunks_written_by_other_store_instances(tmp_path, make_store):
+    from langchain.docstore.document import Document
+
+    store_path = str(tmp_path / "store")
+    job = {"id": 1, "key": "hash-1", "source": "talk.mp3", "kind": "audio", "store_path": store_path,
+           "chunks": 0, "metadata": {}}
+    ingest_transcript(job, {"index": 0, "start": 0.0, "end": 300.0, "text": "first part", "last": False})
+    # A page saves a note through its own instance between two segments
+    page = make_store(store_path)
+    page.add_documents([Document(page_content="user note", metadata={})])
+    ingest_transcript(job, {"index": 1, "start": 300.0, "end": 600.0, "text": "second part", "last": True})
+    on_disk = make_store(store_path)
+
+    assert sorted(meta["text"] for meta in on_disk.metadata) == ["first part", "second part", "user note"]
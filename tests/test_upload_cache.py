@@ -0,0 +1,56 @@
+import io
+
+import pytest
+
+from langchain.docstore.document import Document
+
+from utils.upload_cache import UploadCache, UploadLedger, file_hash
+
+
+def test_file_hash_matches_for_same_bytes_and_rewinds():
+    upload = io.BytesIO(b"%PDF-1.4 same bytes")
+    upload.seek(5)
+    assert file_hash(upload) == file_hash(b"%PDF-1.4 same bytes")
+    assert upload.tell() == 5
+    assert file_hash(b"other bytes") != file_hash(upload)
+
+
+def test_cache_computes_once_per_hash(tmp_path):
+    cache = UploadCache(str(tmp_path / "cache"))
+    calls = []
+
+    def transcribe():
+        calls.append(1)
+        return {"text": "hello world"}
+
+    digest = file_hash(b"audio")
+    assert cache.get_or_compute(digest, "transcript", transcribe) == ({"text": "hello world"}, False)
+    assert UploadCache(str(tmp_path / "cache")).get_or_compute(digest, "transcript", transcribe) == (
+        {"text": "hello world"}, True
+    )
+    assert len(calls) == 1
+
+    # A failed computation is not cached
+    def broken():
+        raise RuntimeError("Transcription failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute(file_hash(b"other"), "transcript", broken)
+    assert cache.get(file_hash(b"other"), "transcript") is None
+
+
+def test_ledger_and_metadata_refresh(make_store):
+    store = make_store()
+    digest = file_hash(b"paper")
+    store.add_documents([
+        Document(page_content=f"chunk {i}", metadata={"filename": "paper.pdf", "file_hash": digest})
+        for i in range(3)
+    ] + [Document(page_content="other", metadata={"filename": "other.pdf"})])
+
+    ledger = UploadLedger.for_store(store.store_path)
+    ledger.record(digest, "paper.pdf", "document", 3)
+    assert digest in UploadLedger.for_store(store.store_path)
+
+    assert store.update_metadata({"file_hash": digest}, {"filename": "paper-v2.pdf"}) == 3
+    assert store.update_metadata({}, {"filename": "everything.pdf"}) == 0
+    assert sorted(meta["filename"] for meta in store.metadata) == ["other.pdf"] + ["paper-v2.pdf"] * 3
@@ -0,0 +1,85 @@
+import gzip
+import threading
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from utils.url_discovery import discover_urls, parse_xml_stream
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>{root}/sitemap-docs.xml.gz</loc></sitemap>
+</sitemapindex>"""
+
+SITEMAP_DOCS = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>{root}/docs/old</loc><lastmod>2023-01-01</lastmod></url>
+  <url><loc>{root}/docs/new</loc><lastmod>2024-06-01T10:00:00Z</lastmod></url>
+  <url><loc>https://other.example/page</loc></url>
+</urlset>"""
+
+ATOM_FEED = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry><link rel="alternate" href="https://blog.example/post-1"/><updated>2024-05-01T00:00:00Z</updated></entry>
+</feed>"""
+
+RSS_FEED = b"""<rss version="2.0"><channel>
+  <item><link>https://blog.example/post-2</link><pubDate>Wed, 01 May 2024 12:00:00 GMT</pubDate></item>
+</channel></rss>"""
+
+
+class SitemapHandler(BaseHTTPRequestHandler):
+    requested = []
+
+    def do_GET(self):
+        SitemapHandler.requested.append(self.path)
+        root = f"http://127.0.0.1:{self.server.server_port}".encode()
+        if self.path == "/robots.txt":
+            body = b"User-agent: *\nSitemap: " + root + b"/sitemap_index.xml\n"
+        elif self.path == "/sitemap_index.xml":
+            body = SITEMAP_INDEX.replace(b"{root}", root)
+        elif self.path == "/sitemap-docs.xml.gz":
+            body = gzip.compress(SITEMAP_DOCS.replace(b"{root}", root))
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def site():
+    SitemapHandler.requested = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SitemapHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_parse_feeds():
+    atom = list(parse_xml_stream([ATOM_FEED[:40], ATOM_FEED[40:]]))
+    rss = list(parse_xml_stream([RSS_FEED]))
+    assert atom == [("page", "https://blog.example/post-1", datetime(2024, 5, 1, tzinfo=timezone.utc))]
+    assert rss == [("page", "https://blog.example/post-2", datetime(2024, 5, 1, 12, tzinfo=timezone.utc))]
+
+
+def test_discover_nested_gzipped_sitemaps(site):
+    discovered = discover_urls(site + "/")
+
+    assert sorted(d.url for d in discovered) == [site + "/docs/new", site + "/docs/old"]
+    assert SitemapHandler.requested == ["/robots.txt", "/sitemap_index.xml", "/sitemap-docs.xml.gz"]
+
+    recent = discover_urls(site + "/", since=datetime(2024, 1, 1))
+    assert [d.url for d in recent] == [site + "/docs/new"]
+    assert recent[0].lastmod == datetime(2024, 6, 1, 10, tzinfo=timezone.utc)
+
+    # Older entries listed first do not use up the cap
+    capped = discover_urls(site + "/", since=datetime(2024, 1, 1), max_urls=1)
+    assert [d.url for d in capped] == [site + "/docs/new"]
@@ -0,0 +1,87 @@
+import os
+
+from langchain.docstore.document import Document
+
+
+def _documents():
+    return [
+        Document(page_content="attention is all you need", metadata={
+            "type": "url", "category": "NLP", "tags": "transformers, attention",
+            "source_url": "https://example.com/attention"}),
+        Document(page_content="attention heads explained", metadata={
+            "type": "url", "category": "NLP", "tags": "attention",
+            "source_url": "https://example.com/attention"}),
+        Document(page_content="convolutions for images", metadata={
+            "type": "document", "category": "Computer Vision", "tags": "cnn", "filename": "cnn.pdf"}),
+        Document(page_content="my note on attention", metadata={
+            "type": "note", "category": "nlp", "title": "Attention note"}),
+    ]
+
+
+def test_add_documents_batches_embeddings_and_keeps_metadata(make_store):
+    store = make_store()
+    store.add_documents(_documents(), batch_size=3)
+
+    assert [len(request) for request in store.embedding.requests] == [3, 1]
+    reloaded = make_store()
+    assert [meta["filename"] for meta in reloaded.metadata if "filename" in meta] == ["cnn.pdf"]
+
+
+def test_similarity_search_filters_before_ranking(make_store):
+    store = make_store()
+    store.add_documents(_documents())
+
+    results = store.similarity_search("attention", k=2, filter={"category": "nlp", "type": "note"})
+    assert [doc.page_content for doc in results] == ["my note on attention"]
+
+    results = store.similarity_search("x", k=10, filter={"tags": "attention"})
+    assert len(results) == 2
+    assert store.similarity_search("x", filter={"type": ["document", "audio"]})[0].metadata["filename"] == "cnn.pdf"
+    assert store.similarity_search("x", filter={"category": "MLOps"}) == []
+
+
+def test_facet_counts_count_sources_and_follow_deletes(make_store):
+    store = make_store()
+    ids = store.add_documents(_documents())
+
+    # Two chunks of one URL count once; "NLP" and "nlp" are the same category
+    assert store.facet_counts("category") == {"NLP": 2, "Computer Vision": 1}
+    assert store.facet_counts("tags", filter={"type": "url"}) == {"attention": 1, "transformers": 1}
+
+    store.delete([ids[2]])
+    assert store.facet_counts("category") == {"NLP": 2}
+
+
+def test_milvus_filters_match_like_the_simple_store():
+    import pytest
+
+    pytest.importorskip("pymilvus")
+    from milvus_store_sync import MilvusVectorStore, _filter_keys
+
+    assert _filter_keys({"category": " NLP ", "tags": "AI, Rain ,", "filename": "a.pdf"}) == {
+        "category_key": "nlp", "tags_key": ",ai,rain,"
+    }
+    expression = MilvusVectorStore._filter_expression({"category": "NLP", "tags": ["AI", 'say "hi"']})
+    assert expression == (
+        '(category_key == "nlp") and (tags_key like "%,ai,%" or tags_key like "%,say \\"hi\\",%")'
+    )
+    with pytest.raises(ValueError):
+        MilvusVectorStore._filter_expression({"category == \"x\" or id": "y"})
+
+
+def test_failed_save_leaves_the_previous_files_readable(make_store):
+    from unittest.mock import patch
+
+    store = make_store()
+    store.add_documents(_documents())
+
+    def broken_dump(obj, f):
+        f.write(b"partial")
+        raise OSError("disk full")
+
+    with patch('simple_vector_store.pickle.dump', broken_dump):
+        store.add_documents([Document(page_content="one more", metadata={})])
+
+    reloaded = make_store()
+    assert len(reloaded.vectors) == 4
+    assert not [name for name in os.listdir(store.store_path) if name.endswith(".tmp")]
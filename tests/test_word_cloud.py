@@ -0,0 +1,33 @@
+from utils.word_cloud import WordCounter, _sample, prerender, word_cloud_png
+
+
+def test_counter_streams_counts_without_stopwords():
+    counter = WordCounter()
+    counter.update("The transformer's attention is all you need.")
+    counter.update("Attention heads in a transformer, 2017")
+
+    assert counter.top(2) == {"transformer": 2, "attention": 2}
+    assert "the" not in counter.counts and "2017" not in counter.counts
+    assert counter.documents == 2
+
+
+def test_vocabulary_stays_bounded():
+    counter = WordCounter(max_vocabulary=100)
+    counter.update(" ".join(f"word{i}" for i in range(150)) + " common common")
+    assert len(counter.counts) <= 100
+    assert counter.top(1) == {"common": 2}
+
+
+def test_long_texts_are_sampled():
+    text = "alpha " * 100_000
+    sample = _sample(text, limit=50_000)
+    assert len(sample) <= 50_000
+    assert set(sample.split()) == {"alpha"}
+
+
+def test_render_is_cached_by_frequency_table():
+    frequencies = {"attention": 5, "transformer": 3, "embedding": 1}
+    png = word_cloud_png(frequencies, timeout=30)
+    assert png.startswith(b"\x89PNG")
+    assert prerender(dict(frequencies)).result() is png
+    assert word_cloud_png({}) is None
@@ -2,38 +2,37 @@
 """
 Enhanced URL fetcher that handles compression issues properly.
 Specifically addresses the garbled text problem with https://helpme.tebra.com/
+
+Fetches go through utils.http_client, which only advertises encodings it can
+decode, so compressed transfer no longer produces garbled text.
 """
 
 import requests
 from bs4 import BeautifulSoup
 import sys
+from utils import http_client
 
-def fetch_url_content(url, disable_compression=True):
+def fetch_url_content(url, disable_compression=False):
     """
     Fetch URL content with proper encoding and compression handling.
     
     Args:
         url (str): The URL to fetch
-        disable_compression (bool): Whether to disable compression to avoid encoding issues
+        disable_compression (bool): Ask for an uncompressed response (the shared
+            client decodes gzip, deflate and brotli, so this is only for comparison)
     
     Returns:
         tuple: (success, content_or_error)
     """
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    headers = {}
     
     if disable_compression:
         headers["Accept-Encoding"] = "identity"
     
     try:
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
+        response = http_client.get(url, headers=headers)
         response.raise_for_status()
         
-        # Handle encoding explicitly
-        if response.encoding is None:
-            response.encoding = 'utf-8'
-        
         return True, response.text
         
     except requests.exceptions.RequestException as err:
@@ -0,0 +1,116 @@
+"""Timing of streamed answers: time to first token and total generation time.
+
+``timed_stream`` wraps the token stream of a chain (``chain.stream(...)``)
+and records when the first non-empty token arrived and when the stream
+ended, without buffering anything, so it can feed ``st.write_stream``
+directly. Finished requests are kept in a ``LatencyLog`` to report the
+latency users actually see.
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, Iterator, List, Optional
+
+
+@dataclass
+class StreamTiming:
+    """Clock readings (``time.perf_counter``) of one generation."""
+    started: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+    chunks: int = 0
+    chars: int = 0
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from the request to the first token."""
+        return None if self.first_token is None else self.first_token - self.started
+
+    @property
+    def total(self) -> Optional[float]:
+        """Seconds from the request to the last token."""
+        return None if self.finished is None else self.finished - self.started
+
+    def summary(self) -> str:
+        if self.total is None:
+            return "generation did not finish"
+        first = f"first token {self.ttft:.2f}s, " if self.ttft is not None else ""
+        return f"{first}total {self.total:.2f}s, {self.chars} chars in {self.chunks} chunks"
+
+
+def timed_stream(chunks: Iterable, timing: StreamTiming) -> Iterator:
+    """Pass ``chunks`` through, recording first-token and end times in ``timing``.
+
+    ``timing.started`` should be set just before the request is sent (the
+    default when the StreamTiming is created then).
+    """
+    try:
+        for chunk in chunks:
+            if timing.first_token is None and chunk:
+                timing.first_token = time.perf_counter()
+            timing.chunks += 1
+            timing.chars += len(chunk) if isinstance(chunk, str) else 0
+            yield chunk
+    finally:
+        timing.finished = time.perf_counter()
+
+
+@dataclass
+class LatencyRecord:
+    source: str  # "llm", "cache" or "similar"
+    ttft: float
+    total: float
+
+
+class LatencyLog:
+    """The most recent answer latencies, for percentiles per answer source."""
+
+    def __init__(self, max_records: int = 500):
+        self._records: Deque[LatencyRecord] = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def record(self, source: str, ttft: float, total: float):
+        with self._lock:
+            self._records.append(LatencyRecord(source, ttft, total))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per source: request count and p50/p95 of time to first token and total time."""
+        with self._lock:
+            records = list(self._records)
+        by_source: Dict[str, List[LatencyRecord]] = {}
+        for record in records:
+            by_source.setdefault(record.source, []).append(record)
+        return {
+            source: {
+                "requests": len(items),
+                "ttft_p50": _percentile([r.ttft for r in items], 50),
+                "ttft_p95": _percentile([r.ttft for r in items], 95),
+                "total_p50": _percentile([r.total for r in items], 50),
+                "total_p95": _percentile([r.total for r in items], 95),
+            }
+            for source, items in by_source.items()
+        }
+
+
+def _percentile(values: List[float], percent: int) -> float:
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+_default_log: Optional[LatencyLog] = None
+_default_guard = threading.Lock()
+
+
+def get_latency_log() -> LatencyLog:
+    """Return the process-wide latency log."""
+    global _default_log
+    with _default_guard:
+        if _default_log is None:
+            _default_log = LatencyLog()
+        return _default_log
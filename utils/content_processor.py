@@ -2,73 +2,186 @@
 from typing import List, Dict, Optional
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.docstore.document import Document
-from langchain_community.document_loaders import WebBaseLoader
-from utils.metadata_extractor import create_metadata
+from utils.metadata_extractor import create_metadata, extract_title_from_url
+from utils.http_cache import cached_get
+from utils.html_parser import parse_record
+from utils.politeness import PolitenessScheduler
 
 
 def process_urls_for_ingestion(
     urls: List[str],
     default_category: Optional[str] = None,
     default_tags: Optional[List[str]] = None,
-    learning_path: Optional[str] = None
-) -> List[Document]:
+    learning_path: Optional[str] = None,
+    known_urls=None,
+    scheduler: Optional[PolitenessScheduler] = None,
+    return_failures: bool = False
+):
     """Process a list of URLs and convert them to Documents with metadata.
     
+    URLs are fetched concurrently through a per-domain politeness scheduler
+    that spaces requests, honors robots.txt and backs off on 429/503.
+    
     Args:
         urls: List of URLs to process
         default_category: Default category to apply to all URLs
         default_tags: Default tags to apply to all URLs
         learning_path: Optional learning path identifier
+        known_urls: Optional container of URLs already ingested; pages among
+            them that revalidate as unchanged are skipped
+        scheduler: Scheduler to share across calls (a new one is created if None)
+        return_failures: Also return a dict of URL -> error for failed URLs
     
     Returns:
-        List of Document objects ready for vector store ingestion
+        List of Document objects ready for vector store ingestion, or
+        (documents, failures) if ``return_failures`` is set
     """
-    documents = []
+    scheduler = scheduler or PolitenessScheduler()
+    responses, failures = scheduler.run(urls, cached_get)
+    
+    for url, error in failures.items():
+        print(f"Error fetching {url}: {error}")
+    
+    # Keep the input order for the resulting documents
+    records = [responses[url] for url in urls if url in responses]
     
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "identity",
-        "Connection": "keep-alive"
-    }
-    
-    loader = WebBaseLoader(
-        web_path=urls,
-        header_template=headers,
-        continue_on_failure=True,
-        show_progress=False
+    documents = documents_from_records(
+        records,
+        default_category=default_category,
+        default_tags=default_tags,
+        learning_path=learning_path,
+        known_urls=known_urls
     )
     
-    try:
-        loaded_docs = loader.load()
+    if return_failures:
+        return documents, failures
+    return documents
+
+
+# Skip reason of records whose page is already stored and has not changed
+UNCHANGED = "unchanged"
+
+
+def record_skip_reason(record, known_urls=None) -> Optional[str]:
+    """Why ``documents_from_records`` makes no Document of a record, or None if it does.
+
+    Args:
+        record: CrawlRecord-like object
+        known_urls: As for ``documents_from_records``; unchanged pages among
+            them are skipped with the reason ``UNCHANGED``
+    """
+    if not record.ok:
+        return f"HTTP {record.status}"
+    if getattr(record, 'truncated', False):
+        return "truncated"
+    if not record.is_html:
+        return "not HTML"
+    if not record.body:
+        return "empty body"
+    if known_urls is not None and getattr(record, 'unchanged', False) and record.url in known_urls:
+        return UNCHANGED
+    return None
+
+
+def documents_from_records(
+    records,
+    default_category: Optional[str] = None,
+    default_tags: Optional[List[str]] = None,
+    learning_path: Optional[str] = None,
+    known_urls=None
+) -> List[Document]:
+    """Convert already-fetched crawl records into Documents with metadata.
+
+    Lets the crawler's response bodies be ingested directly, so each page is
+    downloaded once per crawl instead of again through WebBaseLoader.
+    
+    Args:
+        records: CrawlRecord-like objects with url, status, headers and body
+        default_category: Default category to apply to all pages
+        default_tags: Default tags to apply to all pages
+        learning_path: Optional learning path identifier
+        known_urls: Optional container of URLs already ingested (e.g. a
+            URLIndex); unchanged cached pages among them are not re-extracted
+    
+    Returns:
+        List of Document objects for the successful HTML records (see
+        ``record_skip_reason`` for the records skipped)
+    """
+    documents = []
+    
+    for record in records:
+        if record_skip_reason(record, known_urls) is not None:
+            continue
         
-        for doc in loaded_docs:
-            url = doc.metadata.get('source', '')
-            metadata = create_metadata(
-                url=url,
-                title=doc.metadata.get('title'),
-                content=doc.page_content,
-                category=default_category,
-                tags=default_tags,
-                content_type="url",
-                learning_path=learning_path
-            )
-            
-            # Create new document with enriched metadata
-            documents.append(Document(
-                page_content=doc.page_content,
-                metadata=metadata
-            ))
-    except Exception as e:
-        print(f"Error processing URLs: {e}")
+        page = parse_record(record)
+        text = page.text
+        
+        metadata = create_metadata(
+            url=record.url,
+            title=page.title or extract_title_from_url(record.url),
+            content=text,
+            category=default_category,
+            tags=default_tags,
+            content_type="url",
+            learning_path=learning_path
+        )
+        metadata['source'] = record.url
+        if page.description:
+            metadata['description'] = page.description
+        if page.canonical:
+            metadata['canonical_url'] = page.canonical
+        
+        documents.append(Document(page_content=text, metadata=metadata))
     
     return documents
 
 
+def ingest_documents(vector_store, documents: List[Document]) -> Dict[str, int]:
+    """Incrementally ingest chunked documents, grouped by their source URL.
+    
+    Chunks of a source that is already stored are diffed against the stored
+    version: unchanged sources are skipped, changed ones only embed new chunks
+    and drop stale ones. Documents without a source are simply appended.
+    
+    Args:
+        vector_store: Store to write to (must support ``ingest_source``)
+        documents: Chunked documents
+    
+    Returns:
+        dict with counts of added, kept and removed chunks and unchanged sources
+    """
+    by_source = {}
+    unsourced = []
+    for doc in documents:
+        source_url = doc.metadata.get('source_url') or doc.metadata.get('source')
+        if source_url:
+            by_source.setdefault(source_url, []).append(doc)
+        else:
+            unsourced.append(doc)
+    
+    totals = {"added": 0, "kept": 0, "removed": 0, "unchanged_sources": 0}
+    for source_url, docs in by_source.items():
+        diff = vector_store.ingest_source(
+            source_url,
+            [doc.page_content for doc in docs],
+            [doc.metadata for doc in docs]
+        )
+        for key, value in diff.summary().items():
+            totals[key] += value
+        if diff.unchanged:
+            totals["unchanged_sources"] += 1
+    
+    if unsourced:
+        vector_store.add_documents(unsourced)
+        totals["added"] += len(unsourced)
+    return totals
+
+
 def chunk_documents(
     documents: List[Document],
     chunk_size: int = 5000,
-    chunk_overlap: int = 1000
+    chunk_overlap: int = 1000,
+    word_counter=None
 ) -> List[Document]:
     """Split documents into chunks while preserving metadata.
     
@@ -76,6 +189,8 @@ def chunk_documents(
         documents: List of documents to chunk
         chunk_size: Size of each chunk
         chunk_overlap: Overlap between chunks
+        word_counter: Optional WordCounter updated with each document's text
+            (before splitting, so overlaps are not counted twice)
     
     Returns:
         List of chunked documents
@@ -87,6 +202,8 @@ def chunk_documents(
     
     chunked_docs = []
     for doc in documents:
+        if word_counter is not None:
+            word_counter.update(doc.page_content)
         chunks = splitter.split_text(doc.page_content)
         
         for chunk in chunks:
@@ -0,0 +1,201 @@
+"""Pack retrieved chunks into a compact context under a token budget.
+
+Chunks are split with a large overlap, so the top hits for a question often
+repeat each other. Before the chunks are stuffed into the prompt:
+
+1. Adjacent chunks of the same source whose text overlaps are merged back
+   into one passage (the overlap is kept once).
+2. Passages that are (nearly) contained in a more relevant one are dropped.
+3. The rest stay in relevance order and are added until the token budget is
+   reached; the passage that crosses the budget is cut at a sentence end.
+
+Tokens are estimated at four characters each, which is close enough for
+budgeting across models without a tokenizer.
+"""
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+CHARS_PER_TOKEN = 4
+DEFAULT_MAX_TOKENS = 3000
+
+_WORD = re.compile(r"\w+")
+_SENTENCE_END = re.compile(r"[.!?。！？]\s")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _source(doc: Document) -> Optional[str]:
+    meta = doc.metadata
+    for field in ("source_url", "source", "file_hash", "filename"):
+        if meta.get(field):
+            return f"{field}:{meta[field]}"
+    return None
+
+
+def merge_overlap(first: str, second: str, min_overlap: int = 50) -> Optional[str]:
+    """``first`` followed by ``second`` with their shared text kept once.
+
+    Returns None unless the end of ``first`` equals the start of ``second``
+    over at least ``min_overlap`` characters (or one contains the other).
+    """
+    if second in first:
+        return first
+    if first in second:
+        return second
+    probe = second[:min_overlap]
+    if len(probe) < min_overlap:
+        return None
+    position = first.find(probe, max(0, len(first) - len(second)))
+    while position != -1:
+        if second.startswith(first[position:]):
+            return first + second[len(first) - position:]
+        position = first.find(probe, position + 1)
+    return None
+
+
+def _shingles(text: str, size: int = 5) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    """Cut ``text`` to at most ``max_chars``, at a sentence end (else a word break) if possible."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    ends = [m.end() for m in _SENTENCE_END.finditer(cut)]
+    if ends and ends[-1] >= max_chars // 2:
+        return cut[:ends[-1]].rstrip()
+    # Leave room for the " …" marker
+    cut = cut[:max(0, max_chars - 2)]
+    space = cut.rfind(" ")
+    return (cut[:space] if space >= max_chars // 2 else cut).rstrip() + " …"
+
+
+@dataclass
+class PackStats:
+    chunks: int = 0
+    passages: int = 0
+    merged: int = 0
+    duplicates: int = 0
+    trimmed: int = 0
+    dropped: int = 0
+    input_tokens: int = 0
+    packed_tokens: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.input_tokens - self.packed_tokens
+
+    def summary(self) -> str:
+        return (
+            f"{self.chunks} chunks -> {self.passages} passages, "
+            f"{self.input_tokens} -> {self.packed_tokens} tokens (saved {self.saved_tokens}; "
+            f"{self.merged} merged, {self.duplicates} duplicates, {self.trimmed} trimmed, {self.dropped} dropped)"
+        )
+
+
+class ContextPacker:
+    """Merge, de-duplicate and trim retrieved chunks to a token budget.
+
+    Args:
+        max_tokens: Budget for the packed context (default: $CONTEXT_MAX_TOKENS or 3000)
+        min_overlap: Characters two chunks must share to be merged
+        duplicate_threshold: Fraction of a passage's 5-word shingles found in a
+            more relevant passage for it to count as a duplicate
+        min_partial_tokens: A passage crossing the budget is cut only if at
+            least this many tokens of it fit; otherwise it is left out
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        min_overlap: int = 50,
+        duplicate_threshold: float = 0.8,
+        min_partial_tokens: int = 100
+    ):
+        self.max_tokens = max_tokens or int(os.getenv("CONTEXT_MAX_TOKENS", DEFAULT_MAX_TOKENS))
+        self.min_overlap = min_overlap
+        self.duplicate_threshold = duplicate_threshold
+        self.min_partial_tokens = min_partial_tokens
+
+    def cache_key(self) -> str:
+        """Settings that change the packed context, for keying cached answers."""
+        return f"pack:{self.max_tokens}:{self.min_overlap}:{self.duplicate_threshold}:{self.min_partial_tokens}"
+
+    def _merge(self, first: Document, second: Document) -> Optional[Document]:
+        source = _source(first)
+        if source is None or source != _source(second):
+            return None
+        text = (merge_overlap(first.page_content, second.page_content, self.min_overlap)
+                or merge_overlap(second.page_content, first.page_content, self.min_overlap))
+        return None if text is None else Document(page_content=text, metadata=first.metadata)
+
+    def _merge_sources(self, documents: List[Document], stats: PackStats) -> List[Document]:
+        # Merging chunks 1 and 3 of a source can make chunk 2 mergeable, so
+        # repeat until nothing changes; a passage keeps the place of its most
+        # relevant chunk
+        passages = list(documents)
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(passages)):
+                for j in range(i + 1, len(passages)):
+                    combined = self._merge(passages[i], passages[j])
+                    if combined is not None:
+                        passages[i] = combined
+                        del passages[j]
+                        stats.merged += 1
+                        merged = True
+                        break
+                if merged:
+                    break
+        return passages
+
+    def pack(self, documents: List[Document]) -> Tuple[List[Document], PackStats]:
+        """Packed documents, most relevant first, and what packing did.
+
+        ``documents`` must be in relevance order (as returned by the store).
+        """
+        stats = PackStats(
+            chunks=len(documents),
+            input_tokens=sum(estimate_tokens(doc.page_content) for doc in documents)
+        )
+        kept: List[Tuple[Document, set]] = []
+        for doc in self._merge_sources(documents, stats):
+            shingles = _shingles(doc.page_content)
+            duplicate = any(
+                len(shingles & other) >= self.duplicate_threshold * len(shingles)
+                for _, other in kept
+            )
+            if duplicate:
+                stats.duplicates += 1
+            else:
+                kept.append((doc, shingles))
+
+        packed = []
+        remaining = self.max_tokens
+        for doc, _ in kept:
+            tokens = estimate_tokens(doc.page_content)
+            if tokens <= remaining:
+                packed.append(doc)
+                remaining -= tokens
+            elif remaining >= self.min_partial_tokens:
+                text = _truncate(doc.page_content, remaining * CHARS_PER_TOKEN)
+                packed.append(Document(page_content=text, metadata=doc.metadata))
+                remaining -= estimate_tokens(text)
+                stats.trimmed += 1
+            else:
+                stats.dropped += 1
+
+        stats.passages = len(packed)
+        stats.packed_tokens = sum(estimate_tokens(doc.page_content) for doc in packed)
+        return packed, stats
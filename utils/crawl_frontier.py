@@ -0,0 +1,182 @@
+"""SQLite-backed crawl frontier so crawls can resume where they stopped."""
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+PENDING = "pending"
+DONE = "done"          # fetched, not yet ingested
+FAILED = "failed"
+INGESTED = "ingested"  # fetched and written to the vector store
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    root_url TEXT NOT NULL,
+    max_depth INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'running',
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL,
+    UNIQUE (root_url, max_depth)
+);
+CREATE TABLE IF NOT EXISTS urls (
+    crawl_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    http_status INTEGER,
+    error TEXT,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (crawl_id, url)
+);
+CREATE INDEX IF NOT EXISTS idx_urls_pending ON urls (crawl_id, status, depth);
+"""
+
+
+class CrawlFrontier:
+    """Persists the crawl frontier, visited set and per-URL status.
+
+    Only the current batch of URLs is held in memory, so crawls can run to
+    thousands of pages. Use ``":memory:"`` for a throwaway frontier.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv("CRAWL_FRONTIER_DB", "./crawl_frontier.db")
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if self.db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def start(self, root_url: str, max_depth: int, restart: bool = False) -> int:
+        """Create or resume the crawl of ``root_url`` and return its id.
+
+        Only a crawl that was interrupted (still 'running') is resumed: pages
+        fetched but never ingested and pages that failed are queued again
+        (the HTTP cache makes refetching them cheap); ingested pages are
+        skipped. A finished crawl, or any crawl with ``restart``, starts
+        over, so re-running it picks up changed and new pages.
+        """
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id, status FROM crawls WHERE root_url = ? AND max_depth = ?",
+                (root_url, max_depth)
+            ).fetchone()
+            if row is None:
+                cursor = self._conn.execute(
+                    "INSERT INTO crawls (root_url, max_depth, created, updated) VALUES (?, ?, ?, ?)",
+                    (root_url, max_depth, now, now)
+                )
+                return cursor.lastrowid
+            crawl_id, status = row
+            if restart or status != "running":
+                self._conn.execute("DELETE FROM urls WHERE crawl_id = ?", (crawl_id,))
+            else:
+                self._conn.execute(
+                    "UPDATE urls SET status = ?, error = NULL WHERE crawl_id = ? AND status IN (?, ?)",
+                    (PENDING, crawl_id, DONE, FAILED)
+                )
+            self._conn.execute(
+                "UPDATE crawls SET status = 'running', updated = ? WHERE id = ?", (now, crawl_id)
+            )
+            return crawl_id
+
+    def finish(self, crawl_id: int):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE crawls SET status = 'finished', updated = ? WHERE id = ?",
+                (datetime.now().isoformat(), crawl_id)
+            )
+
+    def add(self, crawl_id: int, urls: Iterable[Tuple[str, int]], limit: Optional[int] = None) -> int:
+        """Add (url, depth) pairs not seen before. Returns how many were new.
+
+        Args:
+            limit: Stop adding once the crawl holds this many URLs in total
+        """
+        added = 0
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            total = self._count(crawl_id)
+            for url, depth in urls:
+                if limit is not None and total >= limit:
+                    break
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO urls (crawl_id, url, depth, updated) VALUES (?, ?, ?, ?)",
+                    (crawl_id, url, depth, now)
+                )
+                added += cursor.rowcount
+                total += cursor.rowcount
+        return added
+
+    def next_batch(self, crawl_id: int, limit: int) -> List[Tuple[str, int]]:
+        """Return up to ``limit`` pending (url, depth) pairs, shallowest first."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT url, depth FROM urls WHERE crawl_id = ? AND status = ? "
+                "ORDER BY depth, rowid LIMIT ?",
+                (crawl_id, PENDING, limit)
+            ).fetchall()
+
+    def mark(
+        self,
+        crawl_id: int,
+        url: str,
+        status: str,
+        http_status: Optional[int] = None,
+        error: Optional[str] = None
+    ):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE urls SET status = ?, http_status = ?, error = ?, updated = ? "
+                "WHERE crawl_id = ? AND url = ?",
+                (status, http_status, error, datetime.now().isoformat(), crawl_id, url)
+            )
+
+    def mark_ingested(self, crawl_id: int, urls: Iterable[str]):
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE urls SET status = ?, updated = ? WHERE crawl_id = ? AND url = ?",
+                [(INGESTED, now, crawl_id, url) for url in urls]
+            )
+
+    def _count(self, crawl_id: int, status: Optional[str] = None) -> int:
+        if status is None:
+            row = self._conn.execute("SELECT COUNT(*) FROM urls WHERE crawl_id = ?", (crawl_id,)).fetchone()
+        else:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM urls WHERE crawl_id = ? AND status = ?", (crawl_id, status)
+            ).fetchone()
+        return row[0]
+
+    def count(self, crawl_id: int, status: Optional[str] = None) -> int:
+        with self._lock:
+            return self._count(crawl_id, status)
+
+    def status_counts(self, crawl_id: int) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM urls WHERE crawl_id = ? GROUP BY status", (crawl_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def urls(self, crawl_id: int, status: Optional[str] = None) -> Iterator[str]:
+        """Iterate over the URLs of a crawl, optionally filtered by status."""
+        query = "SELECT url FROM urls WHERE crawl_id = ?"
+        params = [crawl_id]
+        if status is not None:
+            query += " AND status = ?"
+            params.append(status)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for (url,) in rows:
+            yield url
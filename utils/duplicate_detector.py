@@ -1,5 +1,7 @@
 """Utilities for detecting duplicate content."""
-from typing import List, Set
+import json
+import os
+from typing import Iterable, List, Set, Union
 from urllib.parse import urlparse, urlunparse
 
 
@@ -39,9 +41,85 @@ def detect_duplicate_urls(urls: List[str]) -> tuple[List[str], List[str]]:
     return unique_urls, duplicates
 
 
-def check_url_exists(url: str, existing_urls: Set[str]) -> bool:
-    """Check if a URL already exists in the repository."""
+class URLIndex:
+    """Persisted set of normalized URLs already stored in a vector store.
+
+    Lookups are O(1): URLs are normalized once when they are written, not on
+    every check.
+    """
+
+    FILENAME = "url_index.json"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._urls: Set[str] = set()
+        self.exists = os.path.exists(path)
+        if self.exists:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._urls = set(json.load(f))
+            except Exception as e:
+                print(f"Error loading URL index: {e}")
+
+    @classmethod
+    def for_store(cls, store_path: str) -> "URLIndex":
+        """Return the URL index kept alongside a vector store."""
+        return cls(os.path.join(store_path, cls.FILENAME))
+
+    def __contains__(self, url: str) -> bool:
+        return normalize_url(url) in self._urls
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+    def add(self, urls: Iterable[str]) -> bool:
+        """Add URLs to the index. Returns True if anything changed."""
+        before = len(self._urls)
+        self._urls.update(normalize_url(u) for u in urls if u)
+        return len(self._urls) != before
+
+    def discard(self, urls: Iterable[str]) -> bool:
+        """Remove URLs from the index. Returns True if anything changed."""
+        before = len(self._urls)
+        self._urls.difference_update(normalize_url(u) for u in urls if u)
+        return len(self._urls) != before
+
+    def save(self):
+        """Write the index to disk."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(sorted(self._urls), f, ensure_ascii=False)
+            self.exists = True
+        except Exception as e:
+            print(f"Error saving URL index: {e}")
+
+
+def split_existing_urls(urls: List[str], index: URLIndex) -> tuple[List[str], List[str]]:
+    """Split URLs into those not yet in the repository and those already in it.
+
+    Returns:
+        (new_urls, existing_urls)
+    """
+    new_urls = []
+    existing = []
+    for url in urls:
+        if url in index:
+            existing.append(url)
+        else:
+            new_urls.append(url)
+    return new_urls, existing
+
+
+def check_url_exists(url: str, existing_urls: Union[Set[str], URLIndex]) -> bool:
+    """Check if a URL already exists in the repository.
+
+    Args:
+        url: URL to check
+        existing_urls: A URLIndex (O(1) lookup), or a set of URLs in any form
+    """
+    if isinstance(existing_urls, URLIndex):
+        return url in existing_urls
     normalized = normalize_url(url)
-    normalized_existing = {normalize_url(u) for u in existing_urls}
-    return normalized in normalized_existing
+    return any(normalize_url(u) == normalized for u in existing_urls)
 
@@ -0,0 +1,180 @@
+"""Single-pass HTML parsing for links, title, metadata and clean text.
+
+Pages are run once through lxml's event-driven (target) parser, which builds
+no tree, and everything the crawler and ingestion need is collected on the
+way. If lxml is not installed the standard library tokenizer is used instead.
+"""
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import List, Optional
+from urllib.parse import urljoin, urldefrag, urlparse
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - lxml is optional
+    etree = None
+
+# Text inside these elements is never part of the page text. <head> is not
+# listed: an unclosed head would swallow the body, and its content elements
+# (title, script, style) are handled on their own.
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "object"}
+
+# Elements that start a new line in the extracted text
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table",
+    "td", "th", "tr", "ul",
+}
+
+
+@dataclass
+class ParsedPage:
+    """Everything extracted from one HTML page."""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    canonical: Optional[str] = None
+    links: List[str] = field(default_factory=list)
+    text: str = ""
+
+
+class _Collector:
+    """Parser target shared by the lxml and stdlib backends."""
+
+    def __init__(self, base_url: Optional[str]):
+        self.base_url = base_url
+        self.page = ParsedPage()
+        self._seen_links = set()
+        self._skip_depth = 0
+        self._in_title = False
+        self._title_parts = []
+        self._text_parts = []
+
+    def _resolve(self, href: str) -> Optional[str]:
+        href = href.strip()
+        if not href:
+            return None
+        url = urldefrag(urljoin(self.base_url, href) if self.base_url else href)[0]
+        if self.base_url and urlparse(url).scheme not in ("http", "https"):
+            return None
+        return url
+
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        if tag == "title" and self.page.title is None:
+            self._in_title = True
+        elif tag == "a":
+            href = attrib.get("href")
+            link = self._resolve(href) if href else None
+            if link and link not in self._seen_links:
+                self._seen_links.add(link)
+                self.page.links.append(link)
+        elif tag == "base" and attrib.get("href") and self.base_url:
+            self.base_url = urljoin(self.base_url, attrib["href"])
+        elif tag == "meta":
+            name = (attrib.get("name") or attrib.get("property") or "").lower()
+            if name == "description" or (name == "og:description" and not self.page.description):
+                content = (attrib.get("content") or "").strip()
+                if content:
+                    self.page.description = content
+        elif tag == "link" and "canonical" in (attrib.get("rel") or "").lower().split():
+            if attrib.get("href"):
+                self.page.canonical = self._resolve(attrib["href"])
+        if tag in BLOCK_TAGS:
+            self._text_parts.append("\n")
+
+    def end(self, tag):
+        tag = tag.lower() if isinstance(tag, str) else ""
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            title = " ".join("".join(self._title_parts).split())
+            self.page.title = title or None
+        if tag in BLOCK_TAGS:
+            self._text_parts.append("\n")
+
+    def data(self, text):
+        if self._in_title:
+            self._title_parts.append(text)
+        elif not self._skip_depth:
+            self._text_parts.append(text)
+
+    def close(self) -> ParsedPage:
+        lines = (" ".join(line.split()) for line in "".join(self._text_parts).splitlines())
+        self.page.text = "\n".join(line for line in lines if line)
+        return self.page
+
+
+class _StdlibParser(HTMLParser):
+    """Feeds the standard library tokenizer's events into a _Collector."""
+
+    def __init__(self, collector: _Collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {name: value or "" for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in ("br", "hr", "img", "meta", "link", "base", "input"):
+            self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def _parse_lxml(html: str, base_url: Optional[str]) -> ParsedPage:
+    collector = _Collector(base_url)
+    parser = etree.HTMLParser(target=collector, recover=True, remove_comments=True, remove_pis=True)
+    parser.feed(html)
+    return parser.close()
+
+
+def _parse_stdlib(html: str, base_url: Optional[str]) -> ParsedPage:
+    collector = _Collector(base_url)
+    parser = _StdlibParser(collector)
+    parser.feed(html)
+    parser.close()
+    return collector.close()
+
+
+def parse_html(html: str, base_url: Optional[str] = None, backend: Optional[str] = None) -> ParsedPage:
+    """Parse an HTML document in a single pass.
+
+    Args:
+        html: Page markup
+        base_url: URL of the page; links and the canonical URL are resolved
+            against it (and non-http(s) links dropped) when given
+        backend: "lxml" or "stdlib"; defaults to lxml when available
+
+    Returns:
+        ParsedPage with title, meta description, canonical URL, unique links
+        in document order (fragments removed) and whitespace-normalized text
+    """
+    if not html:
+        return ParsedPage()
+    backend = backend or ("lxml" if etree is not None else "stdlib")
+    if backend == "lxml":
+        try:
+            return _parse_lxml(html, base_url)
+        except (etree.Error, ValueError) as e:
+            print(f"lxml could not parse {base_url or 'page'}, falling back: {e}")
+    return _parse_stdlib(html, base_url)
+
+
+def parse_record(record) -> ParsedPage:
+    """Parse a CachedResponse once and keep the result on the record.
+
+    The crawler (links) and the ingestion step (title and text) both read the
+    same record, so memoizing here keeps it to one parse per page.
+    """
+    if record.parsed is None:
+        record.parsed = parse_html(record.text, base_url=record.url)
+    return record.parsed
@@ -0,0 +1,251 @@
+"""Persistent HTTP cache with conditional GET revalidation.
+
+Bodies are stored on disk together with their validators (ETag and
+Last-Modified) and Cache-Control freshness, so re-fetching an unchanged page
+either costs nothing (still fresh) or a single 304 response.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from utils import http_client
+
+DEFAULT_CACHE_DIR = "./http_cache"
+
+# Bodies are stored decoded, so transfer-level headers no longer apply
+_TRANSFER_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection")
+
+
+@dataclass
+class CachedResponse:
+    """An HTTP response body plus the headers needed to revalidate it."""
+    url: str
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: bytes = b""
+    encoding: str = "utf-8"
+    stored_at: float = 0.0
+    from_cache: bool = False    # served from disk without contacting the server
+    not_modified: bool = False  # server answered 304 to a conditional request
+    truncated: bool = False     # body cut off by a byte budget; not the whole page
+    # ParsedPage filled in lazily by utils.html_parser.parse_record
+    parsed: Optional[Any] = field(default=None, repr=False, compare=False)
+
+    def header(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        """Case-insensitive header lookup."""
+        name = name.lower()
+        for key, value in self.headers.items():
+            if key.lower() == name:
+                return value
+        return default
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    @property
+    def unchanged(self) -> bool:
+        """True if the body is the same one we already had on disk."""
+        return self.from_cache or self.not_modified
+
+    @property
+    def is_html(self) -> bool:
+        return "html" in (self.header("Content-Type") or "text/html").lower()
+
+    @property
+    def text(self) -> str:
+        try:
+            return self.body.decode(self.encoding, errors="replace")
+        except LookupError:
+            return self.body.decode("utf-8", errors="replace")
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into a dict of lower-cased directives."""
+    directives = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def freshness_lifetime(response: CachedResponse) -> float:
+    """Seconds a stored response may be reused without revalidation."""
+    directives = parse_cache_control(response.header("Cache-Control"))
+    if "no-cache" in directives or "no-store" in directives:
+        return 0.0
+    if directives.get("max-age"):
+        try:
+            return max(0.0, float(directives["max-age"]))
+        except ValueError:
+            return 0.0
+    expires = response.header("Expires")
+    date = response.header("Date")
+    if expires:
+        try:
+            base = parsedate_to_datetime(date).timestamp() if date else response.stored_at
+            return max(0.0, parsedate_to_datetime(expires).timestamp() - base)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+
+def is_cacheable(response: CachedResponse) -> bool:
+    """Only complete, successful responses without ``no-store`` are written to disk."""
+    return (
+        response.status == 200
+        and not response.truncated
+        and "no-store" not in parse_cache_control(response.header("Cache-Control"))
+    )
+
+
+class HTTPCache:
+    """On-disk cache of response bodies keyed by URL."""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or os.getenv("HTTP_CACHE_DIR", DEFAULT_CACHE_DIR)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        folder = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(folder, key + ".json"), os.path.join(folder, key + ".body")
+
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the stored response for a URL, if any."""
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        return CachedResponse(body=body, **meta)
+
+    def put(self, response: CachedResponse):
+        """Store a response if it is cacheable."""
+        if not is_cacheable(response):
+            return
+        meta_path, body_path = self._paths(response.url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        response.stored_at = response.stored_at or time.time()
+        meta = {
+            "url": response.url,
+            "status": response.status,
+            "headers": {
+                key: value for key, value in response.headers.items()
+                if key.lower() not in _TRANSFER_HEADERS
+            },
+            "encoding": response.encoding,
+            "stored_at": response.stored_at,
+        }
+        try:
+            _atomic_write(body_path, response.body)
+            _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+        except OSError as e:
+            print(f"Error writing HTTP cache: {e}")
+
+    def is_fresh(self, response: CachedResponse, now: Optional[float] = None) -> bool:
+        """True if a stored response can be reused without contacting the server."""
+        now = time.time() if now is None else now
+        return now - response.stored_at < freshness_lifetime(response)
+
+    @staticmethod
+    def conditional_headers(response: Optional[CachedResponse]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers for revalidation."""
+        headers = {}
+        if response is None:
+            return headers
+        etag = response.header("ETag")
+        last_modified = response.header("Last-Modified")
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def revalidated(self, cached: CachedResponse, headers: Dict[str, str]) -> CachedResponse:
+        """Merge the headers of a 304 into the stored entry and restamp it."""
+        merged = dict(cached.headers)
+        for key, value in headers.items():
+            if key.lower() in ("etag", "last-modified", "cache-control", "expires", "date"):
+                for existing in [k for k in merged if k.lower() == key.lower()]:
+                    del merged[existing]
+                merged[key] = value
+        refreshed = CachedResponse(
+            url=cached.url,
+            status=cached.status,
+            headers=merged,
+            body=cached.body,
+            encoding=cached.encoding,
+            stored_at=time.time(),
+            not_modified=True
+        )
+        self.put(refreshed)
+        return refreshed
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+_default_cache = None
+
+
+def get_default_cache() -> HTTPCache:
+    """Return the process-wide HTTP cache."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HTTPCache()
+    return _default_cache
+
+
+def cached_get(
+    url: str,
+    cache: Optional[HTTPCache] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = http_client.DEFAULT_TIMEOUT
+) -> CachedResponse:
+    """GET a URL through the HTTP cache.
+
+    Fresh entries are returned without a request; stale ones are revalidated
+    with a conditional GET, and a 304 reuses the stored body.
+
+    Raises:
+        requests.exceptions.RequestException: on network errors
+    """
+    cache = cache or get_default_cache()
+    cached = cache.get(url)
+    if cached is not None and cache.is_fresh(cached):
+        cached.from_cache = True
+        return cached
+
+    request_headers = dict(headers or {})
+    request_headers.update(cache.conditional_headers(cached))
+    response = http_client.get(url, headers=request_headers, timeout=timeout)
+
+    if response.status_code == 304 and cached is not None:
+        return cache.revalidated(cached, dict(response.headers))
+
+    result = CachedResponse(
+        url=url,
+        status=response.status_code,
+        headers=dict(response.headers),
+        body=response.content,
+        encoding=response.encoding,
+        stored_at=time.time()
+    )
+    cache.put(result)
+    return result
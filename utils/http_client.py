@@ -0,0 +1,159 @@
+"""Shared HTTP client used by every page fetcher.
+
+One pooled ``requests`` session (and a matching aiohttp session factory for
+the async crawler) with consistent headers, timeouts and retries. Compressed
+transfer is negotiated only for encodings we can actually decode, which is
+what used to produce garbled text when servers answered with brotli.
+"""
+import re
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+DEFAULT_TIMEOUT = 10
+POOL_CONNECTIONS = 32  # number of hosts kept in the pool
+POOL_MAXSIZE = 16      # connections kept per host
+# 429 and 503 are throttling: they go back to the politeness scheduler,
+# which slows the domain down and honours Retry-After
+RETRY_STATUSES = (500, 502, 504)
+
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+
+
+def _has_brotli() -> bool:
+    try:
+        import brotli  # noqa: F401
+        return True
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+
+def accept_encoding() -> str:
+    """Return the Accept-Encoding value for the decoders available here."""
+    encodings = ["gzip", "deflate"]
+    if _has_brotli():
+        encodings.append("br")
+    return ", ".join(encodings)
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": accept_encoding(),
+}
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=3,
+        connect=3,
+        read=2,
+        status=2,
+        backoff_factor=0.5,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        # Otherwise urllib3 retries 413/429/503 carrying Retry-After by itself
+        respect_retry_after_header=False,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=retry)
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = None
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session."""
+    global _session
+    if _session is None:
+        _session = _build_session()
+    return _session
+
+
+def get(
+    url: str,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    **kwargs
+) -> requests.Response:
+    """GET a URL through the shared session.
+
+    Redirects are followed and the response encoding is set with
+    ``detect_encoding`` rather than requests' ISO-8859-1 default.
+    """
+    response = get_session().get(url, headers=headers, timeout=timeout, allow_redirects=True, **kwargs)
+    if not kwargs.get("stream"):
+        response.encoding = detect_encoding(response.content, response.headers.get("Content-Type"))
+    return response
+
+
+def detect_encoding(body: bytes, content_type: Optional[str] = None) -> str:
+    """Work out the character set of a (decompressed) response body.
+
+    Order: the Content-Type charset, a ``<meta charset>`` in the document
+    head, statistical detection, then UTF-8.
+    """
+    if content_type:
+        match = re.search(r'charset=["\']?([^\s;"\']+)', content_type, re.IGNORECASE)
+        if match and _known_codec(match.group(1)):
+            return match.group(1)
+
+    match = _META_CHARSET.search(body[:4096])
+    if match:
+        charset = match.group(1).decode("ascii", errors="ignore")
+        if _known_codec(charset):
+            return charset
+
+    try:
+        body.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+
+    try:
+        from charset_normalizer import from_bytes
+        best = from_bytes(body[:65536]).best()
+        if best is not None:
+            return best.encoding
+    except ImportError:
+        pass
+    return "utf-8"
+
+
+def _known_codec(name: str) -> bool:
+    import codecs
+    try:
+        codecs.lookup(name)
+        return True
+    except LookupError:
+        return False
+
+
+def make_async_session(total_limit: int = 20, per_host_limit: int = 4, timeout: float = DEFAULT_TIMEOUT):
+    """Create an aiohttp session with the shared headers and a pooled connector.
+
+    aiohttp decodes gzip/deflate (and brotli when installed) transparently,
+    matching what ``accept_encoding`` advertises.
+    """
+    import aiohttp
+
+    connector = aiohttp.TCPConnector(limit=total_limit, limit_per_host=per_host_limit, ttl_dns_cache=300)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        headers=DEFAULT_HEADERS
+    )
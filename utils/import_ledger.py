@@ -0,0 +1,155 @@
+"""Per-URL import ledger kept alongside a vector store.
+
+Every URL imported into a store gets a row keyed by an idempotency key (the
+normalized URL plus the import options that shape its chunks), recording
+how far it got: fetched, chunked, embedded, committed or failed with the
+error. A URL is only marked committed after its chunks have been written to
+disk, so a retried or re-submitted import skips committed URLs and redoes
+only the work that was lost.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from utils.duplicate_detector import normalize_url
+
+FETCHED = "fetched"
+CHUNKED = "chunked"
+EMBEDDED = "embedded"
+COMMITTED = "committed"
+FAILED = "failed"
+
+STATES = (FETCHED, CHUNKED, EMBEDDED, COMMITTED, FAILED)
+
+# Import options that change what is stored for a URL
+KEY_OPTIONS = ("category", "tags", "learning_path")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    state TEXT NOT NULL,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_state ON ledger (state);
+"""
+
+
+def import_key(url: str, options: Optional[Mapping[str, Any]] = None) -> str:
+    """Idempotency key for importing ``url`` with the given options.
+
+    The same URL imported with the same category, tags and learning path
+    always gets the same key, whatever the URL's formatting.
+    """
+    options = options or {}
+    relevant = {name: options.get(name) for name in KEY_OPTIONS if options.get(name)}
+    payload = normalize_url(url) + "\n" + json.dumps(relevant, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class ImportLedger:
+    """SQLite ledger of per-URL import state for one vector store."""
+
+    FILENAME = "import_ledger.db"
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def for_store(cls, store_path: str) -> "ImportLedger":
+        """Return the ledger kept alongside a vector store."""
+        return cls(os.path.join(store_path, cls.FILENAME))
+
+    def close(self):
+        self._conn.close()
+
+    def mark(self, items: Mapping[str, str], state: str, chunks: Optional[Mapping[str, int]] = None):
+        """Move URLs to ``state``.
+
+        Args:
+            items: Idempotency key -> URL
+            state: One of STATES other than FAILED (see ``fail``)
+            chunks: Optional chunk count by URL, stored with the state
+        """
+        if state not in STATES or state == FAILED:
+            raise ValueError(f"Invalid ledger state: {state}")
+        now = datetime.now().isoformat()
+        chunks = chunks or {}
+        # A fetch starts a new attempt; later states keep the count
+        bump = 1 if state == FETCHED else 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO ledger (key, url, state, chunks, attempts, error, updated) "
+                "VALUES (?, ?, ?, ?, ?, NULL, ?) "
+                "ON CONFLICT (key) DO UPDATE SET state = excluded.state, chunks = excluded.chunks, "
+                "attempts = attempts + ?, error = NULL, updated = excluded.updated",
+                [(key, url, state, chunks.get(url, 0), 1, now, bump) for key, url in items.items()]
+            )
+
+    def fail(self, items: Mapping[str, str], errors: Mapping[str, str]):
+        """Record URLs as failed with their error (by URL)."""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO ledger (key, url, state, attempts, error, updated) VALUES (?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET state = excluded.state, error = excluded.error, "
+                "updated = excluded.updated",
+                [(key, url, FAILED, errors.get(url, "unknown error"), now) for key, url in items.items()]
+            )
+
+    def committed(self, keys: Iterable[str]) -> Dict[str, int]:
+        """Chunk counts of the given keys that are already committed."""
+        keys = list(keys)
+        result = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, chunks FROM ledger WHERE state = ? AND key IN ({','.join('?' * len(part))})",
+                    [COMMITTED, *part]
+                ).fetchall()
+                result.update({row["key"]: row["chunks"] for row in rows})
+        return result
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM ledger WHERE key = ?", (key,)).fetchone()
+        return dict(row) if row else None
+
+    def counts(self) -> Dict[str, int]:
+        """Number of URLs in each state."""
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM ledger GROUP BY state").fetchall()
+        counts = {state: 0 for state in STATES}
+        counts.update({state: count for state, count in rows})
+        return counts
+
+    def entries(self, state: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Most recently updated ledger rows, optionally only those in ``state``."""
+        query = "SELECT * FROM ledger"
+        params: List[Any] = []
+        if state is not None:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY updated DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,368 @@
+"""Staged fetch -> extract -> chunk -> embed -> write pipeline for URL ingestion.
+
+Each stage runs in its own thread and hands batches to the next through a
+small bounded queue, so fetching batch N+1 overlaps extracting, embedding and
+writing batch N, and a slow stage applies back-pressure instead of letting
+work pile up in memory. Every batch is written (and flushed to disk) as soon
+as it is embedded.
+
+With an import ledger, each URL's progress through the stages is recorded
+under its idempotency key, and URLs already committed by an earlier run are
+skipped, so a retry only redoes the work that did not reach the store.
+"""
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from langchain.docstore.document import Document
+from utils.content_processor import UNCHANGED, chunk_documents, documents_from_records, record_skip_reason
+from utils.http_cache import cached_get
+from utils.import_ledger import CHUNKED, COMMITTED, EMBEDDED, FETCHED, import_key
+from utils.politeness import PolitenessScheduler
+
+STAGES = ("fetch", "extract", "chunk", "embed", "write")
+
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Work done by one stage: batches and URLs through it, and time spent busy."""
+    batches: int = 0
+    urls: int = 0
+    busy_seconds: float = 0.0
+
+
+@dataclass
+class PipelineStats:
+    """Progress of a pipeline run, updated as batches move through the stages."""
+    total_urls: int = 0
+    stages: Dict[str, StageStats] = field(default_factory=lambda: {name: StageStats() for name in STAGES})
+    failures: Dict[str, str] = field(default_factory=dict)
+    chunks_by_url: Dict[str, int] = field(default_factory=dict)
+    documents: int = 0
+    chunks: int = 0
+    added: int = 0
+    kept: int = 0
+    removed: int = 0
+    unchanged_sources: int = 0
+    resumed: int = 0
+    started: float = field(default_factory=time.monotonic)
+    finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def urls_per_second(self) -> float:
+        return self.stages["write"].urls / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "urls": self.total_urls,
+            "written": self.stages["write"].urls,
+            "failed": len(self.failures),
+            "chunks": self.chunks,
+            "added": self.added,
+            "kept": self.kept,
+            "removed": self.removed,
+            "unchanged_sources": self.unchanged_sources,
+            "resumed": self.resumed,
+            "seconds": round(self.elapsed, 2),
+            "urls_per_second": round(self.urls_per_second, 2),
+            "stages": {
+                name: {"urls": stage.urls, "busy_seconds": round(stage.busy_seconds, 2)}
+                for name, stage in self.stages.items()
+            },
+        }
+
+
+@dataclass
+class _Batch:
+    urls: List[str]
+    records: List[Any] = field(default_factory=list)
+    # Fetched URL (after redirects) -> URL as requested
+    requested: Dict[str, str] = field(default_factory=dict)
+    documents: List[Document] = field(default_factory=list)
+    chunks: List[Document] = field(default_factory=list)
+    by_source: Dict[str, List[Document]] = field(default_factory=dict)
+    # Chunk text -> embedding, for the chunks the store did not have when embedding
+    vectors: Dict[str, List[float]] = field(default_factory=dict)
+    # Requested URLs of pages skipped as unchanged, and of pages parsed to no text
+    unchanged: List[str] = field(default_factory=list)
+    empty: List[str] = field(default_factory=list)
+
+
+class IngestPipeline:
+    """Ingest URLs into a vector store with the stages running concurrently.
+
+    Args:
+        vector_store: Store supporting ``diff_source``/``apply_source_diff``
+        batch_size: URLs per batch
+        queue_size: Batches allowed to wait between two stages
+        embed_batch_size: Texts per embedding request
+        scheduler: Politeness scheduler used for fetching
+        fetch: Called with a URL, returns a CachedResponse-like record
+        embed: Embeds a list of texts (defaults to the store's embedding model)
+        write_lock: Held while writing, when several pipelines share a store
+        known_urls: URLs already ingested; unchanged cached pages are skipped
+        on_progress: Called with (stage, batch urls, seconds) after each stage
+            finishes a batch; runs on the pipeline's threads
+        cancelled: Checked before each batch; once it returns True the
+            remaining batches are dropped without being written
+        ledger: Optional ImportLedger recording each URL's state
+        skip_committed: Skip URLs the ledger has committed with the same
+            options; False re-imports them (still recording their state)
+    """
+
+    def __init__(
+        self,
+        vector_store,
+        batch_size: int = 10,
+        queue_size: int = 2,
+        embed_batch_size: int = 96,
+        scheduler: Optional[PolitenessScheduler] = None,
+        fetch: Callable[[str], Any] = cached_get,
+        embed: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        write_lock=None,
+        default_category: Optional[str] = None,
+        default_tags: Optional[List[str]] = None,
+        learning_path: Optional[str] = None,
+        known_urls=None,
+        on_progress: Optional[Callable[[str, List[str], float], None]] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+        ledger=None,
+        skip_committed: bool = True
+    ):
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.scheduler = scheduler or PolitenessScheduler()
+        self.fetch = fetch
+        self.embed = embed or vector_store.embedding.embed_documents
+        self.write_lock = write_lock or nullcontext()
+        self.default_category = default_category
+        self.default_tags = default_tags
+        self.learning_path = learning_path
+        self.known_urls = known_urls
+        self.on_progress = on_progress
+        self.cancelled = cancelled or (lambda: False)
+        self.ledger = ledger
+        self.skip_committed = skip_committed
+        self._options = {"category": default_category, "tags": default_tags, "learning_path": learning_path}
+        self._keys: Dict[str, str] = {}
+        self.stats = PipelineStats()
+        self._stats_lock = threading.Lock()
+
+    def run(self, urls: Iterable[str]) -> PipelineStats:
+        """Ingest the URLs and return the run's statistics."""
+        urls = list(dict.fromkeys(urls))
+        self.stats = PipelineStats(total_urls=len(urls))
+        if self.ledger is not None:
+            self._keys = {url: import_key(url, self._options) for url in urls}
+            if self.skip_committed:
+                committed = self.ledger.committed(self._keys.values())
+                done = [url for url in urls if self._keys[url] in committed]
+                for url in done:
+                    self.stats.chunks_by_url[url] = committed[self._keys[url]]
+                self.stats.resumed = len(done)
+                urls = [url for url in urls if self._keys[url] not in committed]
+        batches = [_Batch(urls[i:i + self.batch_size]) for i in range(0, len(urls), self.batch_size)]
+
+        handlers = [self._fetch, self._extract, self._chunk, self._embed, self._write]
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(STAGES) - 1)]
+        threads = []
+        for index, (name, handler) in enumerate(zip(STAGES, handlers)):
+            inbox = iter(batches) if index == 0 else _drain(queues[index - 1])
+            outbox = queues[index] if index < len(queues) else None
+            thread = threading.Thread(
+                target=self._stage, args=(name, handler, inbox, outbox), name=f"ingest-{name}", daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+
+        self.stats.finished = time.monotonic()
+        return self.stats
+
+    def _stage(self, name: str, handler: Callable[[_Batch], None], inbox, outbox: Optional[queue.Queue]):
+        for batch in inbox:
+            if self.cancelled():
+                continue
+            started = time.monotonic()
+            try:
+                handler(batch)
+            except Exception as e:
+                print(f"Error in {name} stage: {e}")
+                self._record_failures({url: f"{name} failed: {e}" for url in batch.urls})
+                # Drop the batch; later stages only see batches that succeeded
+                continue
+            seconds = time.monotonic() - started
+            with self._stats_lock:
+                stage = self.stats.stages[name]
+                stage.batches += 1
+                stage.urls += len(batch.urls)
+                stage.busy_seconds += seconds
+            if self.on_progress is not None:
+                try:
+                    self.on_progress(name, batch.urls, seconds)
+                except Exception as e:
+                    print(f"Error reporting {name} progress: {e}")
+            if outbox is not None:
+                outbox.put(batch)
+        if outbox is not None:
+            outbox.put(_DONE)
+
+    def _record_failures(self, failures: Dict[str, str]):
+        with self._stats_lock:
+            for url, error in failures.items():
+                self.stats.failures.setdefault(url, error)
+        if self.ledger is not None and failures:
+            self.ledger.fail({self._keys[url]: url for url in failures if url in self._keys}, failures)
+
+    def _advance(self, batch: _Batch, state: str, chunks: Optional[Dict[str, int]] = None):
+        """Record the batch's URLs that have not failed as having reached ``state``."""
+        if self.ledger is None:
+            return
+        with self._stats_lock:
+            items = {
+                self._keys[url]: url for url in batch.urls
+                if url in self._keys and url not in self.stats.failures
+            }
+        self.ledger.mark(items, state, chunks)
+
+    def _fetch(self, batch: _Batch):
+        responses, failures = self.scheduler.run(batch.urls, self.fetch)
+        self._record_failures(failures)
+        batch.records = [responses[url] for url in batch.urls if url in responses]
+        batch.requested = {record.url: url for url, record in responses.items()}
+        self._advance(batch, FETCHED)
+
+    def _extract(self, batch: _Batch):
+        # Pages that make no document (PDF or JSON links, empty bodies) have
+        # nothing to commit; failing them keeps them out of the done count
+        # and lets a retry pick them up. Unchanged stored pages are done.
+        failures = {}
+        for record in batch.records:
+            reason = record_skip_reason(record, self.known_urls)
+            if reason == UNCHANGED:
+                batch.unchanged.append(record.url)
+            elif reason is not None:
+                failures[batch.requested.get(record.url, record.url)] = reason
+        self._record_failures(failures)
+        batch.documents = documents_from_records(
+            batch.records,
+            default_category=self.default_category,
+            default_tags=self.default_tags,
+            learning_path=self.learning_path,
+            known_urls=self.known_urls
+        )
+        batch.records = []
+        with self._stats_lock:
+            self.stats.documents += len(batch.documents)
+
+    def _chunk(self, batch: _Batch):
+        batch.chunks = chunk_documents(batch.documents)
+        chunked = {doc.metadata['source'] for doc in batch.chunks}
+        batch.empty = [doc.metadata['source'] for doc in batch.documents if doc.metadata['source'] not in chunked]
+        batch.documents = []
+        self._advance(batch, CHUNKED)
+
+    def _diffs(self, batch: _Batch) -> List[Any]:
+        return [
+            self.vector_store.diff_source(
+                source_url, [doc.page_content for doc in docs], [doc.metadata for doc in docs]
+            )
+            for source_url, docs in batch.by_source.items()
+        ]
+
+    def _embed_texts(self, texts: List[str], vectors: Dict[str, List[float]]):
+        texts = [text for text in dict.fromkeys(texts) if text not in vectors]
+        for start in range(0, len(texts), self.embed_batch_size):
+            part = texts[start:start + self.embed_batch_size]
+            vectors.update(zip(part, self.embed(part)))
+
+    def _embed(self, batch: _Batch):
+        # Documents built from fetched pages always carry their source URL
+        for doc in batch.chunks:
+            batch.by_source.setdefault(doc.metadata['source'], []).append(doc)
+
+        # Only new or changed chunks are embedded, all in as few requests as
+        # possible. Earlier batches may still be writing, so this diff is only
+        # a guess; the write stage diffs again against the current store.
+        texts = [text for diff in self._diffs(batch) for text in diff.new_texts]
+        self._embed_texts(texts, batch.vectors)
+        self._advance(batch, EMBEDDED)
+
+    def _write(self, batch: _Batch):
+        deferred = getattr(self.vector_store, "deferred_saves", nullcontext)
+        refresh = getattr(self.vector_store, "refresh", None)
+        totals = {"added": 0, "kept": 0, "removed": 0, "unchanged_sources": 0}
+        failures = {}
+        with self.write_lock:
+            # Other instances of the store (the app pages) may have written
+            # since it was loaded; saving stale state would drop their chunks
+            if refresh is not None:
+                refresh()
+            diffs = self._diffs(batch)
+            # Chunks another writer removed since embedding need embedding now
+            self._embed_texts([text for diff in diffs for text in diff.new_texts], batch.vectors)
+            with deferred():
+                for diff in diffs:
+                    # One bad source fails on its own; the rest of the batch is still committed
+                    try:
+                        embeddings = [batch.vectors[text] for text in diff.new_texts]
+                        self.vector_store.apply_source_diff(diff, embeddings=embeddings)
+                    except Exception as e:
+                        print(f"Error writing {diff.source_url}: {e}")
+                        failures[batch.requested.get(diff.source_url, diff.source_url)] = f"write failed: {e}"
+                        continue
+                    for key, value in diff.summary().items():
+                        totals[key] += value
+                    if diff.unchanged:
+                        totals["unchanged_sources"] += 1
+        self._record_failures(failures)
+
+        chunks_by_url: Dict[str, int] = {}
+        for doc in batch.chunks:
+            url = batch.requested.get(doc.metadata['source'], doc.metadata['source'])
+            if url not in failures:
+                chunks_by_url[url] = chunks_by_url.get(url, 0) + 1
+        written = sum(chunks_by_url.values())
+        # A page only counts as committed with no new chunks if it is stored
+        # unchanged or really had no text; anything else would block its
+        # re-import for good under the ledger's idempotency key
+        sources = getattr(self.vector_store, "sources", {})
+        for source_url in batch.unchanged:
+            url = batch.requested.get(source_url, source_url)
+            chunks_by_url[url] = len(sources.get(source_url, {}).get("chunks", {}))
+        for source_url in batch.empty:
+            chunks_by_url.setdefault(batch.requested.get(source_url, source_url), 0)
+        with self._stats_lock:
+            lost = [url for url in batch.urls if url not in chunks_by_url and url not in self.stats.failures]
+        self._record_failures({url: "no content extracted" for url in lost})
+        with self._stats_lock:
+            for key, value in totals.items():
+                setattr(self.stats, key, getattr(self.stats, key) + value)
+            for url, count in chunks_by_url.items():
+                self.stats.chunks_by_url[url] = self.stats.chunks_by_url.get(url, 0) + count
+            self.stats.chunks += written
+        # The store files are on disk now, so the batch counts as committed
+        self._advance(batch, COMMITTED, chunks_by_url)
+        batch.chunks = []
+        batch.by_source = {}
+        batch.vectors = {}
+
+
+def _drain(inbox: queue.Queue):
+    while True:
+        item = inbox.get()
+        if item is _DONE:
+            return
+        yield item
@@ -0,0 +1,442 @@
+"""SQLite-backed background job queue for bulk URL ingestion.
+
+A bulk import is stored as a job with one row per URL, so it survives browser
+refreshes and process restarts. A pool of worker threads claims URLs in small
+batches, fetches and chunks them concurrently and writes to the owning user's
+vector store, recording per-URL status, retries and cancellation.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+CANCELLED = "cancelled"
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+ACTIVE_JOB_STATUSES = (QUEUED, RUNNING)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    store_path TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    options TEXT NOT NULL DEFAULT '{}',
+    total INTEGER NOT NULL DEFAULT 0,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated TEXT NOT NULL,
+    PRIMARY KEY (job_id, url)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items (status, job_id);
+CREATE TABLE IF NOT EXISTS job_stages (
+    job_id INTEGER NOT NULL,
+    stage TEXT NOT NULL,
+    urls INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+
+class JobQueue:
+    """Persistent queue of ingestion jobs and their per-URL items."""
+
+    def __init__(self, db_path: Optional[str] = None, max_attempts: int = 3):
+        self.db_path = db_path or os.getenv("INGEST_JOBS_DB", "./ingest_jobs.db")
+        self.max_attempts = max_attempts
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if self.db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def enqueue(self, store_path: str, urls: Iterable[str], options: Optional[Dict[str, Any]] = None) -> int:
+        """Create a job for ``urls`` ingested into ``store_path``. Returns its id."""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (store_path, options, created, updated) VALUES (?, ?, ?, ?)",
+                (store_path, json.dumps(options or {}), now, now)
+            )
+            job_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO job_items (job_id, url, updated) VALUES (?, ?, ?)",
+                [(job_id, url, now) for url in urls]
+            )
+            total = self._conn.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            self._conn.execute(
+                "UPDATE jobs SET total = ?, status = ? WHERE id = ?",
+                (total, QUEUED if total else COMPLETED, job_id)
+            )
+        return job_id
+
+    def claim(self, limit: int) -> Optional[Tuple[Dict[str, Any], List[str]]]:
+        """Claim up to ``limit`` pending URLs of the oldest active job.
+
+        Returns:
+            (job, urls) or None if there is no work
+        """
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT j.* FROM jobs j WHERE j.status IN (?, ?) AND EXISTS "
+                "(SELECT 1 FROM job_items i WHERE i.job_id = j.id AND i.status = ?) "
+                "ORDER BY j.id LIMIT 1",
+                (QUEUED, RUNNING, PENDING)
+            ).fetchone()
+            if row is None:
+                return None
+            job = self._job_dict(row)
+            urls = [r["url"] for r in self._conn.execute(
+                "SELECT url FROM job_items WHERE job_id = ? AND status = ? ORDER BY rowid LIMIT ?",
+                (job["id"], PENDING, limit)
+            )]
+            self._conn.executemany(
+                "UPDATE job_items SET status = ?, attempts = attempts + 1, updated = ? "
+                "WHERE job_id = ? AND url = ?",
+                [(RUNNING, now, job["id"], url) for url in urls]
+            )
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE id = ?", (RUNNING, now, job["id"])
+            )
+        return job, urls
+
+    def complete(self, job_id: int, url: str, chunks: int = 0):
+        self._finish_item(job_id, url, DONE, chunks=chunks)
+
+    def fail(self, job_id: int, url: str, error: str, retry: bool = True):
+        """Record a failed URL; it is queued again until ``max_attempts`` is reached."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM job_items WHERE job_id = ? AND url = ?", (job_id, url)
+            ).fetchone()
+        status = PENDING if retry and row and row["attempts"] < self.max_attempts else FAILED
+        self._finish_item(job_id, url, status, error=error)
+
+    def _finish_item(self, job_id: int, url: str, status: str, chunks: int = 0, error: Optional[str] = None):
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            # Items of a cancelled job stay cancelled
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, chunks = ?, error = ?, updated = ? "
+                "WHERE job_id = ? AND url = ? AND status = ?",
+                (status, chunks, error, now, job_id, url, RUNNING)
+            )
+            remaining = self._conn.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status IN (?, ?)",
+                (job_id, PENDING, RUNNING)
+            ).fetchone()[0]
+            if not remaining:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status = ?",
+                    (COMPLETED, now, job_id, RUNNING)
+                )
+
+    def cancel(self, job_id: int):
+        """Cancel a job: pending URLs are dropped, in-flight batches are not written."""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, now, job_id, QUEUED, RUNNING)
+            )
+            self._conn.execute(
+                "UPDATE job_items SET status = ?, updated = ? WHERE job_id = ? AND status IN (?, ?)",
+                (CANCELLED, now, job_id, PENDING, RUNNING)
+            )
+
+    def is_cancelled(self, job_id: int) -> bool:
+        job = self.get_job(job_id)
+        return job is None or job["status"] == CANCELLED
+
+    def requeue_interrupted(self) -> int:
+        """Put URLs left running by a previous process back in the queue."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE job_items SET status = ?, updated = ? WHERE status = ?",
+                (PENDING, datetime.now().isoformat(), RUNNING)
+            )
+        return cursor.rowcount
+
+    def _job_dict(self, row) -> Dict[str, Any]:
+        job = dict(row)
+        job["options"] = json.loads(job["options"] or "{}")
+        return job
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job_dict(row) if row else None
+
+    def list_jobs(self, store_path: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent jobs, optionally only those writing to ``store_path``."""
+        query = "SELECT * FROM jobs"
+        params: List[Any] = []
+        if store_path is not None:
+            query += " WHERE store_path = ?"
+            params.append(store_path)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._job_dict(row) for row in rows]
+
+    def progress(self, job_id: int) -> Dict[str, int]:
+        """Per-status URL counts plus the total chunks written."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*), SUM(chunks) FROM job_items WHERE job_id = ? GROUP BY status",
+                (job_id,)
+            ).fetchall()
+        counts = {status: 0 for status in (PENDING, RUNNING, DONE, FAILED, CANCELLED)}
+        counts["chunks"] = 0
+        for status, count, chunks in rows:
+            counts[status] = count
+            counts["chunks"] += chunks or 0
+        return counts
+
+    def record_stage(self, job_id: int, stage: str, urls: int, seconds: float):
+        """Add a finished batch to a job's per-stage progress."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO job_stages (job_id, stage, urls, busy_seconds) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (job_id, stage) DO UPDATE SET "
+                "urls = urls + excluded.urls, busy_seconds = busy_seconds + excluded.busy_seconds",
+                (job_id, stage, urls, seconds)
+            )
+
+    def stage_progress(self, job_id: int) -> Dict[str, Dict[str, float]]:
+        """URLs through each pipeline stage and the time spent in it."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, urls, busy_seconds FROM job_stages WHERE job_id = ?", (job_id,)
+            ).fetchall()
+        return {row["stage"]: {"urls": row["urls"], "busy_seconds": row["busy_seconds"]} for row in rows}
+
+    def failures(self, job_id: int) -> Dict[str, str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, error FROM job_items WHERE job_id = ? AND status = ?", (job_id, FAILED)
+            ).fetchall()
+        return {row["url"]: row["error"] for row in rows}
+
+
+# A batch handler receives (job, urls) and returns (chunks by URL, error by URL)
+BatchHandler = Callable[[Dict[str, Any], List[str]], Tuple[Dict[str, int], Dict[str, str]]]
+
+
+class WorkerPool:
+    """Background threads that drain a JobQueue.
+
+    Each worker claims a small batch of URLs at a time, so a large job is
+    spread over all workers while the number of URLs in flight stays bounded
+    by ``workers * batch_size``.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: BatchHandler,
+        workers: int = 4,
+        batch_size: int = 10,
+        poll_interval: float = 1.0
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        if self._threads:
+            return
+        self.queue.requeue_interrupted()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"ingest-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stop.clear()
+
+    def run_once(self) -> bool:
+        """Process one batch. Returns False if the queue was empty."""
+        claimed = self.queue.claim(self.batch_size)
+        if claimed is None:
+            return False
+        job, urls = claimed
+        try:
+            chunks, failures = self.handler(job, urls)
+        except Exception as e:
+            print(f"Error processing batch of job {job['id']}: {e}")
+            for url in urls:
+                self.queue.fail(job["id"], url, str(e))
+            return True
+        for url in urls:
+            if url in failures:
+                self.queue.fail(job["id"], url, failures[url])
+            else:
+                self.queue.complete(job["id"], url, chunks.get(url, 0))
+        return True
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                busy = self.run_once()
+            except Exception as e:
+                print(f"Ingest worker error: {e}")
+                busy = False
+            if not busy:
+                self._stop.wait(self.poll_interval)
+
+
+_stores: Dict[str, Any] = {}
+_store_locks: Dict[str, threading.Lock] = {}
+_store_locks_guard = threading.Lock()
+
+
+def store_lock(store_path: str) -> threading.Lock:
+    """Lock serializing writes to one on-disk vector store across workers."""
+    with _store_locks_guard:
+        return _store_locks.setdefault(os.path.abspath(store_path), threading.Lock())
+
+
+def get_store(store_path: str):
+    """Vector store shared by the workers and app pages writing to ``store_path``.
+
+    Every save rewrites the whole store, and other processes (the ingest
+    CLI) write their own instances: call its ``refresh()`` while holding
+    ``store_lock`` before every write, or its next save overwrites what
+    they wrote. ``store_lock`` is not reentrant; get the store first.
+    """
+    from simple_vector_store import SimpleVectorStore
+
+    key = os.path.abspath(store_path)
+    with store_lock(store_path):
+        if key not in _stores:
+            _stores[key] = SimpleVectorStore(store_path=store_path)
+        return _stores[key]
+
+
+def ingest_url_batch(job: Dict[str, Any], urls: List[str]) -> Tuple[Dict[str, int], Dict[str, str]]:
+    """Default batch handler: run the URLs through the staged ingest pipeline.
+
+    Fetching, extraction, chunking and embedding of consecutive batches
+    overlap; writes to the job's vector store are serialized per store.
+    URLs the store's import ledger has already committed with the same
+    options are not fetched again unless the job re-imports.
+    """
+    from utils.duplicate_detector import URLIndex
+    from utils.import_ledger import ImportLedger
+    from utils.ingest_pipeline import IngestPipeline
+
+    queue = get_job_queue()
+    options = job["options"]
+    store_path = job["store_path"]
+    ledger = ImportLedger.for_store(store_path)
+    pipeline = IngestPipeline(
+        get_store(store_path),
+        write_lock=store_lock(store_path),
+        scheduler=_get_scheduler(),
+        default_category=options.get("category"),
+        default_tags=options.get("tags"),
+        learning_path=options.get("learning_path"),
+        known_urls=URLIndex.for_store(store_path) if options.get("skip_unchanged", True) else None,
+        on_progress=lambda stage, batch, seconds: queue.record_stage(job["id"], stage, len(batch), seconds),
+        cancelled=lambda: queue.is_cancelled(job["id"]),
+        ledger=ledger,
+        skip_committed=not options.get("reimport", False)
+    )
+    try:
+        stats = pipeline.run(urls)
+    finally:
+        ledger.close()
+    return stats.chunks_by_url, stats.failures
+
+
+_scheduler = None
+_default_queue = None
+_default_pool = None
+_pool_guard = threading.Lock()
+
+
+def _get_scheduler():
+    # One scheduler for every worker so per-domain politeness holds across jobs
+    global _scheduler
+    if _scheduler is None:
+        from utils.politeness import PolitenessScheduler
+        _scheduler = PolitenessScheduler()
+    return _scheduler
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue."""
+    global _default_queue
+    with _pool_guard:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
+
+
+def start_workers(workers: Optional[int] = None) -> WorkerPool:
+    """Start the process-wide worker pool (once) and return it.
+
+    URLs left running by a previous process are queued again on start.
+    """
+    global _default_pool
+    queue = get_job_queue()
+    with _pool_guard:
+        if _default_pool is None:
+            # Each worker runs its claimed URLs through a staged pipeline in
+            # batches of 10, so claims are larger than one batch
+            _default_pool = WorkerPool(
+                queue,
+                ingest_url_batch,
+                workers=workers or int(os.getenv("INGEST_WORKERS", "2")),
+                batch_size=int(os.getenv("INGEST_CLAIM_SIZE", "30"))
+            )
+            _default_pool.start()
+        return _default_pool
+
+
+def wait_for_job(queue: JobQueue, job_id: int, timeout: float = 60.0, interval: float = 0.1) -> Dict[str, Any]:
+    """Block until a job is no longer active (useful for scripts and tests)."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get_job(job_id)
+        if job is None or job["status"] not in ACTIVE_JOB_STATUSES:
+            return job
+        time.sleep(interval)
+    return queue.get_job(job_id)
@@ -0,0 +1,258 @@
+"""Temp-file handling, audio extraction and silence splitting for uploaded media.
+
+Uploads are streamed into a private temporary directory (one per upload,
+so concurrent sessions never collide), the audio track is extracted by an
+ffmpeg subprocess as low-bitrate mono MP3 (enough for speech recognition
+and far smaller to upload), long audio is split at silences into segments
+that can be transcribed in parallel, and the directory is removed when the
+workspace closes. Each step is timed.
+"""
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+_COPY_BLOCK = 1 << 20
+_DURATION = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+_SILENCE_START = re.compile(r"silence_start: (-?\d+(?:\.\d+)?)")
+_SILENCE_END = re.compile(r"silence_end: (\d+(?:\.\d+)?)")
+
+# Audio longer than this is split; segments aim for the target length
+SEGMENT_MAX_SECONDS = 600.0
+SEGMENT_TARGET_SECONDS = 300.0
+
+
+def ffmpeg_executable() -> str:
+    """Path of the ffmpeg binary: $FFMPEG_BINARY, ffmpeg on PATH, or imageio-ffmpeg's."""
+    configured = os.getenv("FFMPEG_BINARY")
+    if configured:
+        return configured
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception as e:
+        raise RuntimeError("ffmpeg not found; install ffmpeg or the imageio-ffmpeg package") from e
+
+
+@dataclass
+class MediaTimings:
+    """Seconds spent in each preprocessing stage."""
+    stages: Dict[str, float] = field(default_factory=dict)
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    @property
+    def total(self) -> float:
+        return sum(self.stages.values())
+
+    def summary(self) -> str:
+        return ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stages.items())
+
+
+def _ffmpeg_stderr(args: List[str], timeout: Optional[float] = None) -> str:
+    result = subprocess.run(
+        [ffmpeg_executable(), "-nostdin", "-hide_banner", *args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout
+    )
+    return result.stderr.decode("utf-8", errors="replace")
+
+
+def probe_duration(path: str, timeout: Optional[float] = None) -> Optional[float]:
+    """Duration of a media file in seconds, or None if ffmpeg cannot read it."""
+    match = _DURATION.search(_ffmpeg_stderr(["-i", path], timeout))
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def detect_silences(
+    path: str,
+    noise: str = "-30dB",
+    min_silence: float = 0.5,
+    timeout: Optional[float] = None
+) -> List[Tuple[float, float]]:
+    """(start, end) seconds of every silence in ``path``, via ffmpeg's silencedetect."""
+    output = _ffmpeg_stderr(
+        ["-i", path, "-vn", "-af", f"silencedetect=noise={noise}:d={min_silence}", "-f", "null", "-"],
+        timeout
+    )
+    silences = []
+    start = None
+    for line in output.splitlines():
+        match = _SILENCE_START.search(line)
+        if match:
+            start = max(0.0, float(match.group(1)))
+            continue
+        match = _SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((start, float(match.group(1))))
+            start = None
+    return silences
+
+
+def plan_segments(
+    duration: float,
+    silences: List[Tuple[float, float]],
+    target: float = SEGMENT_TARGET_SECONDS,
+    max_length: float = SEGMENT_MAX_SECONDS,
+    min_length: Optional[float] = None
+) -> List[Tuple[float, float]]:
+    """Split ``duration`` seconds into (start, end) ranges cut inside silences.
+
+    Each cut is the middle of the silence closest to ``target`` seconds after
+    the previous cut, at least ``min_length`` (default: a tenth of
+    ``target``) from either end; without such a silence the audio is cut at
+    ``target``. Audio no longer than ``max_length`` stays in one piece.
+    """
+    if min_length is None:
+        min_length = target / 10
+    midpoints = sorted((start + end) / 2 for start, end in silences)
+    ranges = []
+    start = 0.0
+    while duration - start > max_length:
+        window = [
+            m for m in midpoints
+            if start + min_length <= m <= min(start + max_length, duration - min_length)
+        ]
+        cut = min(window, key=lambda m: abs(m - start - target)) if window else start + target
+        ranges.append((start, cut))
+        start = cut
+    ranges.append((start, duration))
+    return ranges
+
+
+@dataclass
+class Segment:
+    """A time range of an audio file, in seconds, and the file holding it."""
+    index: int
+    start: float
+    end: Optional[float]
+    path: str
+
+
+class MediaWorkspace:
+    """Private temporary directory for one media upload, removed on exit.
+
+    Usage:
+        with MediaWorkspace() as workspace:
+            video_path = workspace.save_upload(uploaded_file)
+            audio_path = workspace.extract_audio(video_path)
+            ...
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, timings: Optional[MediaTimings] = None):
+        self.base_dir = base_dir or os.getenv("MEDIA_TMP_DIR") or None
+        self.timings = timings or MediaTimings()
+        self.path: Optional[str] = None
+
+    def __enter__(self) -> "MediaWorkspace":
+        if self.base_dir:
+            os.makedirs(self.base_dir, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix="media_", dir=self.base_dir)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.cleanup()
+
+    def cleanup(self):
+        if self.path and os.path.isdir(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+        self.path = None
+
+    def file(self, name: str) -> str:
+        """Path for a file inside the workspace (only the base name of ``name`` is used)."""
+        if self.path is None:
+            raise RuntimeError("MediaWorkspace is not open")
+        return os.path.join(self.path, os.path.basename(name) or "upload")
+
+    def save_upload(self, uploaded, name: Optional[str] = None) -> str:
+        """Copy an uploaded file into the workspace in blocks and return its path."""
+        path = self.file(name or getattr(uploaded, "name", "upload"))
+        with self.timings.stage("save"):
+            if hasattr(uploaded, "seek"):
+                uploaded.seek(0)
+            with open(path, 'wb') as f:
+                shutil.copyfileobj(uploaded, f, _COPY_BLOCK)
+        return path
+
+    def extract_audio(
+        self,
+        media_path: str,
+        bitrate: str = "32k",
+        sample_rate: int = 16000,
+        timeout: Optional[float] = None
+    ) -> str:
+        """Extract the audio track of ``media_path`` as mono MP3 with ffmpeg.
+
+        ffmpeg reads and encodes the stream itself; no frames are decoded
+        into Python.
+
+        Returns:
+            Path of the MP3 inside the workspace
+        """
+        base = os.path.splitext(os.path.basename(media_path))[0]
+        audio_path = self.file(f"{base}.audio.mp3")
+        command = [
+            ffmpeg_executable(), "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+            "-i", media_path,
+            "-vn", "-ac", "1", "-ar", str(sample_rate), "-b:a", bitrate,
+            audio_path,
+        ]
+        with self.timings.stage("extract_audio"):
+            result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+        if result.returncode != 0 or not os.path.exists(audio_path):
+            error = result.stderr.decode("utf-8", errors="replace").strip().splitlines()
+            raise RuntimeError(f"Audio extraction failed: {error[-1] if error else result.returncode}")
+        return audio_path
+
+    def split_on_silence(
+        self,
+        audio_path: str,
+        target: float = SEGMENT_TARGET_SECONDS,
+        max_length: float = SEGMENT_MAX_SECONDS,
+        min_length: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> List[Segment]:
+        """Split long audio at silences into segment files inside the workspace.
+
+        Audio no longer than ``max_length`` (or that ffmpeg cannot read) is
+        returned as a single segment of the original file. Segments are cut
+        without re-encoding.
+        """
+        with self.timings.stage("detect_silence"):
+            duration = probe_duration(audio_path, timeout)
+            if duration is None or duration <= max_length:
+                return [Segment(0, 0.0, duration, audio_path)]
+            silences = detect_silences(audio_path, timeout=timeout)
+
+        base, ext = os.path.splitext(os.path.basename(audio_path))
+        segments = []
+        with self.timings.stage("split"):
+            for index, (start, end) in enumerate(plan_segments(duration, silences, target, max_length, min_length)):
+                path = self.file(f"{base}.{index:04d}{ext}")
+                command = [
+                    ffmpeg_executable(), "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+                    "-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", audio_path,
+                    "-c", "copy", path,
+                ]
+                result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+                if result.returncode != 0 or not os.path.exists(path):
+                    error = result.stderr.decode("utf-8", errors="replace").strip().splitlines()
+                    raise RuntimeError(f"Audio split failed: {error[-1] if error else result.returncode}")
+                segments.append(Segment(index, start, end, path))
+        return segments
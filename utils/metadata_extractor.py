@@ -3,8 +3,8 @@ import re
 from urllib.parse import urlparse
 from datetime import datetime
 from typing import Dict, Optional, Tuple
-import requests
-from bs4 import BeautifulSoup
+from utils.http_cache import cached_get
+from utils.html_parser import parse_html
 
 
 def extract_domain_category(url: str) -> str:
@@ -42,13 +42,9 @@ def extract_title_from_url(url: str, content: Optional[str] = None) -> str:
     """Extract title from URL or content."""
     # Try to get title from content first
     if content:
-        try:
-            soup = BeautifulSoup(content, 'html.parser')
-            title_tag = soup.find('title')
-            if title_tag and title_tag.text.strip():
-                return title_tag.text.strip()
-        except:
-            pass
+        title = parse_html(content).title
+        if title:
+            return title
     
     # Fallback: extract from URL path
     parsed = urlparse(url)
@@ -146,17 +142,10 @@ def create_metadata(
 
 def fetch_url_content(url: str) -> Tuple[str, Optional[str]]:
     """Fetch content from a URL and return (content, error)."""
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-        "Accept-Encoding": "identity"
-    }
-    
     try:
-        response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-        response.raise_for_status()
-        
-        if response.encoding is None:
-            response.encoding = 'utf-8'
+        response = cached_get(url, timeout=10)
+        if not response.ok:
+            return "", f"HTTP {response.status} for url: {url}"
         
         return response.text, None
     except Exception as e:
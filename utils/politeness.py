@@ -0,0 +1,294 @@
+"""Per-domain politeness scheduling for crawls and bulk imports.
+
+Requests to one domain are spaced by a delay (the larger of our default and
+the site's robots.txt ``Crawl-delay``) and capped at a few in flight, while
+different domains are interleaved so aggregate throughput stays high. 429 and
+503 responses double the domain's delay (and honor ``Retry-After``); successes
+decay it back towards the base delay.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager, asynccontextmanager
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from utils import http_client
+
+THROTTLE_STATUSES = (429, 503)
+# Longest ``run`` waits before re-checking a domain that other runs hold at
+# its concurrency cap; a request finishing on that domain wakes it sooner
+POLL_INTERVAL = 0.1
+
+
+def domain_of(url: str) -> str:
+    """Return the scheduling key (scheme + host) for a URL."""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc.lower()}"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def interleave_by_domain(urls: Iterable[str]) -> List[str]:
+    """Reorder URLs round-robin across domains, keeping order within a domain."""
+    queues = OrderedDict()
+    for url in urls:
+        queues.setdefault(domain_of(url), deque()).append(url)
+    ordered = []
+    while queues:
+        for domain in list(queues):
+            ordered.append(queues[domain].popleft())
+            if not queues[domain]:
+                del queues[domain]
+    return ordered
+
+
+@dataclass
+class _DomainState:
+    base_delay: float
+    delay: float
+    next_time: float = 0.0
+    inflight: int = 0
+    robots: Optional[RobotFileParser] = None
+
+
+class PolitenessScheduler:
+    """Tracks per-domain delay, concurrency and robots.txt rules."""
+
+    def __init__(
+        self,
+        default_delay: float = 1.0,
+        max_per_domain: int = 2,
+        max_delay: float = 60.0,
+        respect_robots: bool = True,
+        user_agent: str = http_client.USER_AGENT
+    ):
+        self.default_delay = default_delay
+        self.max_per_domain = max_per_domain
+        self.max_delay = max_delay
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+        self._domains: Dict[str, _DomainState] = {}
+        self._lock = threading.Lock()
+        # Notified whenever a request started by ``run`` finishes
+        self._released = threading.Condition(self._lock)
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _state(self, url: str) -> _DomainState:
+        domain = domain_of(url)
+        with self._lock:
+            state = self._domains.get(domain)
+            if state is not None:
+                return state
+
+        robots = self._load_robots(domain) if self.respect_robots else None
+        base_delay = self.default_delay
+        if robots is not None:
+            crawl_delay = robots.crawl_delay(self.user_agent)
+            if crawl_delay:
+                base_delay = max(base_delay, float(crawl_delay))
+
+        with self._lock:
+            return self._domains.setdefault(domain, _DomainState(base_delay, base_delay, robots=robots))
+
+    def _known_state(self, domain: str) -> Optional[_DomainState]:
+        with self._lock:
+            return self._domains.get(domain)
+
+    def _load_robots(self, domain: str) -> Optional[RobotFileParser]:
+        parser = RobotFileParser()
+        try:
+            response = http_client.get(f"{domain}/robots.txt", timeout=5)
+        except Exception as e:
+            print(f"Could not fetch robots.txt for {domain}: {e}")
+            return None
+        if response.status_code >= 400:
+            return None
+        parser.parse(response.text.splitlines())
+        return parser
+
+    def can_fetch(self, url: str) -> bool:
+        """Whether robots.txt allows fetching the URL."""
+        robots = self._state(url).robots
+        return robots is None or robots.can_fetch(self.user_agent, url)
+
+    def delay_for(self, url: str) -> float:
+        """Current delay between requests to the URL's domain."""
+        return self._state(url).delay
+
+    def reserve(self, url: str) -> float:
+        """Book the next request slot for the URL's domain.
+
+        Returns:
+            Seconds the caller should wait before sending the request
+        """
+        state = self._state(url)
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, state.next_time)
+            state.next_time = start + state.delay
+            return start - now
+
+    def record_response(self, url: str, status: int, retry_after: Optional[float] = None):
+        """Adapt the domain's delay to the response status."""
+        state = self._state(url)
+        with self._lock:
+            if status in THROTTLE_STATUSES:
+                state.delay = min(self.max_delay, max(state.delay * 2, state.base_delay, 1.0))
+                wait_until = time.monotonic() + (retry_after if retry_after is not None else state.delay)
+                state.next_time = max(state.next_time, wait_until)
+            elif status < 400:
+                state.delay = max(state.base_delay, state.delay * 0.8)
+
+    @contextmanager
+    def slot(self, url: str):
+        """Blocking context manager that waits for the domain's next slot."""
+        domain = domain_of(url)
+        with self._lock:
+            semaphore = self._semaphores.setdefault(domain, threading.BoundedSemaphore(self.max_per_domain))
+        with semaphore:
+            time.sleep(self.reserve(url))
+            yield
+
+    @asynccontextmanager
+    async def async_slot(self, url: str):
+        """asyncio version of ``slot``."""
+        domain = domain_of(url)
+        if domain not in self._domains:
+            # robots.txt is fetched with the blocking client, off the event loop
+            await asyncio.to_thread(self._state, url)
+        semaphore = self._async_semaphores.setdefault(domain, asyncio.Semaphore(self.max_per_domain))
+        async with semaphore:
+            await asyncio.sleep(self.reserve(url))
+            yield
+
+    def run(
+        self,
+        urls: Iterable[str],
+        fetch: Callable[[str], Any],
+        max_workers: int = 8,
+        max_attempts: int = 3
+    ) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """Fetch URLs on a thread pool, dispatching whichever domain is ready.
+
+        robots.txt of a new domain is loaded on the pool too, so a slow robots
+        fetch only holds up its own domain. Several runs may share the
+        scheduler; a domain held at its cap by another run is waited for, not
+        polled in a busy loop.
+
+        Args:
+            urls: URLs to fetch
+            fetch: Called with a URL; returns an object with ``status`` (and
+                optionally ``header()``) or raises on network errors
+            max_workers: Total requests in flight across all domains
+            max_attempts: Attempts per URL for throttled or failed requests
+
+        Returns:
+            (responses by URL, error message by URL)
+        """
+        queues = OrderedDict()
+        for url in urls:
+            queues.setdefault(domain_of(url), deque()).append((url, 1))
+
+        results: Dict[str, Any] = {}
+        failures: Dict[str, str] = {}
+        inflight = {}
+        # Domains whose robots.txt is being loaded, by future
+        loading = {}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while queues or inflight or loading:
+                now = time.monotonic()
+                next_wakeup = None
+
+                for domain in list(queues):
+                    if len(inflight) + len(loading) >= max_workers:
+                        break
+                    if domain in loading.values():
+                        continue
+                    url, attempt = queues[domain][0]
+                    state = self._known_state(domain)
+                    if state is None:
+                        loading[pool.submit(self._state, url)] = domain
+                        continue
+                    if state.inflight >= self.max_per_domain:
+                        # Requests of other runs sharing the scheduler may hold it there
+                        next_wakeup = POLL_INTERVAL if next_wakeup is None else min(next_wakeup, POLL_INTERVAL)
+                        continue
+                    if state.next_time > now:
+                        wakeup = state.next_time - now
+                        next_wakeup = wakeup if next_wakeup is None else min(next_wakeup, wakeup)
+                        continue
+
+                    queues[domain].popleft()
+                    if not queues[domain]:
+                        del queues[domain]
+                    else:
+                        # Move the domain to the back so domains take turns
+                        queues.move_to_end(domain)
+
+                    if self.respect_robots and not self.can_fetch(url):
+                        failures[url] = "Disallowed by robots.txt"
+                        continue
+
+                    self.reserve(url)
+                    with self._lock:
+                        state.inflight += 1
+                    inflight[pool.submit(fetch, url)] = (url, attempt)
+
+                if not inflight and not loading:
+                    if queues:
+                        with self._released:
+                            self._released.wait(POLL_INTERVAL if next_wakeup is None else next_wakeup)
+                    continue
+
+                done, _ = wait(list(inflight) + list(loading), timeout=next_wakeup, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in loading:
+                        del loading[future]
+                        continue
+                    url, attempt = inflight.pop(future)
+                    state = self._state(url)
+                    with self._released:
+                        state.inflight -= 1
+                        self._released.notify_all()
+
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        if attempt < max_attempts:
+                            queues.setdefault(domain_of(url), deque()).append((url, attempt + 1))
+                        else:
+                            failures[url] = str(e)
+                        continue
+
+                    status = getattr(response, "status", 200)
+                    header = getattr(response, "header", None)
+                    retry_after = parse_retry_after(header("Retry-After")) if header else None
+                    self.record_response(url, status, retry_after)
+
+                    if status in THROTTLE_STATUSES and attempt < max_attempts:
+                        queues.setdefault(domain_of(url), deque()).append((url, attempt + 1))
+                    elif status >= 400:
+                        failures[url] = f"HTTP {status}"
+                    else:
+                        results[url] = response
+
+        return results, failures
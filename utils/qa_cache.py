@@ -0,0 +1,238 @@
+"""Two-level cache for the question answering path.
+
+Level one maps a normalized question (plus store, store version, k and
+filter) to the ids of the chunks retrieved for it, so asking again skips
+embedding the question and scoring the store. Level two maps the question,
+the retrieved chunk ids, the model and the prompt to the final answer, so
+asking again skips the LLM call.
+
+Any write to a store increases its version (``SimpleVectorStore.version``),
+so retrievals cached for an older version are never used again; answers are
+keyed by the chunks they were generated from and stay valid as long as
+retrieval returns the same chunks.
+
+Questions phrased differently miss both levels; ``answer_question`` can then
+consult a ``SemanticCache`` (see ``utils.semantic_cache``) before calling
+the LLM, and packs the retrieved chunks with a ``ContextPacker`` (see
+``utils.context_packer``) before sending them.
+"""
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from langchain.docstore.document import Document
+
+from utils.context_packer import ContextPacker, PackStats
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation."""
+    return _SPACES.sub(" ", question).strip().rstrip("?!.。？！ ").lower()
+
+
+def _digest(value: Any) -> str:
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@dataclass
+class QAStats:
+    retrieval_hits: int = 0
+    retrieval_misses: int = 0
+    answer_hits: int = 0
+    answer_misses: int = 0
+    # LLM time the answer hits would have cost
+    saved_seconds: float = 0.0
+
+
+class QACache:
+    """In-memory LRU caches of retrieved chunk ids and of answers.
+
+    Args:
+        max_retrievals: Retrieval results kept
+        max_answers: Answers kept
+    """
+
+    def __init__(self, max_retrievals: int = 1024, max_answers: int = 512):
+        self._retrievals = _LRU(max_retrievals)
+        self._answers = _LRU(max_answers)
+        self.stats = QAStats()
+
+    @staticmethod
+    def retrieval_key(
+        store_path: str,
+        version: int,
+        question: str,
+        k: int,
+        filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple:
+        return (store_path, version, normalize_question(question), k, _digest(filter or {}))
+
+    @staticmethod
+    def answer_key(question: str, chunk_ids: List[str], model: str, prompt: str) -> Tuple:
+        return (normalize_question(question), tuple(chunk_ids), model, _digest(prompt))
+
+    def get_retrieval(self, key: Tuple) -> Optional[List[str]]:
+        ids = self._retrievals.get(key)
+        if ids is None:
+            self.stats.retrieval_misses += 1
+            return None
+        self.stats.retrieval_hits += 1
+        return list(ids)
+
+    def put_retrieval(self, key: Tuple, chunk_ids: List[str]):
+        self._retrievals.put(key, tuple(chunk_ids))
+
+    def get_answer(self, key: Tuple) -> Optional[Any]:
+        entry = self._answers.get(key)
+        if entry is None:
+            self.stats.answer_misses += 1
+            return None
+        answer, seconds = entry
+        self.stats.answer_hits += 1
+        self.stats.saved_seconds += seconds
+        return answer
+
+    def put_answer(self, key: Tuple, answer: Any, seconds: float = 0.0):
+        """Cache an answer that took ``seconds`` to generate."""
+        self._answers.put(key, (answer, seconds))
+
+    def clear(self):
+        self._retrievals.clear()
+        self._answers.clear()
+
+
+@dataclass
+class CachedAnswer:
+    """Answer to a question and where its parts came from."""
+    answer: Any
+    documents: List[Document]
+    chunk_ids: List[str]
+    retrieval_cached: bool
+    answer_cached: bool
+    seconds: float
+    # Set when the answer was reused from a similar earlier question
+    similar_question: Optional[str] = None
+    similarity: Optional[float] = None
+    # Set when the answer was generated from packed context
+    packing: Optional[PackStats] = None
+
+
+def answer_question(
+    store,
+    question: str,
+    generate: Callable[[List[Document]], Any],
+    cache: QACache,
+    model: str,
+    prompt: str,
+    k: int = 4,
+    filter: Optional[Dict[str, Any]] = None,
+    semantic_cache=None,
+    packer: Optional[ContextPacker] = None
+) -> CachedAnswer:
+    """Answer ``question`` from ``store``, reusing cached retrievals and answers.
+
+    Args:
+        store: Vector store with ``version``, ``embedding``,
+            ``similarity_search_ids`` and ``get_documents``
+        generate: Produces the answer from the retrieved documents (the LLM call)
+        cache: Cache shared between reruns and sessions
+        model: Model name; part of the answer key
+        prompt: Prompt template; part of the answer key
+        semantic_cache: Optional SemanticCache consulted when no exact answer
+            is cached; it reuses the question embedding made for retrieval
+        packer: Optional ContextPacker applied to the retrieved documents
+            before ``generate``; its settings are part of the answer key
+    """
+    started = time.perf_counter()
+    question_embedding = None
+    retrieval_key = cache.retrieval_key(store.store_path, store.version, question, k, filter)
+    chunk_ids = cache.get_retrieval(retrieval_key)
+    retrieval_cached = chunk_ids is not None
+    if not retrieval_cached:
+        question_embedding = store.embedding.embed_query(question)
+        chunk_ids = store.similarity_search_ids(question, k=k, filter=filter, query_embedding=question_embedding)
+        cache.put_retrieval(retrieval_key, chunk_ids)
+    documents = store.get_documents(chunk_ids)
+
+    if packer is not None:
+        prompt = f"{prompt}\n{packer.cache_key()}"
+    answer_key = cache.answer_key(question, chunk_ids, model, prompt)
+    answer = cache.get_answer(answer_key)
+    if answer is not None:
+        return CachedAnswer(answer, documents, chunk_ids, retrieval_cached, True, time.perf_counter() - started)
+
+    context = (tuple(chunk_ids), model, _digest(prompt))
+    if semantic_cache is not None:
+        if question_embedding is None:
+            question_embedding = store.embedding.embed_query(question)
+        hit = semantic_cache.lookup(question_embedding, context)
+        if hit is not None:
+            cache.put_answer(answer_key, hit.answer, hit.seconds)
+            return CachedAnswer(
+                hit.answer, documents, chunk_ids, retrieval_cached, True, time.perf_counter() - started,
+                similar_question=hit.question, similarity=hit.similarity
+            )
+
+    packing = None
+    context_documents = documents
+    if packer is not None:
+        context_documents, packing = packer.pack(documents)
+
+    generating = time.perf_counter()
+    answer = generate(context_documents)
+    generation_seconds = time.perf_counter() - generating
+    cache.put_answer(answer_key, answer, generation_seconds)
+    if semantic_cache is not None:
+        semantic_cache.add(question_embedding, context, question, answer, generation_seconds)
+    return CachedAnswer(
+        answer, documents, chunk_ids, retrieval_cached, False, time.perf_counter() - started, packing=packing
+    )
+
+
+_default_cache: Optional[QACache] = None
+_default_guard = threading.Lock()
+
+
+def get_qa_cache() -> QACache:
+    """Return the process-wide QA cache (shared by all sessions)."""
+    global _default_cache
+    with _default_guard:
+        if _default_cache is None:
+            _default_cache = QACache()
+        return _default_cache
@@ -0,0 +1,137 @@
+"""Semantic answer cache: reuse answers for near-identical questions.
+
+Past questions are kept as unit-length embeddings in one numpy matrix, so
+finding the nearest earlier question is a single matrix-vector product.
+Its answer is reused when the similarity reaches the threshold and the
+question was answered from the same context (retrieved chunk ids, model
+and prompt); otherwise the LLM is called and the new answer is added.
+
+Hit rate and the LLM time saved (the recorded generation time of every
+reused answer) are kept in ``SemanticCache.stats``.
+"""
+import itertools
+import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.92
+
+
+@dataclass
+class SemanticStats:
+    lookups: int = 0
+    hits: int = 0
+    saved_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+@dataclass
+class SemanticHit:
+    answer: Any
+    question: str
+    similarity: float
+    # Time the reused answer took to generate
+    seconds: float
+
+
+class SemanticCache:
+    """Answers of past questions, looked up by embedding similarity.
+
+    Args:
+        threshold: Minimum cosine similarity to the earlier question
+            (default: $SEMANTIC_CACHE_THRESHOLD or 0.92)
+        max_entries: Questions kept; the oldest are overwritten when full
+    """
+
+    def __init__(self, threshold: Optional[float] = None, max_entries: int = 2048):
+        if threshold is None:
+            threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", DEFAULT_THRESHOLD))
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.stats = SemanticStats()
+        self._vectors: Optional[np.ndarray] = None
+        # Context of each row as a small int, so matching contexts is a vector compare
+        self._row_context = np.full(max_entries, -1, dtype=np.int64)
+        self._context_ids: Dict[Hashable, int] = {}
+        self._context_counter = itertools.count()
+        self._rows: List[Optional[Tuple[str, Any, float]]] = [None] * max_entries
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(1 for row in self._rows if row is not None)
+
+    @staticmethod
+    def _unit(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, context: Hashable) -> Optional[SemanticHit]:
+        """Answer of the most similar earlier question with the same context, if close enough."""
+        query = self._unit(embedding)
+        with self._lock:
+            self.stats.lookups += 1
+            context_id = self._context_ids.get(context)
+            if context_id is None or self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                return None
+            similarities = self._vectors @ query
+            similarities[self._row_context != context_id] = -np.inf
+            row = int(np.argmax(similarities))
+            similarity = float(similarities[row])
+            if similarity < self.threshold:
+                return None
+            question, answer, seconds = self._rows[row]
+            self.stats.hits += 1
+            self.stats.saved_seconds += seconds
+        return SemanticHit(answer, question, similarity, seconds)
+
+    def add(self, embedding, context: Hashable, question: str, answer: Any, seconds: float):
+        """Remember an answer generated in ``seconds`` for ``question`` in ``context``."""
+        vector = self._unit(embedding)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._row_context[:] = -1
+                self._rows = [None] * self.max_entries
+                self._context_ids.clear()
+                self._next = 0
+            if len(self._context_ids) > 2 * self.max_entries:
+                # Forget contexts whose rows have all been overwritten
+                live = set(self._row_context[self._row_context >= 0].tolist())
+                self._context_ids = {key: i for key, i in self._context_ids.items() if i in live}
+            row = self._next
+            self._next = (self._next + 1) % self.max_entries
+            self._vectors[row] = vector
+            context_id = self._context_ids.get(context)
+            if context_id is None:
+                context_id = self._context_ids[context] = next(self._context_counter)
+            self._row_context[row] = context_id
+            self._rows[row] = (question, answer, seconds)
+
+    def clear(self):
+        with self._lock:
+            self._vectors = None
+            self._row_context[:] = -1
+            self._rows = [None] * self.max_entries
+            self._context_ids.clear()
+            self._next = 0
+
+
+_default_cache: Optional[SemanticCache] = None
+_default_guard = threading.Lock()
+
+
+def get_semantic_cache() -> SemanticCache:
+    """Return the process-wide semantic cache (shared by all sessions)."""
+    global _default_cache
+    with _default_guard:
+        if _default_cache is None:
+            _default_cache = SemanticCache()
+        return _default_cache
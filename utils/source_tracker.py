@@ -0,0 +1,87 @@
+"""Utilities for tracking which chunks came from which source version."""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+def content_hash(text: str) -> str:
+    """Return a stable hash for a piece of text."""
+    return hashlib.sha256(text.encode("utf-8", errors="replace")).hexdigest()
+
+
+def source_content_hash(texts: List[str]) -> str:
+    """Return a hash identifying one version of a source from its chunks."""
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(content_hash(text).encode("ascii"))
+    return digest.hexdigest()
+
+
+@dataclass
+class SourceDiff:
+    """Changes needed to bring a stored source up to date with new chunks."""
+    source_url: str
+    content_hash: str
+    new_texts: List[str] = field(default_factory=list)
+    new_metadatas: List[dict] = field(default_factory=list)
+    new_chunk_hashes: List[str] = field(default_factory=list)
+    kept: Dict[str, str] = field(default_factory=dict)  # chunk_hash -> doc id
+    stale_ids: List[str] = field(default_factory=list)
+
+    @property
+    def unchanged(self) -> bool:
+        return not self.new_texts and not self.stale_ids
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "added": len(self.new_texts),
+            "kept": len(self.kept),
+            "removed": len(self.stale_ids),
+        }
+
+
+def diff_chunks(
+    source_url: str,
+    texts: List[str],
+    existing: Dict[str, str],
+    metadatas: Optional[List[dict]] = None
+) -> SourceDiff:
+    """Compare new chunks for a source against the chunks already stored.
+
+    Args:
+        source_url: URL (or other identifier) of the source
+        texts: Chunk texts of the new version of the source
+        existing: Mapping of chunk hash to stored doc id for the old version
+        metadatas: Optional metadata for each chunk in ``texts``
+
+    Returns:
+        SourceDiff listing the chunks to embed, keep and delete
+    """
+    diff = SourceDiff(source_url=source_url, content_hash=source_content_hash(texts))
+    # Hashes already kept or queued for embedding; a set keeps large pages linear
+    seen = set()
+
+    for i, text in enumerate(texts):
+        chunk_hash = content_hash(text)
+        if chunk_hash in seen:
+            # Identical chunk repeated within the same source
+            continue
+        seen.add(chunk_hash)
+        if chunk_hash in existing:
+            diff.kept[chunk_hash] = existing[chunk_hash]
+            continue
+
+        metadata = dict(metadatas[i]) if metadatas and i < len(metadatas) else {}
+        metadata["source_url"] = source_url
+        metadata["chunk_hash"] = chunk_hash
+        metadata["content_hash"] = diff.content_hash
+
+        diff.new_texts.append(text)
+        diff.new_metadatas.append(metadata)
+        diff.new_chunk_hashes.append(chunk_hash)
+
+    diff.stale_ids = [
+        doc_id for chunk_hash, doc_id in existing.items()
+        if chunk_hash not in diff.kept
+    ]
+    return diff
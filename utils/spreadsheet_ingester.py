@@ -0,0 +1,137 @@
+"""Streaming Excel ingestion as compact row-group chunks.
+
+Workbooks are read with openpyxl in read-only mode, one row at a time, so
+memory stays flat however many rows a sheet has. Every sheet is read. Rows
+are grouped into chunks that never split a row, and each chunk repeats its
+sheet's header row so it can be understood on its own when retrieved.
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from langchain.docstore.document import Document
+
+CELL_SEPARATOR = " | "
+
+
+@dataclass
+class RowGroup:
+    """Consecutive data rows of one sheet, with the sheet's header."""
+    sheet: str
+    header: List[str]
+    first_row: int
+    last_row: int
+    rows: List[List[str]]
+
+
+@dataclass
+class SpreadsheetStats:
+    """What was read from a workbook; filled in while its chunks are consumed."""
+    sheets: List[str] = field(default_factory=list)
+    rows: int = 0
+    chunks: int = 0
+    columns: Dict[str, List[str]] = field(default_factory=dict)
+
+
+def format_cell(value: Any) -> str:
+    """Compact text for a cell value (no padding, integral floats without .0)."""
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return " ".join(str(value).split())
+
+
+def _trimmed(values: Sequence[Any]) -> List[str]:
+    cells = [format_cell(v) for v in values]
+    while cells and not cells[-1]:
+        cells.pop()
+    return cells
+
+
+def iter_row_groups(
+    source,
+    rows_per_chunk: int = 50,
+    max_chars: int = 4000,
+    stats: Optional[SpreadsheetStats] = None
+) -> Iterator[RowGroup]:
+    """Yield row groups from every sheet of an .xlsx workbook.
+
+    The first non-empty row of a sheet is its header; empty rows are
+    skipped. A group ends after ``rows_per_chunk`` rows or before it would
+    exceed ``max_chars``; a single longer row still forms its own group.
+
+    Args:
+        source: Path or binary file-like object of the workbook
+        rows_per_chunk: Maximum data rows per group
+        max_chars: Approximate maximum characters of row text per group
+        stats: Optional SpreadsheetStats updated as sheets and rows are read
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            if stats is not None:
+                stats.sheets.append(sheet.title)
+            header: Optional[List[str]] = None
+            rows: List[List[str]] = []
+            first_row = last_row = 0
+            size = 0
+            for row_number, values in enumerate(sheet.iter_rows(values_only=True), 1):
+                cells = _trimmed(values)
+                if not any(cells):
+                    continue
+                if header is None:
+                    header = cells
+                    if stats is not None:
+                        stats.columns[sheet.title] = header
+                    continue
+                row_size = sum(len(c) for c in cells) + len(CELL_SEPARATOR) * len(cells)
+                if rows and (len(rows) >= rows_per_chunk or size + row_size > max_chars):
+                    yield RowGroup(sheet.title, header, first_row, last_row, rows)
+                    rows, size = [], 0
+                if not rows:
+                    first_row = row_number
+                rows.append(cells)
+                last_row = row_number
+                size += row_size
+                if stats is not None:
+                    stats.rows += 1
+            if rows:
+                yield RowGroup(sheet.title, header or [], first_row, last_row, rows)
+    finally:
+        # Read-only workbooks keep the file open until closed
+        workbook.close()
+
+
+def format_row_group(group: RowGroup) -> str:
+    """Render a row group as text: sheet and row range, header, then one line per row."""
+    lines = [f"Sheet: {group.sheet} (rows {group.first_row}-{group.last_row})"]
+    if group.header:
+        lines.append(CELL_SEPARATOR.join(group.header))
+    lines.extend(CELL_SEPARATOR.join(row) for row in group.rows)
+    return "\n".join(lines)
+
+
+def spreadsheet_documents(
+    source,
+    metadata: Optional[Dict[str, Any]] = None,
+    rows_per_chunk: int = 50,
+    max_chars: int = 4000,
+    stats: Optional[SpreadsheetStats] = None
+) -> Iterator[Document]:
+    """Yield one ready-to-embed Document per row group.
+
+    Each Document carries ``metadata`` plus ``sheet``, ``row_start`` and
+    ``row_end``. The documents are already chunk-sized and should not be
+    split again.
+    """
+    for group in iter_row_groups(source, rows_per_chunk, max_chars, stats):
+        chunk_metadata = dict(metadata or {})
+        chunk_metadata.update({"sheet": group.sheet, "row_start": group.first_row, "row_end": group.last_row})
+        if stats is not None:
+            stats.chunks += 1
+        yield Document(page_content=format_row_group(group), metadata=chunk_metadata)
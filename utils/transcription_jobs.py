@@ -0,0 +1,744 @@
+"""Background transcription jobs for audio, video and YouTube ingestion.
+
+A job prepares an audio file (saving an upload, extracting a video's audio
+track or downloading a YouTube video's audio) in a temporary workspace.
+Long audio is split at silences into segments. Every segment is uploaded
+to AssemblyAI, and a bounded number of them per job are transcribed at the
+same time. A poller thread checks each submitted segment with exponential
+backoff. Each finished segment is ingested into the job's vector store
+straight away, its chunks carrying the segment's start and end times. Once
+every segment is in, the stitched transcript is cached by the media's
+content hash (or YouTube video id).
+
+Jobs and segments are stored in SQLite, so transcripts submitted before a
+restart are still picked up. Set ASSEMBLYAI_BASE_URL to point the client
+at another AssemblyAI-compatible server, e.g.
+``tests/fake_assemblyai_server.py``.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import requests
+
+from utils.media_preprocessor import (
+    SEGMENT_MAX_SECONDS, SEGMENT_TARGET_SECONDS, MediaWorkspace, Segment, ffmpeg_executable
+)
+from utils.upload_cache import UploadCache
+
+SUBMITTING = "submitting"
+PROCESSING = "processing"
+INGESTED = "ingested"
+ERROR = "error"
+
+# Segment states before transcription: uploading (or waiting to ingest a cached
+# transcript), then waiting for a transcription slot; afterwards as above
+PENDING = "pending"
+QUEUED = "queued"
+
+ACTIVE_STATUSES = (SUBMITTING, PROCESSING)
+
+DEFAULT_BASE_URL = "https://api.assemblyai.com"
+UPLOAD_CHUNK_SIZE = 5242880
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcriptions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    source TEXT NOT NULL,
+    store_path TEXT NOT NULL,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL,
+    segments INTEGER NOT NULL DEFAULT 0,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transcriptions_status ON transcriptions (status);
+CREATE TABLE IF NOT EXISTS transcription_segments (
+    job_id INTEGER NOT NULL,
+    idx INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL,
+    status TEXT NOT NULL,
+    upload_url TEXT,
+    transcript_id TEXT,
+    poll_interval REAL NOT NULL DEFAULT 0,
+    next_poll REAL NOT NULL DEFAULT 0,
+    poll_errors INTEGER NOT NULL DEFAULT 0,
+    text TEXT,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_transcription_segments_status ON transcription_segments (status, next_poll);
+"""
+
+
+def youtube_video_id(link: str) -> str:
+    """Video id of a YouTube link (watch, youtu.be, shorts, embed), or a hash of the link."""
+    link = link.strip()
+    parsed = urlparse(link)
+    host = parsed.netloc.lower()
+    if host.endswith("youtu.be"):
+        candidate = parsed.path.strip("/").split("/")[0]
+    elif "youtube" in host:
+        candidate = parse_qs(parsed.query).get("v", [""])[0]
+        if not candidate:
+            match = re.match(r"/(?:shorts|embed|live|v)/([^/?#]+)", parsed.path)
+            candidate = match.group(1) if match else ""
+    else:
+        candidate = ""
+    if re.fullmatch(r"[A-Za-z0-9_-]{6,}", candidate or ""):
+        return candidate
+    return hashlib.sha256(link.encode("utf-8")).hexdigest()[:16]
+
+
+class AssemblyAIClient:
+    """Minimal client for AssemblyAI's upload and transcript REST endpoints."""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        timeout: float = 60.0,
+        session: Optional[requests.Session] = None
+    ):
+        self.api_key = api_key or os.getenv("ASSEMBLYAI_API_KEY", "")
+        self.base_url = (base_url or os.getenv("ASSEMBLYAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        headers = {"authorization": self.api_key, **kwargs.pop("headers", {})}
+        response = self.session.request(
+            method, f"{self.base_url}{path}", headers=headers, timeout=self.timeout, **kwargs
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def upload(self, path: str) -> str:
+        """Stream a local audio file to AssemblyAI; returns its upload URL."""
+        def blocks():
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                    yield block
+        return self._request("POST", "/v2/upload", data=blocks())["upload_url"]
+
+    def submit(self, audio_url: str, **options) -> str:
+        """Request a transcript of an uploaded file; returns the transcript id."""
+        return self._request("POST", "/v2/transcript", json={"audio_url": audio_url, **options})["id"]
+
+    def get(self, transcript_id: str) -> Dict[str, Any]:
+        """Current state of a transcript: status, text and error."""
+        return self._request("GET", f"/v2/transcript/{transcript_id}")
+
+
+def youtube_timestamp_url(link: str, seconds: float) -> str:
+    """YouTube link that starts playback at ``seconds``."""
+    parsed = urlparse(link.strip())
+    query = {k: v[0] for k, v in parse_qs(parsed.query).items() if k != "t"}
+    query["t"] = f"{int(seconds)}s"
+    return parsed._replace(query=urlencode(query)).geturl()
+
+
+# A prepare function returns the path of the audio to transcribe, writing any files into the workspace
+Prepare = Callable[[MediaWorkspace], str]
+# An ingest function adds one transcribed segment to the job's store; returns the chunk count
+Ingest = Callable[[Dict[str, Any], Dict[str, Any]], int]
+
+
+def _discard(prepare: Prepare):
+    # Prepare functions holding a staged upload release it once unused
+    discard = getattr(prepare, "discard", None)
+    if discard is not None:
+        discard()
+
+
+class TranscriptionJobs:
+    """Persistent, segmented transcription jobs, submitted and polled in the background.
+
+    Args:
+        db_path: SQLite file for the jobs (default: $TRANSCRIPTION_JOBS_DB or
+            ./transcription_jobs.db)
+        client: AssemblyAI client
+        cache: Transcript cache keyed by media hash or video id
+        ingest: Called with (job, segment) as each segment is transcribed
+        discard: Called with a failed job whose segments were partly
+            ingested; removes their chunks so a re-submit does not duplicate them
+        poll_interval: Seconds before the first status check
+        max_poll_interval: Upper bound for the backed-off interval
+        backoff: Factor the interval grows by after each pending check
+        max_poll_errors: Consecutive failed requests before a job errors out
+        workers: Jobs prepared and uploaded concurrently
+        max_parallel_segments: Segments of one job transcribed at the same time
+        segment_target: Preferred segment length in seconds
+        segment_max: Audio longer than this is split into segments
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        client: Optional[AssemblyAIClient] = None,
+        cache: Optional[UploadCache] = None,
+        ingest: Optional[Ingest] = None,
+        discard: Optional[Callable[[Dict[str, Any]], int]] = None,
+        poll_interval: float = 3.0,
+        max_poll_interval: float = 30.0,
+        backoff: float = 1.5,
+        max_poll_errors: int = 5,
+        workers: int = 2,
+        max_parallel_segments: int = 4,
+        segment_target: float = SEGMENT_TARGET_SECONDS,
+        segment_max: float = SEGMENT_MAX_SECONDS
+    ):
+        self.db_path = db_path or os.getenv("TRANSCRIPTION_JOBS_DB", "./transcription_jobs.db")
+        self.client = client or AssemblyAIClient()
+        self.cache = cache or UploadCache(os.getenv("UPLOAD_CACHE_DIR", "./upload_cache"))
+        self.ingest = ingest or ingest_transcript
+        self.discard = discard or discard_transcript
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.max_poll_errors = max_poll_errors
+        self.max_parallel_segments = max_parallel_segments
+        self.segment_target = segment_target
+        self.segment_max = segment_max
+        if self.db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        # Serializes segment ingestion, which decides when a job is complete,
+        # with failing jobs, which removes what was ingested
+        self._ingest_lock = threading.RLock()
+        with self._lock, self._conn:
+            if self.db_path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcribe-submit")
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    # -- lifecycle -------------------------------------------------------
+
+    def start(self):
+        """Start the poller (once).
+
+        Jobs that were still preparing, uploading or ingesting a cached
+        transcript when the previous process stopped are marked failed; jobs
+        whose segments were all uploaded resume.
+        """
+        if self._poller is not None:
+            return
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM transcriptions WHERE status = ? "
+                "OR (status = ? AND id IN (SELECT job_id FROM transcription_segments WHERE status = ?))",
+                (SUBMITTING, PROCESSING, PENDING)
+            ).fetchall()
+        for (job_id,) in rows:
+            self._fail(job_id, "interrupted; please submit again")
+        self._poller = threading.Thread(target=self._poll_loop, name="transcribe-poller", daemon=True)
+        self._poller.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wake.set()
+        if self._poller is not None:
+            self._poller.join(timeout)
+        self._executor.shutdown(wait=True)
+        self._poller = None
+
+    def close(self):
+        self.stop()
+        self._conn.close()
+
+    # -- submitting ------------------------------------------------------
+
+    def submit(
+        self,
+        key: str,
+        kind: str,
+        source: str,
+        store_path: str,
+        prepare: Prepare,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """Transcribe media identified by ``key`` and ingest it into ``store_path``.
+
+        A cached transcript for ``key`` is ingested straight away, and an
+        active job for the same key and store is reused instead of starting
+        another transcription.
+
+        Args:
+            key: Media content hash or ``youtube_<video id>``
+            kind: Content type of the resulting documents ("audio" or "video")
+            source: Filename or link shown to the user
+            store_path: Vector store the transcript is ingested into
+            prepare: Writes the audio to transcribe into a workspace, returns its path
+            metadata: Extra metadata for the ingested documents
+        """
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT id FROM transcriptions WHERE key = ? AND store_path = ? "
+                f"AND status IN ({','.join('?' * len(ACTIVE_STATUSES))}) ORDER BY id DESC LIMIT 1",
+                (key, store_path, *ACTIVE_STATUSES)
+            ).fetchone()
+            if row is not None:
+                _discard(prepare)
+                return row["id"]
+            job_id = self._conn.execute(
+                "INSERT INTO transcriptions (key, kind, source, store_path, metadata, status, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, source, store_path, json.dumps(metadata or {}), SUBMITTING, now, now)
+            ).lastrowid
+
+        cached = self.cache.get(key, "transcript")
+        if cached is not None and cached.get("text") is not None:
+            _discard(prepare)
+            self._executor.submit(self._ingest_cached, job_id, cached)
+        else:
+            self._executor.submit(self._submit, job_id, prepare)
+        return job_id
+
+    def _add_segments(self, job_id: int, segments: List[Segment], status: str):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO transcription_segments (job_id, idx, start, end, status) VALUES (?, ?, ?, ?, ?)",
+                [(job_id, segment.index, segment.start, segment.end, status) for segment in segments]
+            )
+            self._conn.execute(
+                "UPDATE transcriptions SET segments = ?, updated = ? WHERE id = ?",
+                (len(segments), datetime.now().isoformat(), job_id)
+            )
+
+    def _submit(self, job_id: int, prepare: Prepare):
+        try:
+            with MediaWorkspace() as workspace:
+                audio_path = prepare(workspace)
+                segments = workspace.split_on_silence(audio_path, self.segment_target, self.segment_max)
+                self._add_segments(job_id, segments, PENDING)
+                for segment in segments:
+                    upload_url = self.client.upload(segment.path)
+                    self._uploaded(job_id, segment.index, upload_url, last=segment is segments[-1])
+        except Exception as e:
+            print(f"Error submitting transcription job {job_id}: {e}")
+            self._fail(job_id, str(e))
+        finally:
+            _discard(prepare)
+
+    def _uploaded(self, job_id: int, index: int, upload_url: str, last: bool):
+        # Transcription of early segments starts while later ones upload;
+        # the job only counts as submitted once every segment is uploaded
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE transcription_segments SET status = ?, upload_url = ? WHERE job_id = ? AND idx = ?",
+                (QUEUED, upload_url, job_id, index)
+            )
+            if last:
+                self._conn.execute(
+                    "UPDATE transcriptions SET status = ?, updated = ? WHERE id = ? AND status = ?",
+                    (PROCESSING, now, job_id, SUBMITTING)
+                )
+        self._wake.set()
+
+    def _ingest_cached(self, job_id: int, cached: Dict[str, Any]):
+        segments = cached.get("segments") or [{"start": 0.0, "end": None, "text": cached["text"]}]
+        self._add_segments(job_id, [
+            Segment(index, segment["start"], segment["end"], "") for index, segment in enumerate(segments)
+        ], PENDING)
+        self._update(job_id, status=PROCESSING)
+        for index, segment in enumerate(segments):
+            if not self._complete_segment(job_id, index, segment["text"]):
+                return
+
+    # -- polling ---------------------------------------------------------
+
+    def _poll_loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Transcription poller error: {e}")
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT MIN(next_poll) FROM transcription_segments WHERE status = ?", (PROCESSING,)
+                ).fetchone()
+            delay = self.max_poll_interval if row[0] is None else max(0.0, row[0] - time.time())
+            self._wake.wait(min(delay, self.max_poll_interval))
+
+    def poll_once(self) -> int:
+        """Check every segment whose next poll is due. Returns how many were checked.
+
+        Queued segments are submitted first, up to ``max_parallel_segments``
+        running per job.
+        """
+        self._start_queued()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.* FROM transcription_segments s JOIN transcriptions j ON j.id = s.job_id "
+                f"WHERE s.status = ? AND s.next_poll <= ? AND j.status IN ({','.join('?' * len(ACTIVE_STATUSES))}) "
+                "ORDER BY s.next_poll",
+                (PROCESSING, time.time(), *ACTIVE_STATUSES)
+            ).fetchall()
+        for row in rows:
+            segment = dict(row)
+            try:
+                result = self.client.get(segment["transcript_id"])
+            except Exception as e:
+                self._request_failed(segment, f"status check failed: {e}")
+                continue
+
+            status = result.get("status")
+            if status == "completed":
+                self._complete_segment(segment["job_id"], segment["idx"], result.get("text") or "")
+            elif status == "error":
+                self._fail_segment(segment, result.get("error") or "transcription failed")
+            else:
+                self._reschedule(segment, poll_errors=0)
+        return len(rows)
+
+    def _start_queued(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT s.*, (SELECT COUNT(*) FROM transcription_segments p "
+                "WHERE p.job_id = s.job_id AND p.status = ?) AS running "
+                "FROM transcription_segments s JOIN transcriptions j ON j.id = s.job_id "
+                f"WHERE s.status = ? AND j.status IN ({','.join('?' * len(ACTIVE_STATUSES))}) "
+                "ORDER BY s.job_id, s.idx",
+                (PROCESSING, QUEUED, *ACTIVE_STATUSES)
+            ).fetchall()
+        started: Dict[int, int] = {}
+        for row in rows:
+            segment = dict(row)
+            job_id = segment["job_id"]
+            if segment["running"] + started.get(job_id, 0) >= self.max_parallel_segments:
+                continue
+            try:
+                transcript_id = self.client.submit(segment["upload_url"])
+            except Exception as e:
+                self._request_failed(segment, f"transcript request failed: {e}")
+                continue
+            started[job_id] = started.get(job_id, 0) + 1
+            self._update_segment(
+                segment, status=PROCESSING, transcript_id=transcript_id, poll_errors=0,
+                poll_interval=self.poll_interval, next_poll=time.time() + self.poll_interval
+            )
+
+    def _request_failed(self, segment: Dict[str, Any], error: str):
+        errors = segment["poll_errors"] + 1
+        if errors >= self.max_poll_errors:
+            self._fail_segment(segment, error)
+        else:
+            self._reschedule(segment, poll_errors=errors)
+
+    def _reschedule(self, segment: Dict[str, Any], poll_errors: int):
+        interval = min(self.max_poll_interval, max(segment["poll_interval"], self.poll_interval) * self.backoff)
+        self._update_segment(
+            segment, poll_interval=interval, next_poll=time.time() + interval, poll_errors=poll_errors
+        )
+
+    def _fail_segment(self, segment: Dict[str, Any], error: str):
+        job = self.get_job(segment["job_id"])
+        self._update_segment(segment, status=ERROR)
+        if job["segments"] > 1:
+            error = f"segment {segment['idx'] + 1}/{job['segments']}: {error}"
+        self._fail(segment["job_id"], error)
+
+    def _fail(self, job_id: int, error: str):
+        """Mark a job failed and remove the chunks of the segments it ingested.
+
+        The upload ledger is only written with the last segment, so chunks
+        left behind would be ingested a second time when the media is
+        submitted again.
+        """
+        with self._ingest_lock:
+            job = self.get_job(job_id)
+            if job is None or job["status"] == ERROR:
+                return
+            self._update(job_id, status=ERROR, error=error)
+            if not job["chunks"]:
+                return
+            try:
+                removed = self.discard(job)
+            except Exception as e:
+                print(f"Error removing the chunks of failed transcription job {job_id}: {e}")
+                return
+            self._update(job_id, chunks=0)
+            print(f"Removed {removed} chunks of failed transcription job {job_id}")
+
+    def _complete_segment(self, job_id: int, index: int, text: str) -> bool:
+        """Ingest one transcribed segment; the last one completes the job."""
+        with self._ingest_lock:
+            job = self.get_job(job_id)
+            if job["status"] == ERROR:
+                # Another segment failed the job while this one was transcribed
+                return False
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT * FROM transcription_segments WHERE job_id = ? AND idx = ?", (job_id, index)
+                ).fetchone()
+                remaining = self._conn.execute(
+                    "SELECT COUNT(*) FROM transcription_segments WHERE job_id = ? AND idx != ? AND status != ?",
+                    (job_id, index, INGESTED)
+                ).fetchone()[0]
+            segment = {
+                "index": index, "start": row["start"], "end": row["end"], "text": text,
+                "count": job["segments"], "last": job["status"] == PROCESSING and remaining == 0,
+            }
+            try:
+                chunks = self.ingest(job, segment)
+            except Exception as e:
+                print(f"Error ingesting segment {index} of transcription job {job_id}: {e}")
+                self._update_segment(dict(row), status=ERROR)
+                self._fail(job_id, f"ingestion failed: {e}")
+                return False
+            self._update_segment(dict(row), status=INGESTED, text=text, chunks=chunks)
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "UPDATE transcriptions SET chunks = chunks + ?, updated = ? WHERE id = ?",
+                    (chunks, datetime.now().isoformat(), job_id)
+                )
+            if segment["last"]:
+                self._finish(job)
+        # A transcription slot is free for the job's next queued segment
+        self._wake.set()
+        return True
+
+    def _finish(self, job: Dict[str, Any]):
+        segments = self.segments(job["id"])
+        self.cache.put(job["key"], "transcript", {
+            "text": "\n\n".join(segment["text"] for segment in segments),
+            "segments": [
+                {"start": segment["start"], "end": segment["end"], "text": segment["text"]}
+                for segment in segments
+            ],
+        })
+        self._update(job["id"], status=INGESTED)
+
+    # -- state -----------------------------------------------------------
+
+    def _update(self, job_id: int, **fields):
+        fields["updated"] = datetime.now().isoformat()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE transcriptions SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+
+    def _update_segment(self, segment: Dict[str, Any], **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE transcription_segments SET {assignments} WHERE job_id = ? AND idx = ?",
+                (*fields.values(), segment["job_id"], segment["idx"])
+            )
+
+    def _job_dict(self, row) -> Dict[str, Any]:
+        job = dict(row)
+        job["metadata"] = json.loads(job["metadata"] or "{}")
+        return job
+
+    def get_job(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM transcriptions WHERE id = ?", (job_id,)).fetchone()
+        return self._job_dict(row) if row else None
+
+    def segments(self, job_id: int) -> List[Dict[str, Any]]:
+        """A job's segments in order, with their status and (once done) text."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM transcription_segments WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def segment_progress(self, job_id: int) -> Dict[str, int]:
+        """Number of a job's segments in each state."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM transcription_segments WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall()
+        counts = {status: 0 for status in (PENDING, QUEUED, PROCESSING, INGESTED, ERROR)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def list_jobs(self, store_path: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Most recent jobs, optionally only those ingesting into ``store_path``."""
+        query = "SELECT * FROM transcriptions"
+        params: List[Any] = []
+        if store_path is not None:
+            query += " WHERE store_path = ?"
+            params.append(store_path)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._job_dict(row) for row in rows]
+
+    def wait(self, job_id: int, timeout: float = 60.0, interval: float = 0.05) -> Optional[Dict[str, Any]]:
+        """Block until a job is ingested or failed (useful for scripts and tests)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            job = self.get_job(job_id)
+            if job is None or job["status"] not in ACTIVE_STATUSES:
+                return job
+            time.sleep(interval)
+        return self.get_job(job_id)
+
+
+def ingest_transcript(job: Dict[str, Any], segment: Dict[str, Any]) -> int:
+    """Default ingest: chunk one transcribed segment into the job's vector store.
+
+    Documents get standard learning-item metadata of the job's kind plus
+    the job's metadata and the segment's ``start_time``/``end_time`` in
+    seconds (for YouTube, also a ``timestamp_url`` starting playback there).
+    Uploaded files and YouTube videos are recorded in the store's upload
+    ledger with the last segment, so submitting them again is recognized.
+    """
+    from langchain.docstore.document import Document
+    from utils.content_processor import chunk_documents
+    from utils.job_queue import get_store, store_lock
+    from utils.metadata_extractor import create_metadata
+    from utils.upload_cache import UploadLedger
+
+    extra = job["metadata"]
+    url = extra.get("url")
+    text = segment["text"]
+    metadata = create_metadata(
+        url=url,
+        title=extra.get("title") or (None if url else job["source"]),
+        content=text,
+        content_type=job["kind"]
+    )
+    if url:
+        metadata["source"] = url
+    # Lets discard_transcript find the chunks if the job fails later
+    metadata["transcription_job"] = _job_tag(job)
+    for key, value in extra.items():
+        if key not in ("url", "title") and value not in (None, "") and key not in metadata:
+            metadata[key] = value
+    if segment.get("end") is not None:
+        metadata["start_time"] = round(segment["start"], 2)
+        metadata["end_time"] = round(segment["end"], 2)
+        metadata["segment"] = segment["index"]
+        if url and "youtu" in urlparse(url).netloc.lower():
+            metadata["timestamp_url"] = youtube_timestamp_url(url, segment["start"])
+
+    chunks = chunk_documents([Document(page_content=text, metadata=metadata)])
+    store = get_store(job["store_path"])
+    with store_lock(job["store_path"]):
+        # Another process (the ingest CLI) may have saved since this instance
+        # loaded; reload first so saving it does not drop what was written
+        store.refresh()
+        store.add_documents(chunks)
+    if segment.get("last"):
+        # Keyed like the job (file hash or ``youtube_<video id>``)
+        UploadLedger.for_store(job["store_path"]).record(
+            job["key"], metadata.get("filename", job["source"]), job["kind"],
+            job["chunks"] + len(chunks)
+        )
+    return len(chunks)
+
+
+def _job_tag(job: Dict[str, Any]) -> str:
+    return f"{job['id']}:{job['key']}"
+
+
+def discard_transcript(job: Dict[str, Any]) -> int:
+    """Default discard: delete the chunks ``ingest_transcript`` added for ``job``.
+
+    Returns the number of chunks deleted.
+    """
+    from utils.job_queue import get_store, store_lock
+
+    tag = _job_tag(job)
+    store = get_store(job["store_path"])
+    with store_lock(job["store_path"]):
+        store.refresh()
+        ids = [meta["id"] for meta in store.metadata if meta.get("transcription_job") == tag]
+        store.delete(ids)
+    return len(ids)
+
+
+def youtube_audio(link: str) -> Prepare:
+    """Prepare function downloading a YouTube video's audio into the workspace."""
+    def prepare(workspace: MediaWorkspace) -> str:
+        import yt_dlp
+
+        options = {
+            "format": "bestaudio/best",
+            "outtmpl": os.path.join(workspace.path, "%(id)s.%(ext)s"),
+            "ffmpeg_location": ffmpeg_executable(),
+            "postprocessors": [{"key": "FFmpegExtractAudio", "preferredcodec": "mp3", "preferredquality": "64"}],
+            "quiet": True,
+        }
+        with workspace.timings.stage("download"):
+            with yt_dlp.YoutubeDL(options) as ydl:
+                info = ydl.extract_info(link)
+        return os.path.join(workspace.path, f"{info['id']}.mp3")
+    return prepare
+
+
+class StagedUpload:
+    """Prepare function for an upload copied to a temporary file when submitted.
+
+    The upload is streamed to disk in the request thread, so neither the
+    page nor the queued job holds it in memory. The file belongs to the job
+    and is removed by ``discard()`` once the job no longer needs it.
+    """
+
+    def __init__(self, uploaded, name: str, extract: bool = False):
+        self.extract = extract
+        self._staging = MediaWorkspace().__enter__()
+        try:
+            self.path = self._staging.save_upload(uploaded, name=name)
+        except Exception:
+            self.discard()
+            raise
+
+    def __call__(self, workspace: MediaWorkspace) -> str:
+        return workspace.extract_audio(self.path) if self.extract else self.path
+
+    def discard(self):
+        self._staging.cleanup()
+
+
+def upload_audio(uploaded, name: str, extract: bool = False) -> StagedUpload:
+    """Prepare function for an uploaded file (any binary file object).
+
+    With ``extract`` the upload is a video and only its audio track is kept.
+    """
+    return StagedUpload(uploaded, name, extract)
+
+
+_default_jobs = None
+_default_guard = threading.Lock()
+
+
+def get_transcription_jobs(api_key: Optional[str] = None) -> TranscriptionJobs:
+    """Return the process-wide transcription jobs, with the poller started.
+
+    Args:
+        api_key: AssemblyAI key used when the jobs are first created
+            (default: $ASSEMBLYAI_API_KEY)
+    """
+    global _default_jobs
+    with _default_guard:
+        if _default_jobs is None:
+            _default_jobs = TranscriptionJobs(client=AssemblyAIClient(api_key=api_key))
+            _default_jobs.start()
+        return _default_jobs
@@ -0,0 +1,144 @@
+"""Content-hash cache for uploaded files.
+
+Uploads are identified by the SHA-256 of their bytes. Two caches use it:
+
+* ``UploadLedger`` is kept next to each user's vector store and records which
+  files were already added, so a re-upload of the same file is skipped.
+* ``UploadCache`` stores extraction and transcription outputs by hash, so
+  the expensive part (PDF parsing, AssemblyAI transcription) is never done
+  twice for the same bytes.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_CACHE_DIR = "./upload_cache"
+
+_HASH_BLOCK = 1 << 20
+
+
+def file_hash(uploaded) -> str:
+    """SHA-256 hex digest of an uploaded file, path or bytes.
+
+    File-like objects are read in blocks and rewound afterwards, so they
+    can still be processed normally.
+    """
+    digest = hashlib.sha256()
+    if isinstance(uploaded, (bytes, bytearray, memoryview)):
+        digest.update(uploaded)
+        return digest.hexdigest()
+    if isinstance(uploaded, (str, os.PathLike)):
+        with open(uploaded, 'rb') as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    position = uploaded.tell() if hasattr(uploaded, "tell") else None
+    uploaded.seek(0)
+    for block in iter(lambda: uploaded.read(_HASH_BLOCK), b""):
+        digest.update(block)
+    uploaded.seek(position or 0)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """Extraction and transcription outputs stored on disk by content hash."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, digest: str, kind: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.{kind}.json")
+
+    def get(self, digest: str, kind: str) -> Optional[Dict[str, Any]]:
+        """Cached output of ``kind`` (e.g. "pdf", "transcript") for a file, if any."""
+        path = self._path(digest, kind)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading cached {kind} for {digest}: {e}")
+            return None
+
+    def put(self, digest: str, kind: str, value: Dict[str, Any]):
+        path = self._path(digest, kind)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            print(f"Error caching {kind} for {digest}: {e}")
+
+    def get_or_compute(
+        self,
+        digest: str,
+        kind: str,
+        compute: Callable[[], Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Return (output, True) from the cache, or compute, store and return (output, False)."""
+        cached = self.get(digest, kind)
+        if cached is not None:
+            return cached, True
+        value = compute()
+        self.put(digest, kind, value)
+        return value, False
+
+
+class UploadLedger:
+    """Hashes of the files already added to one vector store."""
+
+    FILENAME = "uploads.json"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except Exception as e:
+                print(f"Error loading upload ledger: {e}")
+
+    @classmethod
+    def for_store(cls, store_path: str) -> "UploadLedger":
+        """Return the upload ledger kept alongside a vector store."""
+        return cls(os.path.join(store_path, cls.FILENAME))
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        return self._entries.get(digest)
+
+    def record(self, digest: str, filename: str, content_type: str, chunks: int):
+        """Record a processed file and save the ledger."""
+        now = datetime.now().isoformat()
+        entry = self._entries.setdefault(digest, {"added": now})
+        entry.update({"filename": filename, "type": content_type, "chunks": chunks, "updated": now})
+        self.save()
+
+    def touch(self, digest: str, filename: str):
+        """Note a re-upload of a known file (possibly under a new name)."""
+        entry = self._entries.get(digest)
+        if entry is not None:
+            entry.update({"filename": filename, "updated": datetime.now().isoformat()})
+            self.save()
+
+    def save(self):
+        """Write the ledger to disk."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"Error saving upload ledger: {e}")
@@ -0,0 +1,237 @@
+"""Discover site URLs from sitemaps and RSS/Atom feeds instead of crawling.
+
+Sitemaps (plain or gzip-compressed, including nested sitemap indexes) and
+feeds are streamed through an incremental XML parser, so a site with tens of
+thousands of pages is discovered in a handful of requests without holding
+the documents in memory.
+"""
+import re
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+from xml.etree.ElementTree import XMLPullParser
+
+from utils import http_client
+
+SITEMAP_PATHS = ["/sitemap.xml", "/sitemap_index.xml"]
+FEED_PATHS = ["/feed", "/rss.xml", "/atom.xml", "/index.xml", "/feed.xml"]
+
+_FEED_LINK = re.compile(
+    r'<link[^>]+type=["\']application/(?:rss|atom)\+xml["\'][^>]*>', re.IGNORECASE
+)
+_HREF = re.compile(r'href=["\']([^"\']+)["\']', re.IGNORECASE)
+
+
+@dataclass
+class DiscoveredURL:
+    """A page URL found in a sitemap or feed."""
+    url: str
+    lastmod: Optional[datetime] = None
+    source: str = "sitemap"
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    """Parse W3C (sitemap/Atom) or RFC 822 (RSS) dates into aware UTC datetimes."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def _decompressed(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Transparently gunzip a stream of chunks if it starts with the gzip magic."""
+    decompressor = None
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if first:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        yield decompressor.decompress(chunk) if decompressor else chunk
+    if decompressor:
+        yield decompressor.flush()
+
+
+def parse_xml_stream(chunks: Iterable[bytes]) -> Iterator[Tuple[str, str, Optional[datetime]]]:
+    """Incrementally parse a sitemap, sitemap index, RSS or Atom document.
+
+    Yields:
+        (kind, url, lastmod) where kind is "sitemap" for nested sitemaps
+        listed in an index and "page" for page URLs
+    """
+    parser = XMLPullParser(events=("start", "end"))
+    loc = lastmod = None
+    link = None
+
+    for chunk in _decompressed(chunks):
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            tag = _local(element.tag)
+            if event == "start":
+                if tag in ("url", "sitemap", "item", "entry"):
+                    loc = lastmod = link = None
+                continue
+
+            if tag == "loc":
+                loc = (element.text or "").strip()
+            elif tag in ("lastmod", "updated", "pubdate", "published") and not lastmod:
+                lastmod = parse_datetime(element.text)
+            elif tag == "link":
+                # RSS: <link>url</link>; Atom: <link rel="alternate" href="url"/>
+                href = element.get("href")
+                rel = element.get("rel", "alternate")
+                if href and rel == "alternate":
+                    link = href.strip()
+                elif element.text and element.text.strip():
+                    link = element.text.strip()
+            elif tag in ("url", "sitemap", "item", "entry"):
+                url = loc if tag in ("url", "sitemap") else link
+                if url:
+                    yield ("sitemap" if tag == "sitemap" else "page"), url, lastmod
+                # Drop finished entries so memory stays flat
+                element.clear()
+
+
+def _stream(url: str) -> Iterator[bytes]:
+    response = http_client.get(url, stream=True)
+    try:
+        if response.status_code >= 400:
+            return
+        yield from response.iter_content(chunk_size=65536)
+    finally:
+        response.close()
+
+
+def _robots_sitemaps(site_root: str) -> List[str]:
+    try:
+        response = http_client.get(site_root + "/robots.txt", timeout=5)
+    except Exception:
+        return []
+    if response.status_code >= 400:
+        return []
+    return [
+        line.split(":", 1)[1].strip()
+        for line in response.text.splitlines()
+        if line.lower().startswith("sitemap:")
+    ]
+
+
+def _homepage_feeds(site_url: str) -> List[str]:
+    try:
+        response = http_client.get(site_url, timeout=10)
+    except Exception:
+        return []
+    if response.status_code >= 400:
+        return []
+    feeds = []
+    for tag in _FEED_LINK.findall(response.text):
+        href = _HREF.search(tag)
+        if href:
+            feeds.append(urljoin(site_url, href.group(1)))
+    return feeds
+
+
+def discover_urls(
+    site_url: str,
+    since: Optional[datetime] = None,
+    max_requests: int = 20,
+    max_urls: Optional[int] = None,
+    same_host: bool = True
+) -> List[DiscoveredURL]:
+    """Find a site's pages through its sitemaps and feeds.
+
+    Sitemaps come from robots.txt ``Sitemap:`` lines and the usual paths;
+    if none are found, feeds advertised on the home page or at common paths
+    are used instead.
+
+    Args:
+        site_url: Any URL on the site (the scheme and host are used)
+        since: Only return pages modified at or after this time (pages
+            without a last-modified date are always returned)
+        max_requests: Upper bound on sitemap/feed documents fetched
+        max_urls: Stop after this many page URLs
+        same_host: Drop URLs on other hosts
+
+    Returns:
+        Discovered pages, newest lastmod kept for duplicates
+    """
+    parsed = urlparse(site_url)
+    site_root = f"{parsed.scheme}://{parsed.netloc}"
+    host = parsed.netloc.lower()
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    # Every entry seen (for de-duplication); only recent ones count toward max_urls
+    found: Dict[str, DiscoveredURL] = {}
+    recent = 0
+    requests_made = 0
+
+    def is_recent(page: DiscoveredURL) -> bool:
+        return since is None or page.lastmod is None or page.lastmod >= since
+
+    def crawl_documents(queue: List[str], source: str):
+        nonlocal recent, requests_made
+        visited = set()
+        while queue and requests_made < max_requests:
+            document_url = queue.pop(0)
+            if document_url in visited:
+                continue
+            visited.add(document_url)
+            requests_made += 1
+            try:
+                for kind, url, lastmod in parse_xml_stream(_stream(document_url)):
+                    if kind == "sitemap":
+                        queue.append(url)
+                        continue
+                    if same_host and urlparse(url).netloc.lower() != host:
+                        continue
+                    full = max_urls is not None and recent >= max_urls
+                    existing = found.get(url)
+                    if existing is None:
+                        page = DiscoveredURL(url, lastmod, source)
+                        if is_recent(page):
+                            if full:
+                                return
+                            recent += 1
+                        found[url] = page
+                    elif lastmod and (existing.lastmod is None or lastmod > existing.lastmod):
+                        was_recent = is_recent(existing)
+                        previous, existing.lastmod = existing.lastmod, lastmod
+                        if is_recent(existing) and not was_recent:
+                            if full:
+                                existing.lastmod = previous
+                                continue
+                            recent += 1
+                        elif was_recent and not is_recent(existing):
+                            recent -= 1
+            except Exception as e:
+                print(f"Error reading {document_url}: {e}")
+
+    sitemaps = _robots_sitemaps(site_root)
+    requests_made += 1
+    crawl_documents(sitemaps or [site_root + path for path in SITEMAP_PATHS], "sitemap")
+
+    if not found and requests_made < max_requests:
+        feeds = _homepage_feeds(site_url)
+        requests_made += 1
+        crawl_documents(feeds or [site_root + path for path in FEED_PATHS], "feed")
+
+    return [page for page in found.values() if is_recent(page)]
@@ -4,6 +4,23 @@ import re
 import os
 
 
+def safe_user_id(user_name: str) -> str:
+    """Sanitize a user name for use in store paths and collection names.
+    
+    Args:
+        user_name: Name, email or other identifier given for the user
+    
+    Returns:
+        str: Lowercase identifier of letters, digits, '_' and '-' (may be empty)
+    """
+    # Replace spaces and special chars with underscores
+    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', user_name.lower())
+    # Remove multiple consecutive underscores
+    safe_name = re.sub(r'_+', '_', safe_name)
+    # Remove leading/trailing underscores
+    return safe_name.strip('_')
+
+
 def get_user_identifier() -> str:
     """Get a safe identifier for the current user.
     
@@ -15,13 +32,7 @@ def get_user_identifier() -> str:
         user_name = st.user.name or st.user.email
         if user_name:
             # Sanitize the username for filesystem/database use
-            # Replace spaces and special chars with underscores
-            safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', user_name.lower())
-            # Remove multiple consecutive underscores
-            safe_name = re.sub(r'_+', '_', safe_name)
-            # Remove leading/trailing underscores
-            safe_name = safe_name.strip('_')
-            return safe_name
+            return safe_user_id(user_name)
     
     # Fallback for local development or when auth is not available
     return "default"
@@ -0,0 +1,124 @@
+"""Word clouds built from streaming word counts.
+
+Instead of handing the whole extracted text to ``WordCloud.generate``, text
+is counted as it is chunked (``WordCounter.update``), the cloud is rendered
+from the top entries of that table only, and the rendered PNG is cached by
+a hash of the table. Rendering uses PIL rather than pyplot, so it can run on
+a background thread while ingestion continues.
+"""
+import hashlib
+import io
+import re
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from wordcloud import STOPWORDS, WordCloud
+
+_WORD = re.compile(r"[^\W\d_][\w']+")
+
+MAX_WORDS = 200
+# Text per document beyond this is sampled in evenly spaced windows
+MAX_CHARS_PER_DOCUMENT = 200_000
+_SAMPLE_WINDOW = 10_000
+_CACHE_SIZE = 32
+
+
+def _sample(text: str, limit: int = MAX_CHARS_PER_DOCUMENT) -> str:
+    if len(text) <= limit:
+        return text
+    windows = max(1, limit // _SAMPLE_WINDOW)
+    step = (len(text) - _SAMPLE_WINDOW) / max(1, windows - 1)
+    # Cut at spaces so sampled windows do not start or end mid-word
+    parts = []
+    for i in range(windows):
+        start = int(i * step)
+        parts.append(text[start:start + _SAMPLE_WINDOW])
+    return " ".join(part.partition(" ")[2].rpartition(" ")[0] for part in parts)
+
+
+class WordCounter:
+    """Running word frequencies over many texts, without keeping the texts.
+
+    Args:
+        max_vocabulary: When more distinct words than this are held, the
+            rarest are dropped so memory stays bounded on very large imports
+    """
+
+    def __init__(self, max_vocabulary: int = 50_000):
+        self.max_vocabulary = max_vocabulary
+        self.counts: Counter = Counter()
+        self.documents = 0
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self.counts)
+
+    def update(self, text: str):
+        """Count the words of one text (long texts are sampled)."""
+        words = [
+            word[:-2] if word.endswith("'s") else word
+            for word in _WORD.findall(_sample(text).lower())
+        ]
+        counts = Counter(word for word in words if len(word) > 2 and word not in STOPWORDS)
+        with self._lock:
+            self.counts.update(counts)
+            self.documents += 1
+            if len(self.counts) > self.max_vocabulary:
+                self.counts = Counter(dict(self.counts.most_common(self.max_vocabulary // 2)))
+
+    def top(self, n: int = MAX_WORDS) -> Dict[str, int]:
+        """The ``n`` most frequent words: the capped table a cloud is drawn from."""
+        with self._lock:
+            return dict(self.counts.most_common(n))
+
+
+def frequencies_hash(frequencies: Dict[str, int]) -> str:
+    payload = "\n".join(f"{word}\t{count}" for word, count in sorted(frequencies.items()))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def render_png(frequencies: Dict[str, int], width: int = 800, height: int = 400) -> bytes:
+    """Render a word cloud PNG from a frequency table (no pyplot state involved)."""
+    cloud = WordCloud(
+        width=width, height=height, background_color='white', max_words=len(frequencies) or 1
+    ).generate_from_frequencies(frequencies)
+    buffer = io.BytesIO()
+    cloud.to_image().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_renders: "OrderedDict[str, Future]" = OrderedDict()
+_renders_lock = threading.Lock()
+
+
+def prerender(frequencies: Dict[str, int]) -> Optional[Future]:
+    """Start rendering in the background; returns a Future of the PNG bytes.
+
+    Identical tables share one render, and the most recent renders stay
+    cached, so showing the same cloud again costs nothing.
+    """
+    global _executor
+    if not frequencies:
+        return None
+    key = frequencies_hash(frequencies)
+    with _renders_lock:
+        future = _renders.get(key)
+        if future is not None and not (future.done() and future.exception()):
+            _renders.move_to_end(key)
+            return future
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="word-cloud")
+        future = _executor.submit(render_png, dict(frequencies))
+        _renders[key] = future
+        while len(_renders) > _CACHE_SIZE:
+            _renders.popitem(last=False)
+    return future
+
+
+def word_cloud_png(frequencies: Dict[str, int], timeout: Optional[float] = None) -> Optional[bytes]:
+    """PNG bytes of the word cloud for ``frequencies`` (cached), or None if empty."""
+    future = prerender(frequencies)
+    return future.result(timeout) if future is not None else None
@@ -1,76 +1,225 @@
-import requests
+import asyncio
 import argparse
-from bs4 import BeautifulSoup
-import re
-from urllib.parse import urljoin
+import threading
+import time
+from urllib.parse import urldefrag, urlparse
+
+import aiohttp
 import streamlit as st
+from utils.http_cache import CachedResponse, get_default_cache
+from utils.http_client import detect_encoding, make_async_session
+from utils.html_parser import parse_record
+from utils.crawl_frontier import CrawlFrontier, DONE, FAILED
+from utils.politeness import PolitenessScheduler, THROTTLE_STATUSES, parse_retry_after
+
+
+# Crawl records are cache-aware responses: the crawler emits them and the
+# ingestion step consumes them directly.
+CrawlRecord = CachedResponse
+
 
 class WebCrawler:
-    def __init__(self, url, max_depth):
+    """Breadth-first crawler driven by an asyncio frontier.
+
+    Pages are taken from the frontier shallowest-first and fetched
+    concurrently in batches over a single pooled connector. Requests are
+    paced by a PolitenessScheduler (per-host concurrency and delay,
+    robots.txt, backoff on 429/503), with a per-request timeout and overall
+    page/byte budgets.
+
+    Every response is kept in ``records`` so the ingestion step can reuse
+    the bodies instead of downloading them again (or handed to
+    ``on_record`` as they arrive, for crawls too large to keep in memory).
+    Responses go through the shared HTTP cache, so re-crawling an unchanged
+    site costs conditional GETs answered with 304.
+    """
+
+    def __init__(
+        self,
+        url,
+        max_depth,
+        max_pages=200,
+        max_bytes=50 * 1024 * 1024,
+        per_host_limit=4,
+        total_limit=20,
+        timeout=10,
+        cache=None,
+        scheduler=None,
+        delay=0.25,
+        max_attempts=3,
+        frontier=None,
+        on_record=None,
+        restart=False
+    ):
         self.url = url
         self.subdomains = set()
         self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.timeout = timeout
+        self.pages_fetched = 0
+        self.bytes_fetched = 0
+        self.records = []
+        self.cache = cache if cache is not None else get_default_cache()
+        self.max_attempts = max_attempts
+        self.frontier = frontier
+        self.on_record = on_record
+        self.restart = restart
+        self.crawl_id = None
+        self.batch_size = total_limit * 2
+        self.scheduler = scheduler or PolitenessScheduler(default_delay=delay, max_per_domain=per_host_limit)
 
     def start_crawling(self, url):
-        return self.crawl(url, depth=0)
-
-    def crawl(self, url, depth):
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-            "Accept-Encoding": "identity"  # Disable compression to avoid encoding issues
-        }
-        self.subdomains.add(url)
-       
-        try:
-            response = requests.get(url, headers=headers, timeout=10, allow_redirects=True)
-            response.raise_for_status()  # Raise exception for bad status codes
-            
-            # Handle encoding explicitly
-            if response.encoding is None:
-                response.encoding = 'utf-8'
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-        except requests.exceptions.RequestException as err:
-            print(f"[-] An error occurred: {err}")
-            return self.subdomains
-        except UnicodeDecodeError as err:
-            print(f"[-] Encoding error occurred: {err}")
-            return self.subdomains
-
-        subdomain_query = fr"{url}([a-zA-Z0-9.-]+)"
-
-        # repeat this maxDepth times 
-        if depth < self.max_depth: 
-            depth = depth + 1
-            for link in soup.find_all('a'):
-                if 'href' in link.attrs:  
-                    href = link.get('href')
-                    if href:
-                        if re.match(subdomain_query, href) and href not in self.subdomains:
-                            self.subdomains.add(href)
-                        if href.startswith("/"):            
-                            full_link = urljoin(url, href)
-                            if full_link != url and full_link not in self.subdomains:
-                                self.subdomains.add(full_link)
-                                self.crawl(full_link, depth)
+        return _run(self.crawl(url))
+
+    async def crawl(self, url):
+        """Crawl from ``url`` breadth-first up to ``max_depth``.
 
+        The frontier lives in a CrawlFrontier, so a crawl backed by an on-disk
+        frontier resumes where it stopped and skips pages already ingested.
+        """
+        url = urldefrag(url)[0]
+        frontier = self.frontier or CrawlFrontier(":memory:")
+        self.crawl_id = frontier.start(url, self.max_depth, restart=self.restart)
+        frontier.add(self.crawl_id, [(url, 0)], limit=self.max_pages)
+        session = make_async_session(self.total_limit, self.per_host_limit, self.timeout)
 
+        async with session:
+            while self.bytes_fetched < self.max_bytes:
+                batch = frontier.next_batch(self.crawl_id, self.batch_size)
+                if not batch:
+                    frontier.finish(self.crawl_id)
+                    break
+                records = await asyncio.gather(*(self._fetch(session, page) for page, _ in batch))
+
+                for (page_url, depth), record in zip(batch, records):
+                    if record is None:
+                        if self.bytes_fetched < self.max_bytes:
+                            frontier.mark(self.crawl_id, page_url, FAILED, error="fetch failed")
+                        continue
+                    if record.truncated:
+                        # Only part of the page arrived; a resumed crawl fetches it again
+                        frontier.mark(self.crawl_id, page_url, FAILED, http_status=record.status,
+                                      error="byte budget reached")
+                        continue
+                    frontier.mark(self.crawl_id, page_url, DONE if record.ok else FAILED, http_status=record.status)
+                    if depth < self.max_depth and record.ok and record.is_html:
+                        links = ((link, depth + 1) for link in self._extract_links(page_url, record))
+                        frontier.add(self.crawl_id, links, limit=self.max_pages)
+                    if self.on_record is not None:
+                        self.on_record(record)
+                    else:
+                        self.records.append(record)
+
+        self.subdomains = set(frontier.urls(self.crawl_id))
         return self.subdomains
 
+    async def _fetch(self, session, url):
+        """Fetch one page, returning a CrawlRecord or None on error/budget exhaustion."""
+        if self.bytes_fetched >= self.max_bytes:
+            return None
+        cached = self.cache.get(url) if self.cache else None
+        if cached is not None and self.cache.is_fresh(cached):
+            cached.from_cache = True
+            self.pages_fetched += 1
+            return cached
+
+        for attempt in range(1, self.max_attempts + 1):
+            async with self.scheduler.async_slot(url):
+                if not self.scheduler.can_fetch(url):
+                    print(f"[-] Disallowed by robots.txt: {url}")
+                    return None
+                if self.bytes_fetched >= self.max_bytes:
+                    return None
+                record = await self._request(session, url, cached)
+            if record is None:
+                return None
+            self.scheduler.record_response(url, record.status, parse_retry_after(record.header("Retry-After")))
+            if record.status not in THROTTLE_STATUSES or attempt == self.max_attempts:
+                return record
+        return None
+
+    async def _request(self, session, url, cached):
+        """Issue one (conditional) GET and turn the response into a CrawlRecord."""
+        request_headers = self.cache.conditional_headers(cached) if self.cache else {}
+        try:
+            async with session.get(url, headers=request_headers, allow_redirects=True) as response:
+                if response.status == 304 and cached is not None:
+                    self.pages_fetched += 1
+                    return self.cache.revalidated(cached, dict(response.headers))
+
+                body = bytearray()
+                truncated = False
+                if response.status < 400:
+                    async for block in response.content.iter_chunked(65536):
+                        body.extend(block)
+                        self.bytes_fetched += len(block)
+                        if self.bytes_fetched >= self.max_bytes:
+                            truncated = not response.content.at_eof()
+                            break
+                else:
+                    print(f"[-] An error occurred: {url}: HTTP {response.status}")
+                self.pages_fetched += 1
+                record = CrawlRecord(
+                    url=url,
+                    status=response.status,
+                    headers=dict(response.headers),
+                    body=bytes(body),
+                    encoding=detect_encoding(bytes(body), response.headers.get("Content-Type")),
+                    stored_at=time.time(),
+                    truncated=truncated
+                )
+                if self.cache:
+                    self.cache.put(record)
+                return record
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            print(f"[-] An error occurred: {url}: {err!r}")
+        return None
+
+    def _extract_links(self, page_url, record):
+        """Return same-site links on a page that are worth crawling."""
+        root_host = urlparse(self.url).netloc
+        # The parse is kept on the record and reused when the page is ingested
+        for full_link in parse_record(record).links:
+            if urlparse(full_link).netloc == root_host and full_link != page_url:
+                yield full_link
+
     def print_results(self):
         st.write("All the URLs porcessed")
         if self.subdomains:
             for subdomain in self.subdomains:
                 print(f"[+]: {subdomain}")
 
+
+def _run(coro):
+    """Run a coroutine to completion, even if the caller already has a loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def runner():
+        result["value"] = asyncio.run(coro)
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    return result["value"]
+
+
 def get_args():
     parser = argparse.ArgumentParser()
     parser.add_argument('-u', '--url', dest='url', help="Specify the URL, provide it along http/https", required=True)
     parser.add_argument('-d', '--depth', dest='depth', type=int, default=1, help="Specify the recursion depth limit")
+    parser.add_argument('--max-pages', dest='max_pages', type=int, default=200, help="Stop after this many pages")
     return parser.parse_args()
 
 if __name__ == "__main__":
     args = get_args()
-    web_crawler = WebCrawler(args.url, args.depth)
+    web_crawler = WebCrawler(args.url, args.depth, max_pages=args.max_pages)
     web_crawler.start_crawling(args.url)
-    web_crawler.print_results()
\ No newline at end of file
+    web_crawler.print_results()